@@ -69,6 +69,7 @@ try:
     import app.models.refresh_token_model
     import app.models.email_verification_model
     import app.models.password_reset_tokens
+    import app.models.shard_directory_model
 
     # import app.models.other_model  # add more if you have additional model files
 except Exception:
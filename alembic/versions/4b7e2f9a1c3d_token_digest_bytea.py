@@ -0,0 +1,55 @@
+"""store token digests as bytea
+
+Revision ID: 4b7e2f9a1c3d
+Revises: 135cc365606e
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e2f9a1c3d"
+down_revision: Union[str, Sequence[str], None] = "135cc365606e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, old length)
+_COLUMNS = [
+    ("refresh_tokens", "token_hash", 512),
+    ("email_verification_tokens", "hashed_token", 255),
+    ("reset_password_tokens", "hashed_token", 255),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing Argon2 hashes are kept as their UTF-8 bytes so live tokens keep
+    # verifying; new rows store the 33 byte versioned HMAC digest.
+    for table, column, _ in _COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using=f"convert_to({column}, 'UTF8')",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # HMAC digests can't be represented as text; those tokens are dropped.
+    for table, column, length in _COLUMNS:
+        op.execute(
+            f"DELETE FROM {table} WHERE substring({column} from 1 for 7) <> '$argon2'::bytea"
+        )
+        op.alter_column(
+            table,
+            column,
+            type_=sa.String(length=length),
+            existing_nullable=False,
+            postgresql_using=f"convert_from({column}, 'UTF8')",
+        )
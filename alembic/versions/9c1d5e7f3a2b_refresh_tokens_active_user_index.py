@@ -0,0 +1,43 @@
+"""partial index on live refresh tokens per user
+
+Revision ID: 9c1d5e7f3a2b
+Revises: 4b7e2f9a1c3d
+Create Date: 2026-10-18 11:40:02.518344
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9c1d5e7f3a2b"
+down_revision: Union[str, Sequence[str], None] = "4b7e2f9a1c3d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction, but it doesn't block
+    # writes to refresh_tokens while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_refresh_tokens_user_id_active",
+            "refresh_tokens",
+            ["user_id"],
+            unique=False,
+            postgresql_where=sa.text("NOT revoked"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_refresh_tokens_user_id_active",
+            table_name="refresh_tokens",
+            postgresql_concurrently=True,
+        )
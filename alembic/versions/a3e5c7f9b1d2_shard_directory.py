@@ -0,0 +1,55 @@
+"""shard bucket map and email index
+
+Revision ID: a3e5c7f9b1d2
+Revises: f4c6a8e2b9d7
+Create Date: 2026-10-18 18:02:41.507193
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a3e5c7f9b1d2"
+down_revision: Union[str, Sequence[str], None] = "f4c6a8e2b9d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only used on DATABASE_URL, but every shard runs the same migrations.
+    # The map is seeded by the first worker that starts with sharding enabled.
+    op.create_table(
+        "shard_buckets",
+        sa.Column("bucket", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("frozen", sa.Boolean(), server_default="false", nullable=False),
+        sa.PrimaryKeyConstraint("bucket"),
+    )
+    op.create_table(
+        "user_email_index",
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "claimed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("email"),
+    )
+    # Existing users, for when this database becomes the directory and shard 0
+    op.execute(
+        "INSERT INTO user_email_index (email, user_id, claimed_at) "
+        "SELECT email, id, created_at FROM users"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_email_index")
+    op.drop_table("shard_buckets")
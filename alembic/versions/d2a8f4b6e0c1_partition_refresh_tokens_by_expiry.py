@@ -0,0 +1,91 @@
+"""range-partition refresh_tokens by expires_at
+
+Revision ID: d2a8f4b6e0c1
+Revises: 9c1d5e7f3a2b
+Create Date: 2026-10-18 14:05:47.903215
+
+Rebuilds refresh_tokens as a partitioned table and copies every row across.
+The copy holds an exclusive lock on refresh_tokens, so run it in a
+maintenance window (or after a sweep) on large tables. Further partitions
+are created and dropped at runtime by TokenSweeper.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a8f4b6e0c1"
+down_revision: Union[str, Sequence[str], None] = "9c1d5e7f3a2b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = "id, user_id, token_hash, revoked, created_at, expires_at"
+_WIDTH = timedelta(days=7)
+# weeks before/after today that get their own partition; older rows land in
+# the default partition and are deleted by the sweeper
+_WEEKS_BEHIND = 4
+_WEEKS_AHEAD = 4
+
+
+def _create_table(name: str, primary_key: str, partitioned: bool) -> None:
+    op.execute(
+        f"""
+        CREATE TABLE {name} (
+            id VARCHAR(64) NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id),
+            token_hash BYTEA NOT NULL,
+            revoked BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT refresh_tokens_pkey PRIMARY KEY ({primary_key})
+        ){" PARTITION BY RANGE (expires_at)" if partitioned else ""}
+        """
+    )
+
+
+def _swap_out_old_table() -> None:
+    op.execute("ALTER TABLE refresh_tokens RENAME TO refresh_tokens_old")
+    op.execute("ALTER INDEX refresh_tokens_pkey RENAME TO refresh_tokens_old_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_refresh_tokens_user_id_active")
+
+
+def _copy_and_drop_old_table() -> None:
+    op.execute(
+        f"INSERT INTO refresh_tokens ({_COLUMNS}) SELECT {_COLUMNS} FROM refresh_tokens_old"
+    )
+    op.execute("DROP TABLE refresh_tokens_old")
+    op.execute(
+        "CREATE INDEX ix_refresh_tokens_user_id_active "
+        "ON refresh_tokens (user_id) WHERE NOT revoked"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("LOCK TABLE refresh_tokens IN ACCESS EXCLUSIVE MODE")
+    _swap_out_old_table()
+    _create_table("refresh_tokens", "id, expires_at", partitioned=True)
+    op.execute("CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens DEFAULT")
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    lower = today - _WIDTH * _WEEKS_BEHIND
+    for _ in range(_WEEKS_BEHIND + _WEEKS_AHEAD):
+        upper = lower + _WIDTH
+        op.execute(
+            f"CREATE TABLE refresh_tokens_p{lower:%Y%m%d} PARTITION OF refresh_tokens "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        lower = upper
+
+    _copy_and_drop_old_table()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Dropping the partitioned parent drops every partition with it
+    op.execute("LOCK TABLE refresh_tokens IN ACCESS EXCLUSIVE MODE")
+    _swap_out_old_table()
+    _create_table("refresh_tokens", "id", partitioned=False)
+    _copy_and_drop_old_table()
@@ -0,0 +1,48 @@
+"""refresh token families
+
+Revision ID: e7b3c9d1f5a4
+Revises: d2a8f4b6e0c1
+Create Date: 2026-10-18 15:32:10.264981
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b3c9d1f5a4"
+down_revision: Union[str, Sequence[str], None] = "d2a8f4b6e0c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "refresh_tokens", sa.Column("family_id", sa.String(length=64), nullable=True)
+    )
+    # Existing tokens can't be linked to their predecessors; each one starts
+    # its own family
+    op.execute("UPDATE refresh_tokens SET family_id = id WHERE family_id IS NULL")
+    op.alter_column(
+        "refresh_tokens",
+        "family_id",
+        existing_type=sa.String(length=64),
+        nullable=False,
+    )
+    # refresh_tokens is partitioned, so this can't be built CONCURRENTLY
+    op.create_index(
+        "ix_refresh_tokens_family_id_active",
+        "refresh_tokens",
+        ["family_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT revoked"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_refresh_tokens_family_id_active", table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "family_id")
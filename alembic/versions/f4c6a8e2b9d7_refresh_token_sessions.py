@@ -0,0 +1,69 @@
+"""session metadata and keyset index on refresh_tokens
+
+Revision ID: f4c6a8e2b9d7
+Revises: e7b3c9d1f5a4
+Create Date: 2026-10-18 16:48:55.130772
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f4c6a8e2b9d7"
+down_revision: Union[str, Sequence[str], None] = "e7b3c9d1f5a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "refresh_tokens", sa.Column("user_agent", sa.String(length=255), nullable=True)
+    )
+    op.add_column(
+        "refresh_tokens", sa.Column("ip_address", sa.String(length=45), nullable=True)
+    )
+    # created_at is part of the pagination key, so it can't be NULL
+    op.execute("UPDATE refresh_tokens SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column(
+        "refresh_tokens",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=False,
+    )
+    # Leads with user_id and has the same predicate, so it also serves
+    # revoke-all and replaces the plain (user_id) index
+    op.create_index(
+        "ix_refresh_tokens_user_sessions",
+        "refresh_tokens",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_include=["family_id", "expires_at", "user_agent", "ip_address"],
+        postgresql_where=sa.text("NOT revoked"),
+    )
+    op.drop_index("ix_refresh_tokens_user_id_active", table_name="refresh_tokens")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_refresh_tokens_user_id_active",
+        "refresh_tokens",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT revoked"),
+    )
+    op.drop_index("ix_refresh_tokens_user_sessions", table_name="refresh_tokens")
+    op.alter_column(
+        "refresh_tokens",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=True,
+    )
+    op.drop_column("refresh_tokens", "ip_address")
+    op.drop_column("refresh_tokens", "user_agent")
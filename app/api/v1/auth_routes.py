@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from uuid import UUID
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from fastapi import Request, Response
-from ...schema.auth_dto import LoginDTO, loginResponseDTO
-from ...domain.abstracts.user_abstract import IUserRepository
-from ...domain.abstracts.password_hasher_abstract import PasswordHasher
-from ...domain.abstracts.refresh_token_abstract import IOpaqueRefreshToken
+from ...schema.auth_dto import (
+    LoginDTO,
+    loginResponseDTO,
+    IntrospectionRequestDTO,
+    IntrospectionResponseDTO,
+    SessionListResponseDTO,
+)
+from ...domain.abstracts.refresh_token_abstract import ClientDevice
 from ...domain.auth.auth_service import AuthService
 from ...domain.auth.token_service import TokenService
+from ...domain.auth.introspection_service import IntrospectionService
+from ...domain.auth.session_service import SessionService
 from ...core.token import get_current_user_id
-from ..v1.dependencies.get_refresh_token_repo import get_refresh_tokens_repo
 
-# get user repo and hasher dependencies
-from ..v1.dependencies.get_user_repo import get_user_repo, get_hasher
+# application-scoped services (see app/core/container.py)
+from ..v1.dependencies.get_unit_of_work import unit_of_work
+from ..v1.dependencies.get_services import (
+    get_auth_service,
+    get_token_service,
+    get_introspection_service,
+    get_session_service,
+)
+from ..v1.dependencies.get_client_device import get_client_device
+from ..v1.dependencies.get_introspection_client import (
+    authenticate_introspection_client,
+)
 from ..v1.dependencies.get_rate_limiter import enforce_login_rate_limit
 from ...domain.auth.rate_limit_service import RateLimitService
 
@@ -24,14 +41,14 @@ async def login(
     payload: LoginDTO,
     request: Request,
     response: Response,
+    background_tasks: BackgroundTasks,
     rate_limiter: RateLimitService = Depends(enforce_login_rate_limit),
-    user_repo: IUserRepository = Depends(get_user_repo),
-    hasher: PasswordHasher = Depends(get_hasher),
-    refresh_tokens: IOpaqueRefreshToken = Depends(get_refresh_tokens_repo),
+    svc: AuthService = Depends(get_auth_service),
+    device: ClientDevice = Depends(get_client_device),
 ):
-    svc = AuthService(user_repo, hasher, refresh_tokens)
     try:
-        token = await svc.login(payload)
+        # A rehash to the current Argon2 profile runs after the response
+        token = await svc.login(payload, device, background_tasks)
         
         # Clear rate limit upon successful login
         await rate_limiter.clear_limit(request.client.host, payload.email.strip().lower())
@@ -57,18 +74,16 @@ async def login(
 
 
 # Refresh endpoint
-@router.post("/auth/refresh")
+@router.post("/auth/refresh", dependencies=[unit_of_work])
 async def refresh(
     request: Request,
     response: Response,
-    hasher=Depends(get_hasher),
-    refresh_tokens=Depends(get_refresh_tokens_repo),
+    svc: TokenService = Depends(get_token_service),
 ):
 
     raw_token = request.cookies.get("refresh_token")
     if not raw_token:
         raise HTTPException(status_code=400, detail="refresh_token required")
-    svc = TokenService(refresh_tokens, hasher)
     try:
         tokens = await svc.refresh_access_token(raw_token)
         new_access = tokens["access_token"]
@@ -96,13 +111,10 @@ async def refresh(
 @router.post("/auth/logout")
 async def logout(
     response: Response,
-    user_id: int = Depends(get_current_user_id),
-    refresh_tokens=Depends(get_refresh_tokens_repo),
-    hasher=Depends(get_hasher),
-    user_repo: IUserRepository = Depends(get_user_repo),
+    user_id: UUID = Depends(get_current_user_id),
+    svc: AuthService = Depends(get_auth_service),
 ):
 
-    svc = AuthService(user_repo, hasher, refresh_tokens)
     try:
         await svc.logout(user_id)
         # clear refresh token cookie
@@ -113,3 +125,51 @@ async def logout(
         return {"detail": "Logged out successfully"}
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
+
+
+# Active sessions of the current user, newest first
+@router.get("/auth/sessions", response_model=SessionListResponseDTO)
+async def list_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: UUID = Depends(get_current_user_id),
+    svc: SessionService = Depends(get_session_service),
+):
+    try:
+        sessions, next_cursor = await svc.list_sessions(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+# Sign out one session (its refresh token lineage); others stay signed in
+@router.delete("/auth/sessions/{session_id}", dependencies=[unit_of_work])
+async def revoke_session(
+    session_id: str,
+    user_id: UUID = Depends(get_current_user_id),
+    svc: SessionService = Depends(get_session_service),
+):
+    try:
+        await svc.revoke_session(user_id, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"detail": "Session revoked"}
+
+
+# Batch token introspection (RFC 7662 style) for resource servers / gateways
+@router.post(
+    "/auth/introspect",
+    response_model=IntrospectionResponseDTO,
+    response_model_exclude_none=True,
+)
+async def introspect(
+    payload: IntrospectionRequestDTO,
+    response: Response,
+    client_id: str = Depends(authenticate_introspection_client),
+    svc: IntrospectionService = Depends(get_introspection_service),
+):
+    results, max_age = await svc.introspect(payload.tokens)
+
+    # Callers may reuse the answer until the first active token would expire
+    response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    return {"results": results}
@@ -0,0 +1,11 @@
+from fastapi import Request
+from ....domain.abstracts.refresh_token_abstract import ClientDevice
+
+
+def get_client_device(request: Request) -> ClientDevice:
+    """Device metadata recorded on new sessions (shown in session listings)."""
+    user_agent = request.headers.get("user-agent")
+    return ClientDevice(
+        user_agent=user_agent[:255] if user_agent else None,
+        ip_address=request.client.host if request.client else None,
+    )
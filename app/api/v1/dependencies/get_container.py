@@ -0,0 +1,7 @@
+from fastapi import Request
+from ....core.container import Container
+
+
+def get_container(request: Request) -> Container:
+    # Built once in the app lifespan (see app/main.py)
+    return request.app.state.container
@@ -0,0 +1,23 @@
+import hmac
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from ....core.config import INTERNAL_API_TOKEN
+
+bearer_auth = HTTPBearer(auto_error=False)
+
+
+def require_internal_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_auth),
+):
+    """Gate /internal/* behind INTERNAL_API_TOKEN (404 when it isn't configured)."""
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if credentials is None or not hmac.compare_digest(
+        INTERNAL_API_TOKEN.encode(), credentials.credentials.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid internal token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
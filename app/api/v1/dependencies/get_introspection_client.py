@@ -0,0 +1,37 @@
+import hmac
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from ....core.config import INTROSPECTION_CLIENTS
+
+basic_auth = HTTPBasic(auto_error=False)
+
+
+def _parse_clients(raw: str | None) -> dict[str, str]:
+    clients = {}
+    for entry in (raw or "").split(","):
+        client_id, _, secret = entry.strip().partition(":")
+        if client_id and secret:
+            clients[client_id] = secret
+    return clients
+
+
+_clients = _parse_clients(INTROSPECTION_CLIENTS)
+
+
+def authenticate_introspection_client(
+    credentials: HTTPBasicCredentials | None = Depends(basic_auth),
+) -> str:
+    """Authenticate the calling resource server (HTTP Basic) and return its id."""
+    if not _clients:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    expected = _clients.get(credentials.username) if credentials else None
+    if expected is None or not hmac.compare_digest(
+        expected.encode(), credentials.password.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return credentials.username
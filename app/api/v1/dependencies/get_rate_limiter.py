@@ -1,22 +1,28 @@
-from fastapi import Request, Depends, HTTPException
+import math
+from fastapi import Request, Response, Depends, HTTPException
 from ....schema.auth_dto import LoginDTO
-from ....core.redis import get_redis
-from ....domain.auth.rate_limit_service import RateLimitService
+from ....core.container import Container
+from ....domain.auth.rate_limit_service import RateLimitExceededError, RateLimitService
+from .get_container import get_container
 
 async def enforce_login_rate_limit(
-    request: Request, 
-    payload: LoginDTO, 
-    redis_client = Depends(get_redis)
+    request: Request,
+    response: Response,
+    payload: LoginDTO,
+    container: Container = Depends(get_container)
 ) -> RateLimitService:
     ip = request.client.host
     email = payload.email.strip().lower()
-    
-    svc = RateLimitService(redis_client)
+
+    svc = container.rate_limiter
     try:
-        await svc.check_and_increment(ip, email)
-        return svc
-    except ValueError:
+        result = await svc.check_and_increment(ip, email)
+    except RateLimitExceededError as exc:
+        minutes = max(1, math.ceil(exc.result.retry_after_seconds / 60))
         raise HTTPException(
-            status_code=429, 
-            detail="Too many login attempts. Please try again in 15 minutes."
+            status_code=429,
+            detail=f"Too many login attempts. Please try again in {minutes} minutes.",
+            headers=exc.result.headers(),
         )
+    response.headers.update(result.headers())
+    return svc
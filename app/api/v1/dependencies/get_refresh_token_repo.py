@@ -1,9 +1,10 @@
+from fastapi import Depends
+from ....core.container import Container
 from ....domain.abstracts.refresh_token_abstract import IOpaqueRefreshToken
-from ....repositories.postgreSQL.refresh_token_repo import (
-    PostgresRefreshTokenRepository,
-)
-from ....core.db import AsyncSessionLocal
+from .get_container import get_container
 
 
-def get_refresh_tokens_repo() -> IOpaqueRefreshToken:
-    return PostgresRefreshTokenRepository(AsyncSessionLocal)
+def get_refresh_tokens_repo(
+    container: Container = Depends(get_container),
+) -> IOpaqueRefreshToken:
+    return container.refresh_tokens_repo
@@ -0,0 +1,53 @@
+from fastapi import Depends
+from ....core.container import Container
+from ....domain.auth.auth_service import AuthService
+from ....domain.auth.token_service import TokenService
+from ....domain.auth.introspection_service import IntrospectionService
+from ....domain.auth.session_service import SessionService
+from ....domain.users.user_service import UserService
+from ....domain.users.email_verification_service import EmailVerificationService
+from ....domain.users.password_reset_service import PasswordResetService
+from ....domain.users.google_oauth_service import GoogleAuthService
+from .get_container import get_container
+
+
+def get_auth_service(container: Container = Depends(get_container)) -> AuthService:
+    return container.auth_service
+
+
+def get_token_service(container: Container = Depends(get_container)) -> TokenService:
+    return container.token_service
+
+
+def get_introspection_service(
+    container: Container = Depends(get_container),
+) -> IntrospectionService:
+    return container.introspection_service
+
+
+def get_session_service(
+    container: Container = Depends(get_container),
+) -> SessionService:
+    return container.session_service
+
+
+def get_user_service(container: Container = Depends(get_container)) -> UserService:
+    return container.user_service
+
+
+def get_email_verification_service(
+    container: Container = Depends(get_container),
+) -> EmailVerificationService:
+    return container.email_verification_service
+
+
+def get_password_reset_service(
+    container: Container = Depends(get_container),
+) -> PasswordResetService:
+    return container.password_reset_service
+
+
+def get_google_auth_service(
+    container: Container = Depends(get_container),
+) -> GoogleAuthService:
+    return container.google_auth_service
@@ -0,0 +1,8 @@
+from fastapi import Depends
+from ....core.container import Container
+from ....domain.abstracts.token_digest_abstract import TokenDigest
+from .get_container import get_container
+
+
+def get_token_digest(container: Container = Depends(get_container)) -> TokenDigest:
+    return container.token_digest
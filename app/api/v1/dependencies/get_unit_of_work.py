@@ -0,0 +1,32 @@
+from fastapi import Depends, HTTPException
+from ....core.container import Container
+from ....core.unit_of_work import UnitOfWork
+from .get_container import get_container
+
+
+async def get_unit_of_work(container: Container = Depends(get_container)):
+    """
+    One DB session and transaction for the whole request.
+
+    Declare it with scope="function" so the commit happens before the
+    response is sent. Client errors (4xx) still commit: a route may have
+    revoked a reused token family or burned a one-time token before
+    rejecting the request, and that has to stick. Anything else rolls back.
+    """
+    error = None
+    async with UnitOfWork(container.session_factory) as uow:
+        try:
+            yield uow
+        except HTTPException as exc:
+            if exc.status_code >= 500:
+                raise
+            error = exc
+    if error is not None:
+        raise error
+
+
+# Only for routes that make several DB calls back to back. Routes that would
+# hold the connection across an Argon2 hash or an outgoing email (login,
+# register, password reset) leave it out; their repository calls still run
+# in short transactions of their own.
+unit_of_work = Depends(get_unit_of_work, scope="function")
@@ -1,19 +1,20 @@
-from ....core.db import AsyncSessionLocal
+from fastapi import Depends
+from ....core.container import Container
 from ....domain.abstracts.user_abstract import IUserRepository
 from ....domain.abstracts.password_hasher_abstract import PasswordHasher
 from ....domain.abstracts.password_reset_abstract import IPasswordResetToken
-from ....utils.password_hasher import Argon2PasswordHasher
-from ....repositories.postgreSQL.user_repo_postgres import PostgresUserRepository
-from ....repositories.postgreSQL.password_reset_repo import PasswordResetTokenRepo
+from .get_container import get_container
 
 
-def get_user_repo() -> IUserRepository:
-    return PostgresUserRepository(AsyncSessionLocal)
+def get_user_repo(container: Container = Depends(get_container)) -> IUserRepository:
+    return container.user_repo
 
 
-def get_hasher() -> PasswordHasher:
-    return Argon2PasswordHasher()
+def get_hasher(container: Container = Depends(get_container)) -> PasswordHasher:
+    return container.hasher
 
 
-def get_pw_reset_repo() -> IPasswordResetToken:
-    return PasswordResetTokenRepo(AsyncSessionLocal)
+def get_pw_reset_repo(
+    container: Container = Depends(get_container),
+) -> IPasswordResetToken:
+    return container.pw_reset_repo
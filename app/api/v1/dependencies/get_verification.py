@@ -1,15 +1,18 @@
-from ....core.db import AsyncSessionLocal
+from fastapi import Depends
+from ....core.container import Container
 from ....domain.abstracts.email_verify_abstract import IEmailRepository
-from ....repositories.postgreSQL.email_verify_tokens_repo import EmailVerifyTokensRepo
 from ....core.mailer import ResendMailer
+from .get_container import get_container
 
 
-def get_verification_repo() -> IEmailRepository:
-    return EmailVerifyTokensRepo(AsyncSessionLocal)
+def get_verification_repo(
+    container: Container = Depends(get_container),
+) -> IEmailRepository:
+    return container.verification_repo
 
 
 # Get mailer
 
 
-def get_mailer() -> ResendMailer:
-    return ResendMailer()
+def get_mailer(container: Container = Depends(get_container)) -> ResendMailer:
+    return container.mailer
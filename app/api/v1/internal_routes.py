@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from ...core.container import Container
+from ...core.pools import db_pool_stats, redis_pool_stats
+from ...core.token import access_token_cache
+from ...repositories.cache.user_repo_cached import CachingUserRepository
+from ..v1.dependencies.get_container import get_container
+from ..v1.dependencies.get_internal_caller import require_internal_token
+
+router = APIRouter(
+    prefix="/internal",
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False,
+)
+
+
+@router.get("/pools")
+async def pools(container: Container = Depends(get_container)):
+    """
+    This worker's Postgres, replica, shard and Redis pool usage and checkout
+    wait times, plus the counters of its hasher, limiter and caches.
+    """
+    hasher_stats = getattr(container.hasher, "stats", None)
+    return {
+        "postgres": db_pool_stats(container.engine),
+        "redis": redis_pool_stats(container.redis),
+        "replicas": container.replicas.stats(),
+        "shards": container.shards.stats() if container.shards else None,
+        "login_rate_limiter": container.rate_limiter.stats(),
+        "password_hasher": hasher_stats() if hasher_stats else None,
+        "access_token_cache": access_token_cache.stats(),
+        "revocations": container.revocations.stats(),
+        "user_cache": (
+            container.user_repo.stats()
+            if isinstance(container.user_repo, CachingUserRepository)
+            else None
+        ),
+    }
@@ -6,21 +6,26 @@ from ...schema.user_dto import (
     ResetPasswordDTO,
     NewPasswordDTO,
 )  # user creation DTO
-from ...domain.abstracts.password_hasher_abstract import PasswordHasher
 from ...domain.abstracts.user_abstract import IUserRepository
-from ...domain.abstracts.email_verify_abstract import IEmailRepository
-from ...domain.abstracts.refresh_token_abstract import IOpaqueRefreshToken
-from ...domain.abstracts.password_reset_abstract import IPasswordResetToken
 from ...domain.users.user_service import UserService
 from ...domain.users.google_oauth_service import GoogleAuthService
 from ...domain.users.email_verification_service import EmailVerificationService
 from ...domain.users.password_reset_service import PasswordResetService
 from ...domain.auth.token_service import TokenService  # refresh toke service
-from ...core.mailer import ResendMailer
 from ...core.token import create_access_token
-from .dependencies.get_verification import get_verification_repo, get_mailer
-from ..v1.dependencies.get_refresh_token_repo import get_refresh_tokens_repo
-from ..v1.dependencies.get_user_repo import get_user_repo, get_hasher, get_pw_reset_repo
+from ..v1.dependencies.get_user_repo import get_user_repo
+from ..v1.dependencies.get_client_device import get_client_device
+from ...domain.abstracts.refresh_token_abstract import ClientDevice
+
+# application-scoped services (see app/core/container.py)
+from ..v1.dependencies.get_unit_of_work import unit_of_work
+from ..v1.dependencies.get_services import (
+    get_user_service,
+    get_token_service,
+    get_email_verification_service,
+    get_password_reset_service,
+    get_google_auth_service,
+)
 
 router = APIRouter()
 
@@ -28,16 +33,9 @@ router = APIRouter()
 @router.post("/auth/register")
 async def register(
     payload: UserCreateDTO,
-    user_repo: IUserRepository = Depends(get_user_repo),
-    hasher: PasswordHasher = Depends(get_hasher),
-    verification_repo: IEmailRepository = Depends(get_verification_repo),
-    mailer: ResendMailer = Depends(get_mailer),
+    svc: UserService = Depends(get_user_service),
 ):
 
-    email_svc = EmailVerificationService(
-        verification_repo=verification_repo, mailer=mailer, hasher=hasher
-    )
-    svc = UserService(user_repo, hasher, email_svc)
     try:
         await svc.register(payload)
         return {"message": "Verification email sent to your email address."}
@@ -45,21 +43,15 @@ async def register(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/auth/verify-email")
+@router.get("/auth/verify-email", dependencies=[unit_of_work])
 async def verify_email(
     token: str,
     response: Response,
     user_repo: IUserRepository = Depends(get_user_repo),
-    verification_repo: IEmailRepository = Depends(get_verification_repo),
-    mailer: ResendMailer = Depends(get_mailer),
-    hasher: PasswordHasher = Depends(get_hasher),
-    token_repo: IOpaqueRefreshToken = Depends(get_refresh_tokens_repo),
+    svc: EmailVerificationService = Depends(get_email_verification_service),
+    rt: TokenService = Depends(get_token_service),
+    device: ClientDevice = Depends(get_client_device),
 ):
-    svc = EmailVerificationService(
-        verification_repo=verification_repo, mailer=mailer, hasher=hasher
-    )
-
-    rt = TokenService(refresh_token_repo=token_repo, hasher=hasher)
 
     try:
         user_id = await svc.verify_token(token)
@@ -69,7 +61,7 @@ async def verify_email(
 
         # Login user after verification
         access_token = create_access_token(sub=str(user.id), role=[user.role])
-        refresh_token_raw = await rt._issue_refresh_token(user.id)
+        refresh_token_raw, _ = await rt._issue_refresh_token(user.id, device)
 
         response.set_cookie(
             key="refresh_token",
@@ -86,18 +78,16 @@ async def verify_email(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/auth/google")
+@router.post("/auth/google", dependencies=[unit_of_work])
 async def google_auth(
     token: str,
     response: Response,
-    user_repo: IUserRepository = Depends(get_user_repo),
-    token_service: TokenService = Depends(get_refresh_tokens_repo),
-    hasher: PasswordHasher = Depends(get_hasher),
+    google_svc: GoogleAuthService = Depends(get_google_auth_service),
+    device: ClientDevice = Depends(get_client_device),
 ):
-    google_svc = GoogleAuthService(users=user_repo, tokens=token_service, hasher=hasher)
 
     try:
-        access, refresh_token_raw, user = await google_svc.login_with_google(token)
+        access, refresh_token_raw, user = await google_svc.login_with_google(token, device)
         # Set cookies
         response.set_cookie(
             key="refresh_token",
@@ -117,19 +107,9 @@ async def google_auth(
 @router.post("/auth/reset-password")
 async def request_reset(
     payload: ResetPasswordDTO,
-    password_reset_repo: IPasswordResetToken = Depends(get_pw_reset_repo),
-    user_repo: IUserRepository = Depends(get_user_repo),
-    mailer: ResendMailer = Depends(get_mailer),
-    hasher: PasswordHasher = Depends(get_hasher),
+    svc: PasswordResetService = Depends(get_password_reset_service),
 ):
 
-    svc = PasswordResetService(
-        password_reset_repo=password_reset_repo,
-        user_repo=user_repo,
-        mailer=mailer,
-        hasher=hasher,
-    )
-
     await svc.create_and_send_token(payload)
     return {"message": "If that email exists, a reset link will be sent."}
 
@@ -139,18 +119,9 @@ async def request_reset(
 async def confirm_password(
     token: str,
     payload: NewPasswordDTO,
-    password_reset_repo: IPasswordResetToken = Depends(get_pw_reset_repo),
     user_repo: IUserRepository = Depends(get_user_repo),
-    mailer: ResendMailer = Depends(get_mailer),
-    hasher: PasswordHasher = Depends(get_hasher),
+    svc: PasswordResetService = Depends(get_password_reset_service),
 ):
 
-    svc = PasswordResetService(
-        password_reset_repo=password_reset_repo,
-        user_repo=user_repo,
-        mailer=mailer,
-        hasher=hasher,
-    )
-
     await svc.reset_password(token, payload, user_repo)
     return {"message": "Password updated successfully."}
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from ...core.config import JWKS_MAX_AGE_SECONDS
+from ...core import token
+
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    """Public keys resource servers use to verify our access tokens offline."""
+    # Rotation pre-publishes keys, so caching for max-age never misses a kid we sign with
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE_SECONDS}"
+    if token.signing_keys is None:
+        return {"keys": []}
+    return token.signing_keys.jwks()
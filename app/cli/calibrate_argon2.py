@@ -0,0 +1,118 @@
+"""
+Benchmark Argon2id on this host and pick a cost profile.
+
+Usage:
+    python -m app.cli.calibrate_argon2 --target-p50-ms 150 --target-p99-ms 300 --max-memory-mib 64
+
+Memory is the main defence against GPU cracking, so we start from the highest
+memory cost allowed and only then spend the remaining latency budget on
+time_cost. The result is printed as .env lines (ARGON2_*), ready to be set for
+the node class that was benchmarked. Logins with hashes made under a different
+profile are rehashed transparently (see AuthService.login).
+"""
+
+import argparse
+import statistics
+import time
+
+# OWASP floor for Argon2id
+MIN_MEMORY_MIB = 19
+MAX_TIME_COST = 10
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int, samples: int):
+    """Hash `samples` times with the given params and return (p50_ms, p99_ms)."""
+    from argon2 import PasswordHasher as _PH, Type
+
+    ph = _PH(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        type=Type.ID,
+    )
+    ph.hash("warm-up")
+
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        ph.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), _percentile(timings, 99)
+
+
+def calibrate(
+    target_p50_ms: float,
+    target_p99_ms: float,
+    max_memory_mib: int,
+    parallelism: int = 1,
+    samples: int = 20,
+) -> dict | None:
+    """Return the most expensive profile within the latency targets, or None."""
+    memory_mib = max_memory_mib
+    while memory_mib >= MIN_MEMORY_MIB:
+        memory_cost = memory_mib * 1024
+        best = None
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            p50, p99 = measure(time_cost, memory_cost, parallelism, samples)
+            print(
+                f"  t={time_cost} m={memory_mib}MiB p={parallelism}: "
+                f"p50={p50:.1f}ms p99={p99:.1f}ms"
+            )
+            if p50 > target_p50_ms or p99 > target_p99_ms:
+                break
+            best = {
+                "time_cost": time_cost,
+                "memory_cost": memory_cost,
+                "parallelism": parallelism,
+                "p50_ms": p50,
+                "p99_ms": p99,
+            }
+        # OWASP recommends t>=2 at the 19 MiB floor; t=1 is fine with more memory
+        if best and (memory_mib > MIN_MEMORY_MIB or best["time_cost"] >= 2):
+            return best
+        memory_mib //= 2
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target-p50-ms", type=float, default=150)
+    parser.add_argument("--target-p99-ms", type=float, default=300)
+    parser.add_argument("--max-memory-mib", type=int, default=64)
+    parser.add_argument("--parallelism", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print("Calibrating Argon2id on this host...")
+    profile = calibrate(
+        target_p50_ms=args.target_p50_ms,
+        target_p99_ms=args.target_p99_ms,
+        max_memory_mib=args.max_memory_mib,
+        parallelism=args.parallelism,
+        samples=args.samples,
+    )
+    if profile is None:
+        print(
+            f"No profile with at least {MIN_MEMORY_MIB} MiB meets the targets; "
+            "raise the latency targets or use a bigger node."
+        )
+        return 1
+
+    print(
+        f"\nSelected profile (p50={profile['p50_ms']:.1f}ms, "
+        f"p99={profile['p99_ms']:.1f}ms):\n"
+    )
+    print(f"ARGON2_TIME_COST={profile['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={profile['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={profile['parallelism']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,406 @@
+"""
+Bulk-import users from a CSV or JSONL file.
+
+Usage:
+    python -m app.cli.import_users users.csv
+    python -m app.cli.import_users users.jsonl --batch-size 5000 --workers 8 --verified
+
+Each row needs `name`, `email` and either `password` (plaintext, hashed here
+with the configured ARGON2_* profile on a process pool) or `password_hash`
+(an existing Argon2 hash, stored as is). An optional `is_verified` column
+overrides --verified per row.
+
+Rows are streamed and loaded in batches: COPY into a temporary staging table,
+then one INSERT ... ON CONFLICT (email) DO NOTHING into users. Memory stays
+bounded by the batch size whatever the file size. Rows whose email already
+exists (or repeats within the file) and rows that fail validation are written
+to the report file (default: <file>.rejected.csv) and skipped.
+
+After every committed batch the number of rows consumed is saved to the
+checkpoint file (default: <file>.checkpoint); rerunning the same command
+resumes after the last committed batch. Delete the checkpoint to start over.
+If the tool dies between a commit and the checkpoint write, that batch is
+loaded again on resume and its rows are reported as duplicates.
+
+With DATABASE_SHARD_URLS set, each batch's emails are first claimed in the
+email index on DATABASE_URL (emails taken there count as duplicates), then
+every shard gets its share of the batch.
+
+Connect straight to Postgres rather than through PgBouncer's transaction
+pooling: the staging table lives in the session.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+import uuid
+from contextlib import AsyncExitStack
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pydantic.networks import validate_email
+from ..core.config import ARGON2_MEMORY_COST, ARGON2_PARALLELISM, ARGON2_TIME_COST
+from ..core.db import engine
+from ..core.shards import ShardRouter, build_shard_router
+from ..utils.password_hasher import _init_worker, _worker_hash
+
+# Same floor as UserCreateDTO.password
+MIN_PASSWORD_LENGTH = 8
+NAME_MAX_LENGTH = 150
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n", ""}
+
+STAGING_COLUMNS = ("row_no", "id", "name", "email", "hashed_password", "is_verified")
+
+_CREATE_STAGING = """
+CREATE TEMPORARY TABLE user_import_staging (
+    row_no bigint NOT NULL,
+    id uuid NOT NULL,
+    name varchar(150) NOT NULL,
+    email varchar(255) NOT NULL,
+    hashed_password varchar(255) NOT NULL,
+    is_verified boolean NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+# Staged rows that didn't make it into users are duplicates: of an existing
+# account, or of an earlier row in the same batch (ORDER BY row_no keeps the first)
+_MERGE_STAGING = """
+WITH inserted AS (
+    INSERT INTO users (id, name, email, hashed_password, role, provider, is_verified)
+    SELECT id, name, email, hashed_password, 'user', 'local', is_verified
+    FROM user_import_staging
+    ORDER BY row_no
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email
+){index}
+SELECT s.row_no, s.email
+FROM user_import_staging s
+LEFT JOIN inserted i ON i.id = s.id
+WHERE i.id IS NULL
+ORDER BY s.row_no
+"""
+# Unsharded imports keep user_email_index current, like the repositories do
+# (see index_email in app/core/shards.py); sharded ones claimed it already
+_INDEX_INSERTED = """,
+indexed AS (
+    INSERT INTO user_email_index (email, user_id)
+    SELECT email, id FROM inserted
+    ON CONFLICT (email) DO UPDATE SET user_id = EXCLUDED.user_id, claimed_at = now()
+)"""
+
+
+@dataclass(slots=True)
+class ImportRow:
+    row_no: int
+    name: str
+    email: str
+    is_verified: bool
+    password: str | None = None
+    password_hash: str | None = None
+    user_id: uuid.UUID | None = None
+
+
+@dataclass
+class Batch:
+    last_row_no: int
+    rows: list[ImportRow] = field(default_factory=list)
+    rejected: list[tuple[int, str, str]] = field(default_factory=list)
+
+
+def read_rows(path: str, fmt: str):
+    """Yield (row_no, row) lazily; row is a dict, or None for a malformed JSONL line."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            yield from enumerate(csv.DictReader(fh), start=1)
+            return
+        row_no = 0
+        for line in fh:
+            if not line.strip():
+                continue
+            row_no += 1
+            try:
+                yield row_no, json.loads(line)
+            except ValueError:
+                yield row_no, None
+
+
+def parse_row(row_no: int, row, *, verified: bool) -> ImportRow:
+    """Validate one input row; raises ValueError with the reason it's rejected."""
+    if not isinstance(row, dict):
+        raise ValueError("malformed row")
+
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError("name too long")
+
+    # Normalised the way UserService/AuthService do it
+    email = str(row.get("email") or "").strip().lower()
+    try:
+        validate_email(email)
+    except Exception:
+        raise ValueError("invalid email")
+
+    raw_verified = row.get("is_verified")
+    if raw_verified is None:
+        is_verified = verified
+    else:
+        flag = str(raw_verified).strip().lower()
+        if flag not in _TRUE | _FALSE:
+            raise ValueError("invalid is_verified")
+        is_verified = flag in _TRUE
+
+    password_hash = row.get("password_hash") or None
+    password = row.get("password") or None
+    if password_hash:
+        # Anything else couldn't be verified at login
+        if not str(password_hash).startswith("$argon2"):
+            raise ValueError("unsupported password hash")
+        return ImportRow(row_no, name, email, is_verified, password_hash=str(password_hash))
+    if password is None:
+        raise ValueError("missing password")
+    if len(str(password)) < MIN_PASSWORD_LENGTH:
+        raise ValueError("password too short")
+    return ImportRow(row_no, name, email, is_verified, password=str(password))
+
+
+def next_batch(rows, size: int, *, verified: bool) -> Batch | None:
+    """Validate up to `size` rows from the iterator, or None once it's exhausted."""
+    batch = None
+    for row_no, row in islice(rows, size):
+        batch = batch or Batch(last_row_no=row_no)
+        batch.last_row_no = row_no
+        try:
+            batch.rows.append(parse_row(row_no, row, verified=verified))
+        except ValueError as exc:
+            email = row.get("email", "") if isinstance(row, dict) else ""
+            batch.rejected.append((row_no, email, str(exc)))
+    return batch
+
+
+async def hash_batch(batch: Batch, executor: ProcessPoolExecutor) -> Batch:
+    loop = asyncio.get_running_loop()
+    pending = [row for row in batch.rows if row.password_hash is None]
+    hashes = await asyncio.gather(
+        *(loop.run_in_executor(executor, _worker_hash, row.password) for row in pending)
+    )
+    for row, hashed in zip(pending, hashes):
+        row.password_hash, row.password = hashed, None
+    return batch
+
+
+class Checkpoint:
+    """Rows consumed and running totals, rewritten atomically after each batch."""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self.rows = 0
+        self.inserted = 0
+        self.rejected = 0
+
+    @classmethod
+    def load(cls, path: str, source: str) -> "Checkpoint":
+        checkpoint = cls(path, source)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data["source"] != source:
+                raise SystemExit(f"{path} belongs to an import of {data['source']}")
+            checkpoint.rows = data["rows"]
+            checkpoint.inserted = data["inserted"]
+            checkpoint.rejected = data["rejected"]
+        return checkpoint
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "source": self.source,
+                    "rows": self.rows,
+                    "inserted": self.inserted,
+                    "rejected": self.rejected,
+                },
+                fh,
+            )
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+
+async def load_batch(
+    conn, rows: list[ImportRow], *, index_emails: bool = True
+) -> list[tuple[int, str, str]]:
+    """COPY rows into users; returns the rows skipped as duplicates."""
+    records = [
+        (
+            row.row_no,
+            row.user_id or uuid.uuid4(),
+            row.name,
+            row.email,
+            row.password_hash,
+            row.is_verified,
+        )
+        for row in rows
+    ]
+    async with conn.transaction():
+        await conn.copy_records_to_table(
+            "user_import_staging", records=records, columns=STAGING_COLUMNS
+        )
+        skipped = await conn.fetch(
+            _MERGE_STAGING.format(index=_INDEX_INSERTED if index_emails else "")
+        )
+    return [(r["row_no"], r["email"], "duplicate email") for r in skipped]
+
+
+async def load_sharded_batch(shards: ShardRouter, connect, rows: list[ImportRow]):
+    """Claim the emails in the directory, then load each shard's rows."""
+    claims, duplicates = {}, []
+    for row in rows:
+        if row.email in claims:
+            duplicates.append((row.row_no, row.email, "duplicate email"))
+        else:
+            row.user_id = claims[row.email] = shards.new_user_id()
+    claimed = await shards.claim_emails(claims)
+
+    by_shard = {}
+    for row in rows:
+        if row.user_id is None:
+            continue  # repeats an earlier row, already reported
+        if row.email not in claimed:
+            duplicates.append((row.row_no, row.email, "duplicate email"))
+            continue
+        by_shard.setdefault(shards.shard_for(row.user_id, write=True), []).append(row)
+
+    # Claims of rows that never reached their shard are given back
+    pending = {email: claims[email] for email in claimed}
+    try:
+        for shard, shard_rows in by_shard.items():
+            duplicates += await load_batch(
+                await connect(shard.engine), shard_rows, index_emails=False
+            )
+            for row in shard_rows:
+                pending.pop(row.email)
+    finally:
+        if pending:
+            await shards.release_emails(pending)
+    return duplicates
+
+
+async def _run(args) -> int:
+    source = os.path.abspath(args.file)
+    fmt = args.format or ("jsonl" if source.endswith((".jsonl", ".ndjson")) else "csv")
+    checkpoint = Checkpoint.load(args.checkpoint or f"{source}.checkpoint", source)
+    report_path = args.report or f"{source}.rejected.csv"
+
+    # A row was either committed or reported before the checkpoint moved past
+    # it, so on resume the report is appended to and the file skipped ahead.
+    resuming = checkpoint.rows > 0
+    rows = islice(read_rows(source, fmt), checkpoint.rows, None)
+    if resuming:
+        print(f"resuming after row {checkpoint.rows}")
+
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers or os.cpu_count() or 1,
+        initializer=_init_worker,
+        initargs=(ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM),
+    )
+    shards = build_shard_router()
+    started = time.perf_counter()
+    imported_now = 0
+    try:
+        with open(report_path, "a" if resuming else "w", newline="", encoding="utf-8") as fh:
+            report = csv.writer(fh)
+            if not resuming:
+                report.writerow(("row", "email", "reason"))
+
+            async with AsyncExitStack() as stack:
+                connections = {}
+
+                async def connect(target):
+                    # One connection (and staging table) per database
+                    if target not in connections:
+                        sa_conn = await stack.enter_async_context(target.connect())
+                        raw = await sa_conn.get_raw_connection()
+                        await raw.driver_connection.execute(_CREATE_STAGING)
+                        connections[target] = raw.driver_connection
+                    return connections[target]
+
+                batch = next_batch(rows, args.batch_size, verified=args.verified)
+                hashing = asyncio.ensure_future(hash_batch(batch, executor)) if batch else None
+                while hashing is not None:
+                    batch = await hashing
+                    # Hash the next batch while this one is being loaded
+                    upcoming = next_batch(rows, args.batch_size, verified=args.verified)
+                    hashing = (
+                        asyncio.ensure_future(hash_batch(upcoming, executor))
+                        if upcoming
+                        else None
+                    )
+
+                    if not batch.rows:
+                        duplicates = []
+                    elif shards is None:
+                        duplicates = await load_batch(await connect(engine), batch.rows)
+                    else:
+                        await shards.load_map()  # picks up buckets frozen meanwhile
+                        duplicates = await load_sharded_batch(shards, connect, batch.rows)
+                    rejected = sorted(batch.rejected + duplicates)
+                    report.writerows(rejected)
+                    fh.flush()
+
+                    inserted = len(batch.rows) - len(duplicates)
+                    imported_now += inserted
+                    checkpoint.rows = batch.last_row_no
+                    checkpoint.inserted += inserted
+                    checkpoint.rejected += len(rejected)
+                    checkpoint.save()
+
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"rows {checkpoint.rows}: {checkpoint.inserted} imported, "
+                        f"{checkpoint.rejected} rejected ({imported_now / elapsed:.0f} users/s)"
+                    )
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if shards is not None:
+            await shards.stop()
+        await engine.dispose()
+
+    print(f"done: {checkpoint.inserted} imported, {checkpoint.rejected} rejected")
+    if checkpoint.rejected:
+        print(f"rejected rows: {report_path}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file", help="CSV (with a header row) or JSONL file")
+    parser.add_argument(
+        "--format", choices=("csv", "jsonl"), help="Default: from the file extension"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Hashing processes (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--verified",
+        action="store_true",
+        help="Mark imported users as verified unless the row says otherwise",
+    )
+    parser.add_argument("--checkpoint", help="Default: <file>.checkpoint")
+    parser.add_argument("--report", help="Rejected rows CSV (default: <file>.rejected.csv)")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
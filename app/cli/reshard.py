@@ -0,0 +1,349 @@
+"""
+Inspect and change which shard owns which users (DATABASE_SHARD_URLS).
+
+Usage:
+    python -m app.cli.reshard status
+    python -m app.cli.reshard init                 # new cluster, before the first start
+    python -m app.cli.reshard move 12 40-47 --to 2
+    python -m app.cli.reshard rebalance --dry-run
+    python -m app.cli.reshard index                # rebuild user_email_index
+    python -m app.cli.reshard cleanup              # drop rows a shard no longer owns
+
+Users live in SHARD_BUCKET_COUNT buckets (see app/core/shards.py). Moves
+happen online, a step of buckets at a time:
+
+1. the step's buckets are frozen: the API still reads them, but answers
+   writes with 503;
+2. after the map fence (3x SHARD_MAP_REFRESH_SECONDS) every worker has seen
+   the freeze, so their users and tokens are copied to the new shard in
+   batches;
+3. the map points at the new shard and the buckets are unfrozen;
+4. after another fence no worker reads the old copies, which are deleted.
+
+Writes to a step's users are blocked for the copy only, a few seconds per
+bucket. A bucket whose users still hold live tokens minted before sharding
+was enabled is skipped: those token ids don't carry the user's bucket. They
+move to it on their next refresh, or expire.
+
+A new cluster can spread its buckets with `init` before any worker starts;
+otherwise the first worker puts every bucket on shard 0 and `rebalance`
+spreads them.
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import delete, func, insert, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..core.config import SHARD_BUCKET_COUNT
+from ..core.db import AsyncSessionLocal, engine
+from ..core.shards import (
+    BUCKET_MASK,
+    SEED_MAP,
+    SELECT_MAP,
+    Shard,
+    ShardRouter,
+    build_shard_router,
+)
+from ..models.email_verification_model import EmailVerificationToken
+from ..models.password_reset_tokens import PasswordResetToken
+from ..models.refresh_token_model import RefreshToken
+from ..models.shard_directory_model import ShardBucket, UserEmailIndex
+from ..models.user_model import User
+
+USERS = User.__table__
+# Everything else keyed by user; copied after and deleted before the users
+TOKEN_TABLES = (
+    EmailVerificationToken.__table__,
+    PasswordResetToken.__table__,
+    RefreshToken.__table__,
+)
+# On top of the map fence, for requests that checked the map just before it
+FENCE_MARGIN_SECONDS = 2
+
+
+def bucket_sql(column: str) -> str:
+    """SQL for bucket_of(): the last four hex digits of a uuid or hex id, masked."""
+    return f"(('x' || right({column}::text, 4))::bit(16)::int & {BUCKET_MASK})"
+
+
+def _in_buckets(buckets: list[int]):
+    return literal_column(bucket_sql("users.id")).in_(buckets)
+
+
+def parse_buckets(specs: list[str]) -> list[int]:
+    """'12', '40-47' -> bucket numbers."""
+    buckets = set()
+    for spec in specs:
+        first, _, last = spec.partition("-")
+        buckets.update(range(int(first), int(last or first) + 1))
+    if not buckets or min(buckets) < 0 or max(buckets) >= SHARD_BUCKET_COUNT:
+        raise SystemExit(f"Buckets must be between 0 and {SHARD_BUCKET_COUNT - 1}")
+    return sorted(buckets)
+
+
+def plan_rebalance(owners: list[int], shard_count: int) -> list[tuple[int, int]]:
+    """(bucket, target) moves that leave every shard with an equal share."""
+    share, extra = divmod(len(owners), shard_count)
+    quota = [share + (1 if index < extra else 0) for index in range(shard_count)]
+    held: list[list[int]] = [[] for _ in range(shard_count)]
+    for bucket, shard in enumerate(owners):
+        held[shard].append(bucket)
+
+    surplus = []
+    for shard, buckets in enumerate(held):
+        surplus += buckets[quota[shard]:]
+    moves = []
+    for shard, buckets in enumerate(held):
+        for _ in range(quota[shard] - len(buckets)):
+            moves.append((surplus.pop(), shard))
+    return sorted(moves)
+
+
+async def _fence(router: ShardRouter):
+    await asyncio.sleep(router.max_map_age + FENCE_MARGIN_SECONDS)
+
+
+async def _set_buckets(buckets: list[int], **values):
+    async with AsyncSessionLocal.begin() as session:
+        await session.execute(
+            update(ShardBucket).where(ShardBucket.bucket.in_(buckets)).values(**values)
+        )
+
+
+async def legacy_tokens(shard: Shard, bucket: int) -> int:
+    """Live tokens on `shard` whose id and user disagree about `bucket`."""
+    total = 0
+    async with shard.engine.connect() as conn:
+        for table in TOKEN_TABLES:
+            live = "NOT revoked AND " if "revoked" in table.c else ""
+            total += await conn.scalar(
+                text(
+                    f"SELECT count(*) FROM {table.name} "
+                    f"WHERE {live}expires_at > now() "
+                    f"AND ({bucket_sql('user_id')} = :bucket) <> ({bucket_sql('id')} = :bucket)"
+                ),
+                {"bucket": bucket},
+            )
+    return total
+
+
+async def delete_buckets(shard: Shard, buckets: list[int], batch_size: int) -> int:
+    deleted = 0
+    while True:
+        async with shard.engine.begin() as conn:
+            ids = list(
+                await conn.scalars(
+                    select(USERS.c.id).where(_in_buckets(buckets)).limit(batch_size)
+                )
+            )
+            if not ids:
+                return deleted
+            for table in TOKEN_TABLES:
+                await conn.execute(delete(table).where(table.c.user_id.in_(ids)))
+            await conn.execute(delete(USERS).where(USERS.c.id.in_(ids)))
+        deleted += len(ids)
+
+
+async def copy_bucket(source: Shard, target: Shard, bucket: int, batch_size: int) -> int:
+    # Leftovers of an interrupted earlier move would collide with the copy
+    await delete_buckets(target, [bucket], batch_size)
+    copied, after = 0, None
+    while True:
+        stmt = select(USERS).where(_in_buckets([bucket])).order_by(USERS.c.id).limit(batch_size)
+        if after is not None:
+            stmt = stmt.where(USERS.c.id > after)
+        async with source.engine.connect() as conn:
+            users = [dict(row) for row in (await conn.execute(stmt)).mappings()]
+            if not users:
+                return copied
+            ids = [user["id"] for user in users]
+            tokens = {
+                table: [
+                    dict(row)
+                    for row in (
+                        await conn.execute(select(table).where(table.c.user_id.in_(ids)))
+                    ).mappings()
+                ]
+                for table in TOKEN_TABLES
+            }
+        async with target.engine.begin() as conn:
+            await conn.execute(insert(USERS), users)
+            for table, rows in tokens.items():
+                if rows:
+                    await conn.execute(insert(table), rows)
+        copied += len(users)
+        after = ids[-1]
+
+
+async def move_step(router: ShardRouter, moves: list[tuple[int, int]], batch_size: int):
+    await router.load_map()
+    step = []
+    for bucket, target in moves:
+        source = router.bucket_owner(bucket)
+        if source.index == target:
+            continue
+        legacy = await legacy_tokens(source, bucket)
+        if legacy:
+            print(f"bucket {bucket}: skipped, {legacy} live tokens from before sharding")
+            continue
+        step.append((bucket, source, router.shards[target]))
+    if not step:
+        return
+    buckets = [bucket for bucket, _, _ in step]
+
+    await _set_buckets(buckets, frozen=True)
+    try:
+        await _fence(router)
+        for bucket, source, target in step:
+            copied = await copy_bucket(source, target, bucket, batch_size)
+            print(f"bucket {bucket}: {copied} users copied {source.name} -> {target.name}")
+        async with AsyncSessionLocal.begin() as session:
+            for bucket, _, target in step:
+                await session.execute(
+                    update(ShardBucket)
+                    .where(ShardBucket.bucket == bucket)
+                    .values(shard=target.index, frozen=False)
+                )
+    except BaseException:
+        # The old shard still has everything; the copies are removed by the next try
+        await _set_buckets(buckets, frozen=False)
+        raise
+
+    await _fence(router)
+    for bucket, source, _ in step:
+        await delete_buckets(source, [bucket], batch_size)
+
+
+async def _status(router: ShardRouter, args):
+    await router.load_map()
+    for shard in router.shards:
+        owned = [b for b in range(SHARD_BUCKET_COUNT) if router.bucket_owner(b) is shard]
+        async with shard.engine.connect() as conn:
+            users = await conn.scalar(select(func.count()).select_from(USERS))
+        print(f"shard {shard.index} {shard.name}: {len(owned)} buckets, {users} users")
+    frozen = [b for b in range(SHARD_BUCKET_COUNT) if router.is_frozen(b)]
+    if frozen:
+        print(f"frozen buckets: {frozen}")
+
+
+async def _init(router: ShardRouter, args):
+    async with AsyncSessionLocal.begin() as session:
+        if (await session.execute(SELECT_MAP)).first() is not None:
+            raise SystemExit("The bucket map already exists; use move or rebalance")
+        await session.execute(
+            SEED_MAP, {"shards": len(router.shards), "buckets": SHARD_BUCKET_COUNT}
+        )
+    print(f"{SHARD_BUCKET_COUNT} buckets spread over {len(router.shards)} shards")
+
+
+async def _move(router: ShardRouter, args):
+    if not 0 <= args.to < len(router.shards):
+        raise SystemExit(f"--to must be between 0 and {len(router.shards) - 1}")
+    buckets = parse_buckets(args.buckets)
+    for start in range(0, len(buckets), args.step):
+        chunk = buckets[start : start + args.step]
+        await move_step(router, [(bucket, args.to) for bucket in chunk], args.batch_size)
+
+
+async def _rebalance(router: ShardRouter, args):
+    await router.load_map()
+    owners = [router.bucket_owner(b).index for b in range(SHARD_BUCKET_COUNT)]
+    moves = plan_rebalance(owners, len(router.shards))
+    if args.dry_run or not moves:
+        for bucket, target in moves:
+            print(f"bucket {bucket}: shard {owners[bucket]} -> {target}")
+        print(f"{len(moves)} buckets to move")
+        return
+    for start in range(0, len(moves), args.step):
+        await move_step(router, moves[start : start + args.step], args.batch_size)
+
+
+async def _index(router: ShardRouter, args):
+    for shard in router.shards:
+        indexed, after = 0, None
+        while True:
+            stmt = (
+                select(USERS.c.email, USERS.c.id, USERS.c.created_at)
+                .order_by(USERS.c.id)
+                .limit(args.batch_size)
+            )
+            if after is not None:
+                stmt = stmt.where(USERS.c.id > after)
+            async with shard.engine.connect() as conn:
+                rows = (await conn.execute(stmt)).all()
+            if not rows:
+                break
+            async with AsyncSessionLocal.begin() as session:
+                await session.execute(
+                    pg_insert(UserEmailIndex)
+                    .values(
+                        [
+                            {"email": email, "user_id": user_id, "claimed_at": created_at}
+                            for email, user_id, created_at in rows
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=[UserEmailIndex.email])
+                )
+            indexed += len(rows)
+            after = rows[-1].id
+        print(f"shard {shard.index} {shard.name}: {indexed} users indexed")
+
+
+async def _cleanup(router: ShardRouter, args):
+    await router.load_map()
+    for shard in router.shards:
+        # Frozen buckets may be mid-move, with a copy on their target
+        foreign = [
+            b
+            for b in range(SHARD_BUCKET_COUNT)
+            if router.bucket_owner(b) is not shard and not router.is_frozen(b)
+        ]
+        deleted = await delete_buckets(shard, foreign, args.batch_size) if foreign else 0
+        print(f"shard {shard.index} {shard.name}: {deleted} users removed")
+
+
+async def _run(args) -> int:
+    router = build_shard_router()
+    if router is None:
+        raise SystemExit("DATABASE_SHARD_URLS is not set")
+    try:
+        await args.handler(router, args)
+    finally:
+        await router.stop()
+        await engine.dispose()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Users per copy batch")
+    commands = parser.add_subparsers(required=True)
+
+    commands.add_parser("status", help="Buckets and users per shard").set_defaults(
+        handler=_status
+    )
+    commands.add_parser("init", help="Spread the buckets of a new cluster").set_defaults(
+        handler=_init
+    )
+    move = commands.add_parser("move", help="Move buckets to one shard")
+    move.add_argument("buckets", nargs="+", help="Bucket numbers or ranges (40-47)")
+    move.add_argument("--to", type=int, required=True, help="Target shard number")
+    move.add_argument("--step", type=int, default=16, help="Buckets frozen at a time")
+    move.set_defaults(handler=_move)
+    rebalance = commands.add_parser("rebalance", help="Give every shard an equal share")
+    rebalance.add_argument("--step", type=int, default=16, help="Buckets frozen at a time")
+    rebalance.add_argument("--dry-run", action="store_true")
+    rebalance.set_defaults(handler=_rebalance)
+    commands.add_parser("index", help="Add missing users to user_email_index").set_defaults(
+        handler=_index
+    )
+    commands.add_parser("cleanup", help="Delete users a shard doesn't own").set_defaults(
+        handler=_cleanup
+    )
+
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+"""
+Rotate the access-token signing keys in JWT_KEYRING_PATH.
+
+Usage (e.g. from a daily cron job):
+    python -m app.cli.rotate_signing_keys
+
+Each run:
+  1. adds a new key that activates after --publish-ahead seconds, so it is in
+     every cached JWKS before the first token is signed with it
+  2. schedules the currently active key(s) to retire once every token they
+     signed has expired (activation + access token lifetime + --grace)
+  3. drops keys that are already retired
+
+The first run creates the keyring with a key that is active immediately.
+"""
+
+import argparse
+import os
+import time
+from ..core.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    JWKS_MAX_AGE_SECONDS,
+    JWT_KEYRING_PATH,
+)
+from ..core.signing_keys import generate_key, load_keyring_file, write_keyring_file
+
+
+def rotate(
+    keys: list[dict], publish_ahead: int, grace: int, now: float | None = None
+) -> tuple[list[dict], dict]:
+    """Return the rotated keyring and the newly added key."""
+    now = int(now if now is not None else time.time())
+    new_key = generate_key()
+
+    if not keys:
+        # bootstrap: nothing to overlap with, sign right away
+        new_key["activates_at"] = now
+        return [new_key], new_key
+
+    new_key["activates_at"] = now + publish_ahead
+    retire_at = new_key["activates_at"] + ACCESS_TOKEN_EXPIRE_MINUTES * 60 + grace
+
+    rotated = []
+    for entry in keys:
+        if entry["retires_at"] is not None and entry["retires_at"] <= now:
+            continue  # fully retired
+        if entry["retires_at"] is None:
+            entry["retires_at"] = retire_at
+        rotated.append(entry)
+    rotated.append(new_key)
+    return rotated, new_key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keyring", default=JWT_KEYRING_PATH)
+    parser.add_argument(
+        "--publish-ahead",
+        type=int,
+        default=2 * JWKS_MAX_AGE_SECONDS,
+        help="seconds a new key is published before it signs (default: 2x JWKS max-age)",
+    )
+    parser.add_argument(
+        "--grace",
+        type=int,
+        default=JWKS_MAX_AGE_SECONDS,
+        help="extra seconds old keys keep verifying after their last token expires",
+    )
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(args.keyring) or ".", exist_ok=True)
+    keys, new_key = rotate(
+        load_keyring_file(args.keyring), args.publish_ahead, args.grace
+    )
+    write_keyring_file(args.keyring, keys)
+
+    print(f"Added key {new_key['kid']} (activates at {new_key['activates_at']})")
+    for entry in keys:
+        print(
+            f"  kid={entry['kid']} activates_at={entry['activates_at']} "
+            f"retires_at={entry['retires_at']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""
+Run one expired-token sweep and exit.
+
+Usage (e.g. from cron, with TOKEN_SWEEP_ENABLED=false on the API workers):
+    python -m app.cli.sweep_tokens
+
+Uses the same settings as the in-process sweeper (TOKEN_SWEEP_*,
+TOKEN_RETENTION_DAYS, REFRESH_TOKEN_PARTITION_*). With DATABASE_SHARD_URLS set,
+every shard is swept in turn.
+"""
+
+import argparse
+import asyncio
+from ..core.db import engine
+from ..core.shards import build_shard_router
+from ..core.token_sweeper import build_token_sweeper
+
+
+async def _run() -> int:
+    shards = build_shard_router()
+    targets = [(s.name, s.engine) for s in shards.shards] if shards else [(None, engine)]
+    try:
+        for name, target in targets:
+            if name is not None:
+                print(f"[{name}]")
+            _print_report(await build_token_sweeper(target).run_once())
+    finally:
+        if shards is not None:
+            await shards.stop()
+        await engine.dispose()
+    return 0
+
+
+def _print_report(report):
+    if report is None:
+        print("Another sweeper holds the lock; nothing done")
+        return
+    for table, count in report["deleted"].items():
+        print(f"deleted {count} rows from {table}")
+    for name in report["created"]:
+        print(f"created partition {name}")
+    for name in report["dropped"]:
+        print(f"dropped partition {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args(argv)
+    return asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
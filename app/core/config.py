@@ -6,11 +6,92 @@ load_dotenv()
 
 # Async DB URL for asyncpg driver
 DATABASE_URL = os.getenv("DATABASE_URL")
+# SQLAlchemy pool per worker (defaults match SQLAlchemy's own)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))  # -1 => never
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# asyncpg prepared-statement cache per connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Behind PgBouncer in transaction mode: no cached or named prepared statements
+# (the sweeper's session advisory lock also needs a direct connection)
+DB_PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+# Streaming replicas for read-only repository calls ("url,url"; unset => primary only)
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS")
+# Replicas further behind than this are skipped until they catch up
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "1"))
+DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(
+    os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "2")
+)
+# ...and so are replicas that haven't heard from the primary for this long. An
+# idle primary still sends a keepalive every wal_sender_timeout / 2 (30s).
+DB_REPLICA_MAX_SILENCE_SECONDS = float(os.getenv("DB_REPLICA_MAX_SILENCE_SECONDS", "35"))
+# Hash-sharded user data ("url,url"; unset => everything on DATABASE_URL).
+# Append only: a shard's position in the list is its number in the bucket map.
+# DATABASE_URL keeps the bucket map and the email -> user id index.
+DATABASE_SHARD_URLS = os.getenv("DATABASE_SHARD_URLS")
+# User ids hash into this many buckets (power of two, fixed once the map exists)
+SHARD_BUCKET_COUNT = int(os.getenv("SHARD_BUCKET_COUNT", "1024"))
+# Workers reload the bucket map this often and stop writing if it gets 3x older
+SHARD_MAP_REFRESH_SECONDS = float(os.getenv("SHARD_MAP_REFRESH_SECONDS", "5"))
 SECRET_KEY = os.getenv("SECRET_KEY")
 SECRET_KEY_REFRESH = os.getenv("SECRET_KEY_REFRESH")
-ALGORITHM = "HS256"
+# Access token signing: "HS256" (shared SECRET_KEY) or "ES256" (keys from JWT_KEYRING_PATH)
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+JWT_KEYRING_PATH = os.getenv("JWT_KEYRING_PATH", "keys/jwt_keyring.json")
+# With ES256: HS256 tokens (signed with SECRET_KEY) are still accepted until this
+# ISO-8601 time, if they expire by then too. Set it to the switch-over plus
+# ACCESS_TOKEN_EXPIRE_MINUTES; unset rejects them.
+JWT_LEGACY_HS256_UNTIL = os.getenv("JWT_LEGACY_HS256_UNTIL")
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Per-worker Bloom filter of users whose access tokens were revoked
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+# Refresh token store: "postgres" or "redis" (needs a persistent, non-cluster Redis)
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "postgres")
+# Postgres repositories: "orm" (declarative models) or "core" (Core statements
+# returning slotted records; see benchmarks/query_layer_bench.py)
+DB_QUERY_LAYER = os.getenv("DB_QUERY_LAYER", "orm")
+# Expired token cleanup (see app/core/token_sweeper.py)
+TOKEN_SWEEP_ENABLED = os.getenv("TOKEN_SWEEP_ENABLED", "true").lower() == "true"
+TOKEN_SWEEP_INTERVAL_SECONDS = int(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", "1000"))
+TOKEN_SWEEP_BATCH_PAUSE_SECONDS = float(os.getenv("TOKEN_SWEEP_BATCH_PAUSE_SECONDS", "0.05"))
+TOKEN_SWEEP_MAX_BATCHES = int(os.getenv("TOKEN_SWEEP_MAX_BATCHES", "50"))  # per table per run
+# Expired tokens are kept this long (revoked refresh tokens still flag reuse)
+TOKEN_RETENTION_DAYS = int(os.getenv("TOKEN_RETENTION_DAYS", "7"))
+REFRESH_TOKEN_PARTITION_DAYS = int(os.getenv("REFRESH_TOKEN_PARTITION_DAYS", "7"))
+REFRESH_TOKEN_PARTITIONS_AHEAD = int(os.getenv("REFRESH_TOKEN_PARTITIONS_AHEAD", "2"))
+# Max verified access tokens cached per worker (0 disables the cache)
+ACCESS_TOKEN_CACHE_SIZE = int(os.getenv("ACCESS_TOKEN_CACHE_SIZE", "10000"))
+# Read-through user cache: per-worker LRU in front of a shared Redis tier.
+# Only verified users are cached; writes invalidate across workers via pub/sub.
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_LOCAL_SIZE = int(os.getenv("USER_CACHE_LOCAL_SIZE", "10000"))
+USER_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("USER_CACHE_LOCAL_TTL_SECONDS", "5"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "10"))
+# Login limiter keys tracked per worker: refuses known-exceeded keys without
+# Redis and keeps limiting (per worker) while Redis is down. 0 disables it.
+RATE_LIMIT_LOCAL_SIZE = int(os.getenv("RATE_LIMIT_LOCAL_SIZE", "10000"))
+# The login limiter falls back to that local state when Redis takes longer than
+# this (the Redis client itself has no timeout by default)
+RATE_LIMIT_REDIS_TIMEOUT_SECONDS = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT_SECONDS", "0.25"))
+
+# Keys for the refresh/verification/reset token digests.
+# Format: "version:key,version:key" (versions 1-255, highest is used for new tokens).
+# Falls back to a key derived from SECRET_KEY when unset.
+TOKEN_DIGEST_KEYS = os.getenv("TOKEN_DIGEST_KEYS")
+
+# Token introspection for resource servers / gateways
+# Format: "client_id:secret,client_id:secret" (endpoint is disabled when unset)
+INTROSPECTION_CLIENTS = os.getenv("INTROSPECTION_CLIENTS")
+INTROSPECTION_MAX_BATCH = int(os.getenv("INTROSPECTION_MAX_BATCH", "100"))
+# Upper bound for Cache-Control on introspection responses (keeps revocation visible)
+INTROSPECTION_MAX_CACHE_SECONDS = int(os.getenv("INTROSPECTION_MAX_CACHE_SECONDS", "60"))
 
 # Resend API Key
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
@@ -20,6 +101,30 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# 0 => unbounded; otherwise callers wait up to REDIS_POOL_TIMEOUT_SECONDS for a connection
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "0"))
+REDIS_POOL_TIMEOUT_SECONDS = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", "5"))
+# 0 => no timeout (pub/sub listeners block on reads, keep this above their idle time)
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", "0"))
+REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", "0")
+)
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", "0"))
+
+# Bearer token for /internal/* (pool statistics); endpoints are disabled when unset
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Password hashing
+# Argon2 cost profile; run `python -m app.cli.calibrate_argon2` on the target host to pick these
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+# "process" runs Argon2 on a dedicated process pool, "thread" on the default executor
+PASSWORD_HASHER_BACKEND = os.getenv("PASSWORD_HASHER_BACKEND", "process")
+HASHER_WORKERS = int(os.getenv("HASHER_WORKERS", "0"))  # 0 => one worker per CPU core
+HASHER_MAX_QUEUE = int(os.getenv("HASHER_MAX_QUEUE", "64"))
+HASHER_MEMORY_BUDGET_KIB = int(os.getenv("HASHER_MEMORY_BUDGET_KIB", "524288"))  # 512 MiB
+HASHER_RETRY_AFTER_SECONDS = int(os.getenv("HASHER_RETRY_AFTER_SECONDS", "1"))
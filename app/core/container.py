@@ -0,0 +1,231 @@
+import asyncio
+import structlog
+from sqlalchemy import text
+from .db import engine, AsyncSessionLocal
+from .redis import redis_client
+from .mailer import ResendMailer
+from .revocation import AccessTokenRevocations
+from .token_sweeper import build_token_sweeper
+from .replicas import build_replica_router
+from .shards import build_shard_router
+from .config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    DATABASE_REPLICA_URLS,
+    DB_QUERY_LAYER,
+    INTROSPECTION_MAX_CACHE_SECONDS,
+    RATE_LIMIT_LOCAL_SIZE,
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+    REVOCATION_FILTER_CAPACITY,
+    REFRESH_TOKEN_STORE,
+    REVOCATION_FILTER_ERROR_RATE,
+    TOKEN_SWEEP_ENABLED,
+    USER_CACHE_ENABLED,
+    USER_CACHE_LOCAL_SIZE,
+    USER_CACHE_LOCAL_TTL_SECONDS,
+    USER_CACHE_NEGATIVE_TTL_SECONDS,
+    USER_CACHE_TTL_SECONDS,
+)
+from ..utils.password_hasher import build_password_hasher
+from ..utils.token_digest import build_token_digest
+from ..repositories.postgreSQL.user_repo_postgres import PostgresUserRepository
+from ..repositories.postgreSQL.refresh_token_repo import PostgresRefreshTokenRepository
+from ..repositories.postgreSQL.user_repo_core import CoreUserRepository
+from ..repositories.postgreSQL.refresh_token_repo_core import CoreRefreshTokenRepository
+from ..repositories.redis.refresh_token_repo import RedisRefreshTokenRepository
+from ..repositories.cache.user_repo_cached import CachingUserRepository
+from ..repositories.postgreSQL.email_verify_tokens_repo import EmailVerifyTokensRepo
+from ..repositories.postgreSQL.password_reset_repo import PasswordResetTokenRepo
+from ..domain.auth.auth_service import AuthService
+from ..domain.auth.token_service import TokenService
+from ..domain.auth.rate_limit_service import RateLimitService
+from ..domain.auth.introspection_service import IntrospectionService
+from ..domain.auth.session_service import SessionService
+from ..domain.users.user_service import UserService
+from ..domain.users.email_verification_service import EmailVerificationService
+from ..domain.users.password_reset_service import PasswordResetService
+from ..domain.users.google_oauth_service import GoogleAuthService
+
+logger = structlog.get_logger(__name__)
+
+
+class Container:
+    """
+    Application-scoped dependencies, built once in the FastAPI lifespan.
+
+    Repositories and services are stateless apart from their collaborators, so
+    every request can share the same instances instead of rebuilding the
+    hasher, mailer and repositories each time.
+    """
+
+    def __init__(
+        self, *, db_engine=engine, session_factory=AsyncSessionLocal, redis=redis_client
+    ):
+        self.engine = db_engine
+        self.session_factory = session_factory
+        self.redis = redis
+
+        self.hasher = build_password_hasher()
+        self.token_digest = build_token_digest(legacy_hasher=self.hasher)
+        self.mailer = ResendMailer()
+        self.revocations = AccessTokenRevocations(
+            redis,
+            token_lifetime_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            capacity=REVOCATION_FILTER_CAPACITY,
+            error_rate=REVOCATION_FILTER_ERROR_RATE,
+        )
+        self.replicas = build_replica_router()
+        self.shards = build_shard_router()
+        if self.shards is not None and DATABASE_REPLICA_URLS:
+            # Replicas follow DATABASE_URL only; shards would need their own
+            raise ValueError("DATABASE_REPLICA_URLS can't be combined with DATABASE_SHARD_URLS")
+        # Each shard keeps its own token tables and partitions
+        sweep_engines = (
+            [shard.engine for shard in self.shards.shards] if self.shards else [db_engine]
+        )
+        self.token_sweepers = [build_token_sweeper(e) for e in sweep_engines]
+
+        # repositories
+        if DB_QUERY_LAYER == "core":
+            self.user_repo = CoreUserRepository(
+                session_factory, self.replicas, self.shards
+            )
+            postgres_refresh_repo = CoreRefreshTokenRepository
+        elif DB_QUERY_LAYER == "orm":
+            self.user_repo = PostgresUserRepository(
+                session_factory, self.replicas, self.shards
+            )
+            postgres_refresh_repo = PostgresRefreshTokenRepository
+        else:
+            raise ValueError(f"Unknown DB_QUERY_LAYER: {DB_QUERY_LAYER!r}")
+        if USER_CACHE_ENABLED:
+            self.user_repo = CachingUserRepository(
+                self.user_repo,
+                redis,
+                local_size=USER_CACHE_LOCAL_SIZE,
+                local_ttl_seconds=USER_CACHE_LOCAL_TTL_SECONDS,
+                ttl_seconds=USER_CACHE_TTL_SECONDS,
+                negative_ttl_seconds=USER_CACHE_NEGATIVE_TTL_SECONDS,
+            )
+        if REFRESH_TOKEN_STORE == "redis":
+            self.refresh_tokens_repo = RedisRefreshTokenRepository(redis)
+        elif REFRESH_TOKEN_STORE == "postgres":
+            self.refresh_tokens_repo = postgres_refresh_repo(session_factory, self.shards)
+        else:
+            raise ValueError(f"Unknown REFRESH_TOKEN_STORE: {REFRESH_TOKEN_STORE!r}")
+        self.verification_repo = EmailVerifyTokensRepo(
+            session_factory, self.replicas, self.shards
+        )
+        self.pw_reset_repo = PasswordResetTokenRepo(
+            session_factory, self.replicas, self.shards
+        )
+
+        # services
+        self.rate_limiter = RateLimitService(
+            redis,
+            local_size=RATE_LIMIT_LOCAL_SIZE,
+            redis_timeout_seconds=RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+        )
+        self.token_service = TokenService(self.refresh_tokens_repo, self.token_digest)
+        self.auth_service = AuthService(
+            self.user_repo,
+            self.hasher,
+            self.refresh_tokens_repo,
+            self.token_digest,
+            self.revocations,
+        )
+        self.session_service = SessionService(self.refresh_tokens_repo)
+        self.introspection_service = IntrospectionService(
+            self.revocations, max_cache_seconds=INTROSPECTION_MAX_CACHE_SECONDS
+        )
+        self.email_verification_service = EmailVerificationService(
+            verification_repo=self.verification_repo,
+            mailer=self.mailer,
+            digest=self.token_digest,
+        )
+        self.user_service = UserService(
+            self.user_repo, self.hasher, self.email_verification_service
+        )
+        self.password_reset_service = PasswordResetService(
+            password_reset_repo=self.pw_reset_repo,
+            user_repo=self.user_repo,
+            mailer=self.mailer,
+            hasher=self.hasher,
+            digest=self.token_digest,
+            refresh_token_repo=self.refresh_tokens_repo,
+            revocations=self.revocations,
+        )
+        self.google_auth_service = GoogleAuthService(
+            users=self.user_repo,
+            tokens=self.refresh_tokens_repo,
+            digest=self.token_digest,
+        )
+
+    async def startup(self):
+        """
+        Warm up pools so the first requests don't pay connection/fork cost.
+
+        If a step fails, everything started so far is shut down before the
+        error propagates: the lifespan only calls shutdown() once it has
+        yielded, so nothing else would stop the tasks and pools.
+        """
+        try:
+            await self._start()
+        except BaseException:
+            try:
+                await self.shutdown()
+            except Exception as exc:
+                await logger.awarning("container_startup_cleanup_failed", error=str(exc))
+            raise
+
+    async def _start(self):
+        await self._warm_db_pool()
+
+        try:
+            await self.redis.ping()
+        except Exception as exc:
+            # Redis only backs rate limiting; don't refuse to boot over it
+            await logger.awarning("redis_ping_failed", error=str(exc))
+
+        # keeps this worker's revocation filter in sync with other workers
+        self.revocations.start()
+        self.replicas.start()
+        if self.shards is not None:
+            # Loads the bucket map before the first request needs it
+            await self.shards.start()
+        if isinstance(self.user_repo, CachingUserRepository):
+            self.user_repo.start()
+        if TOKEN_SWEEP_ENABLED:
+            for sweeper in self.token_sweepers:
+                sweeper.start()
+
+        # Runs one real hash (also spins up the hasher's worker pool)
+        await self.hasher.hash("warm-up")
+
+        await logger.ainfo("container_started")
+
+    async def _warm_db_pool(self):
+        size = getattr(self.engine.pool, "size", lambda: 1)()
+
+        async def _ping():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        # Check out `size` connections at once so the pool actually opens them
+        await asyncio.gather(*(_ping() for _ in range(size)))
+
+    async def shutdown(self):
+        """Drain pools and close connections."""
+        await self.revocations.stop()
+        await self.replicas.stop()
+        if isinstance(self.user_repo, CachingUserRepository):
+            await self.user_repo.stop()
+        for sweeper in self.token_sweepers:
+            await sweeper.stop()
+        if self.shards is not None:
+            await self.shards.stop()
+        close = getattr(self.hasher, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+        await self.redis.aclose()
+        await self.engine.dispose()
+        await logger.ainfo("container_stopped")
@@ -1,27 +1,68 @@
+import uuid
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # from sqlalchemy import text
 
 # import database url form config
-from .config import DATABASE_URL
-
-# Create async engine connection pool + SQL compilations
-engine = create_async_engine(
+from .config import (
     DATABASE_URL,
-    echo=False,  # Set to False to stop duplicate/noisy SQL logging in terminal
-    future=True,
+    DB_MAX_OVERFLOW,
+    DB_PGBOUNCER_MODE,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_STATEMENT_CACHE_SIZE,
 )
+from .pools import TimedAsyncQueuePool
+
+# asyncpg's own statement cache, plus the one SQLAlchemy's adapter keeps
+connect_args = {
+    "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+}
+if DB_PGBOUNCER_MODE:
+    # In transaction mode consecutive statements may run on different server
+    # connections, so nothing can rely on a statement prepared earlier
+    connect_args = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+def make_engine(url: str):
+    """Async engine with the configured pool (used for the primary and replicas)."""
+    return create_async_engine(
+        url,
+        echo=False,  # Set to False to stop duplicate/noisy SQL logging in terminal
+        future=True,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
 
 
+def make_session_factory(bind):
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,  # This avoid needing to re-fetch objects after commit
+        autoflush=False,  # Disable auth flush for explicit control
+        future=True,
+    )
+
+
+# Create async engine connection pool + SQL compilations
+engine = make_engine(DATABASE_URL)
+
 # Async session factory
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,  # This avoid needing to re-fetch objects after commit
-    autoflush=False,  # Disable auth flush for explicit control
-    future=True,
-)
+AsyncSessionLocal = make_session_factory(engine)
 
 # Base class for ORM models
 Base = declarative_base()
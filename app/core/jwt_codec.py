@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from jose import JWTError, ExpiredSignatureError
+from jose.exceptions import JWTClaimsError
+
+try:
+    # Optional: noticeably faster than the stdlib for small claim sets
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - fallback when orjson isn't installed
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _header_segment(alg: str, kid: str | None = None) -> str:
+    # Same layout python-jose produces (sorted keys, compact separators);
+    # only built once per key so the stdlib encoder is fine here
+    header = {"alg": alg, "typ": "JWT"}
+    if kid is not None:
+        header["kid"] = kid
+    return _b64encode(json.dumps(header, separators=(",", ":"), sort_keys=True).encode())
+
+
+class JWTCodec:
+    """
+    Minimal JWT codec for the algorithms we issue (HS256, ES256).
+
+    python-jose rebuilds and re-serializes the header, re-derives the HMAC
+    key and converts datetimes on every call. Here the header segments are
+    built once, the keyed HMAC state is copied instead of re-keyed, and claims
+    are plain integer epochs. Tokens are interchangeable with python-jose in
+    both directions, and errors are raised as python-jose exceptions so
+    callers don't change.
+    """
+
+    def __init__(self, secret: str | None):
+        self._hs_header = _header_segment("HS256")
+        self._hmac = (
+            hmac.new(secret.encode(), digestmod=hashlib.sha256) if secret else None
+        )
+        self._es_headers: dict[str, str] = {}
+
+    def _sign_hs256(self, signing_input: bytes) -> bytes:
+        if self._hmac is None:
+            raise JWTError("No HMAC secret configured")
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode_hs256(self, claims: dict) -> str:
+        signing_input = f"{self._hs_header}.{_b64encode(_dumps(claims))}"
+        signature = self._sign_hs256(signing_input.encode())
+        return f"{signing_input}.{_b64encode(signature)}"
+
+    def encode_es256(self, claims: dict, kid: str, private_key) -> str:
+        """private_key is a cryptography EllipticCurvePrivateKey (P-256)."""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric.utils import (
+            decode_dss_signature,
+        )
+
+        header = self._es_headers.get(kid)
+        if header is None:
+            header = self._es_headers[kid] = _header_segment("ES256", kid)
+        signing_input = f"{header}.{_b64encode(_dumps(claims))}"
+
+        der = private_key.sign(signing_input.encode(), ec.ECDSA(hashes.SHA256()))
+        r, s = decode_dss_signature(der)
+        signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return f"{signing_input}.{_b64encode(signature)}"
+
+    def decode(
+        self, token: str, resolve_key=None, hs256_until: float | None = None
+    ) -> dict:
+        """
+        Verify a token and return its claims.
+
+        resolve_key(kid) must return a cryptography public key for ES256
+        tokens, or None if the kid is unknown. With `hs256_until` (epoch
+        seconds), HS256 tokens are only accepted before then, and only if
+        they expire by then too.
+        """
+        try:
+            header_seg, payload_seg, signature_seg = token.split(".")
+            signature = _b64decode(signature_seg)
+            if header_seg == self._hs_header:
+                alg, kid = "HS256", None
+            else:
+                header = _loads(_b64decode(header_seg))
+                alg, kid = header.get("alg"), header.get("kid")
+        except (ValueError, TypeError, AttributeError):
+            raise JWTError("Malformed token")
+
+        signing_input = f"{header_seg}.{payload_seg}".encode()
+
+        if alg == "HS256" and kid is None:
+            if hs256_until is not None and time.time() >= hs256_until:
+                raise JWTError("The specified alg value is not allowed")
+            if not hmac.compare_digest(self._sign_hs256(signing_input), signature):
+                raise JWTError("Signature verification failed.")
+        elif alg == "ES256" and kid is not None:
+            public_key = resolve_key(kid) if resolve_key else None
+            if public_key is None:
+                raise JWTError("Unknown signing key")
+            self._verify_es256(public_key, signing_input, signature)
+        else:
+            raise JWTError("The specified alg value is not allowed")
+
+        try:
+            claims = _loads(_b64decode(payload_seg))
+        except ValueError:
+            raise JWTError("Invalid payload")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+
+        if alg == "HS256" and hs256_until is not None:
+            exp = claims.get("exp")
+            if not isinstance(exp, (int, float)) or exp > hs256_until:
+                raise JWTClaimsError("HS256 token outlives the migration window")
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise JWTClaimsError("Expiration Time claim (exp) must be an integer.")
+            if exp < now:
+                raise ExpiredSignatureError("Signature has expired.")
+        nbf = claims.get("nbf")
+        if isinstance(nbf, (int, float)) and nbf > now:
+            raise JWTClaimsError("The token is not yet valid (nbf)")
+        return claims
+
+    @staticmethod
+    def _verify_es256(public_key, signing_input: bytes, signature: bytes):
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric.utils import (
+            encode_dss_signature,
+        )
+
+        if len(signature) != 64:
+            raise JWTError("Signature verification failed.")
+        der = encode_dss_signature(
+            int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+        )
+        try:
+            public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+        except InvalidSignature:
+            raise JWTError("Signature verification failed.")
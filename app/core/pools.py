@@ -0,0 +1,126 @@
+import time
+from redis.asyncio import BlockingConnectionPool, ConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolWaitStats:
+    """
+    How long callers waited to check a connection out of a pool.
+
+    `timeouts` counts checkouts that gave up waiting for a free slot (the pool
+    is exhausted); `connect_errors` those that failed to open or ping a
+    connection (the server is down or unreachable).
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connect_errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def as_dict(self) -> dict:
+        mean = self.total_wait / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connect_errors": self.connect_errors,
+            "wait_mean_ms": round(mean * 1000, 3),
+            "wait_max_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async engine pool, timing every checkout.
+
+    Covers the wait for a free slot plus opening a new connection or the
+    pre-ping, i.e. everything a request waits for before its first query.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        except DBAPIError:
+            self.wait_stats.connect_errors += 1
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return conn
+
+
+# What BlockingConnectionPool raises once `timeout` passes without a free slot
+_REDIS_POOL_EXHAUSTED = "No connection available."
+
+
+class _TimedRedisPool:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            conn = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError as exc:
+            if str(exc) == _REDIS_POOL_EXHAUSTED:
+                self.wait_stats.timeouts += 1
+            else:
+                self.wait_stats.connect_errors += 1
+            raise
+        except RedisError:
+            # e.g. a connect timeout
+            self.wait_stats.connect_errors += 1
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return conn
+
+
+class TimedRedisConnectionPool(_TimedRedisPool, ConnectionPool):
+    """Unbounded Redis pool (opens a connection whenever none is idle)."""
+
+
+class TimedBlockingRedisConnectionPool(_TimedRedisPool, BlockingConnectionPool):
+    """Bounded Redis pool: callers wait up to `timeout` for a free connection."""
+
+
+def db_pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # negative while the pool hasn't opened `size` connections yet
+        "overflow": pool.overflow(),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.as_dict())
+    return stats
+
+
+def redis_pool_stats(client) -> dict:
+    pool = client.connection_pool
+    stats = {
+        "max_connections": pool.max_connections,
+        "checked_out": len(pool._in_use_connections),
+        "idle": len(pool._available_connections),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.as_dict())
+    return stats
@@ -1,8 +1,32 @@
 import redis.asyncio as redis
-from .config import REDIS_URL
+from .config import (
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT_SECONDS,
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+    REDIS_SOCKET_TIMEOUT_SECONDS,
+    REDIS_URL,
+)
+from .pools import TimedBlockingRedisConnectionPool, TimedRedisConnectionPool
+
+pool_options = dict(
+    decode_responses=True,
+    socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS or None,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS or None,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+)
+if REDIS_MAX_CONNECTIONS > 0:
+    pool = TimedBlockingRedisConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT_SECONDS,
+        **pool_options,
+    )
+else:
+    pool = TimedRedisConnectionPool.from_url(REDIS_URL, **pool_options)
 
 # Create a global redis connection pool
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+redis_client = redis.Redis.from_pool(pool)
 # get redis client 
 async def get_redis():
     """FastAPI Dependency for Redis"""
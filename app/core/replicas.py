@@ -0,0 +1,230 @@
+import asyncio
+import itertools
+from typing import Awaitable, Callable, TypeVar
+import structlog
+from sqlalchemy import text
+from .config import (
+    DATABASE_REPLICA_URLS,
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_MAX_SILENCE_SECONDS,
+)
+from .db import make_engine, make_session_factory
+from .pools import db_pool_stats
+from .unit_of_work import pinned_to_primary, transaction
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# replay_lag: seconds the replica is behind; 0 when it has replayed everything
+# it received (an idle primary leaves pg_last_xact_replay_timestamp() old
+# without any lag). That only holds while it is still receiving, so also:
+# whether it is a standby at all (not promoted), whether its WAL receiver is
+# streaming, and how long since it last heard from the primary. The status
+# columns of pg_stat_wal_receiver need pg_read_all_stats (or pg_monitor).
+LAG_QUERY = text(
+    """
+    SELECT
+        pg_is_in_recovery() AS in_recovery,
+        COALESCE(r.status = 'streaming', false) AS streaming,
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END AS replay_lag,
+        EXTRACT(EPOCH FROM now() - r.last_msg_receipt_time) AS silence
+    FROM (SELECT 1) AS one
+    LEFT JOIN pg_stat_wal_receiver AS r ON true
+    """
+)
+
+
+def assess_replica(
+    in_recovery: bool,
+    streaming: bool,
+    replay_lag,
+    silence,
+    *,
+    max_lag: float,
+    max_silence: float,
+) -> tuple[float | None, bool]:
+    """(lag, healthy) from one LAG_QUERY row; lag is None when it can't be trusted."""
+    if not in_recovery or not streaming or silence is None:
+        # promoted, or the receiver is down: it may never catch up again
+        return None, False
+    lag = float(replay_lag)
+    return lag, lag <= max_lag and float(silence) <= max_silence
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = make_session_factory(engine)
+        self.lag: float | None = None  # None until the first successful check
+        self.healthy = False
+
+
+class ReplicaRouter:
+    """
+    Sends read-only repository calls to streaming replicas.
+
+    Reads round-robin over the replicas whose last measured lag is within
+    max_lag_seconds. A background task re-measures lag every interval; a
+    replica that lags too far, fails a query, was promoted, or isn't
+    streaming from the primary (or hasn't heard from it for
+    max_silence_seconds) is skipped until a check sees it healthy again. With no usable replica, reads go to the primary.
+
+    Reads stay on the primary inside a unit of work and for the rest of a
+    request once it has used the primary, so a flow always sees its own
+    writes.
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        *,
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+        max_silence_seconds: float = 35,
+    ):
+        self._replicas = replicas
+        self._max_lag = max_lag_seconds
+        self._max_silence = max_silence_seconds
+        self._interval = check_interval_seconds
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._task: asyncio.Task | None = None
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.rechecks = 0
+
+    def pick(self) -> Replica | None:
+        if self._cycle is None or pinned_to_primary():
+            return None
+        for _ in range(len(self._replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    async def read(
+        self,
+        primary_factory,
+        query: Callable[..., Awaitable[T]],
+        recheck: Callable[[T], bool] | None = None,
+    ) -> T:
+        """
+        Run `query(session)` on a replica if one is usable, else on the primary.
+
+        `recheck(result)` returning True means the replica may simply not have
+        caught up yet (e.g. a row that was just inserted is missing), so the
+        query is repeated on the primary.
+        """
+        replica = self.pick()
+        if replica is not None:
+            try:
+                async with replica.session_factory() as session:
+                    result = await query(session)
+                if recheck is None or not recheck(result):
+                    self.replica_reads += 1
+                    return result
+                self.rechecks += 1
+            except Exception as exc:
+                replica.healthy = False
+                await logger.awarning(
+                    "replica_read_failed", replica=replica.name, error=str(exc)
+                )
+
+        self.primary_reads += 1
+        async with transaction(primary_factory) as session:
+            return await query(session)
+
+    async def check_lag(self):
+        for replica in self._replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    row = (await conn.execute(LAG_QUERY)).one()
+                lag, healthy = assess_replica(
+                    *row, max_lag=self._max_lag, max_silence=self._max_silence
+                )
+            except Exception as exc:
+                lag, healthy = None, False
+                await logger.awarning(
+                    "replica_lag_check_failed", replica=replica.name, error=str(exc)
+                )
+            if healthy != replica.healthy:
+                log = logger.ainfo if healthy else logger.awarning
+                await log(
+                    "replica_routing_changed", replica=replica.name, healthy=healthy, lag=lag
+                )
+            replica.lag, replica.healthy = lag, healthy
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.check_lag()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await logger.awarning("replica_lag_loop_failed", error=str(exc))
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._replicas and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "rechecks": self.rechecks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lag_seconds": replica.lag,
+                    "pool": db_pool_stats(replica.engine),
+                }
+                for replica in self._replicas
+            ],
+        }
+
+
+async def read(
+    primary_factory,
+    query: Callable[..., Awaitable[T]],
+    replicas: ReplicaRouter | None = None,
+    recheck: Callable[[T], bool] | None = None,
+) -> T:
+    """Read-only repository call: through `replicas` when given, else the primary."""
+    if replicas is not None:
+        return await replicas.read(primary_factory, query, recheck)
+    async with transaction(primary_factory) as session:
+        return await query(session)
+
+
+def build_replica_router() -> ReplicaRouter:
+    replicas = []
+    for url in filter(None, (u.strip() for u in (DATABASE_REPLICA_URLS or "").split(","))):
+        engine = make_engine(url)
+        # host[:port]/db only, never the credentials
+        name = engine.url.render_as_string(hide_password=True).split("@")[-1]
+        replicas.append(Replica(name, engine))
+    return ReplicaRouter(
+        replicas,
+        max_lag_seconds=DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval_seconds=DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+        max_silence_seconds=DB_REPLICA_MAX_SILENCE_SECONDS,
+    )
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import math
+import time
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+EPOCH_KEY_PREFIX = "revocation:epoch:"
+CHANNEL = "revocation:events"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no deletes)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self._size = max(8, bits)
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # double hashing: k positions from two 64-bit hashes
+        return ((h1 + i * h2) % self._size for i in range(self._hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class AccessTokenRevocations:
+    """
+    Per-user revocation epochs for access tokens.
+
+    Revoking a user stores an issued-at floor in Redis (`revocation:epoch:<id>`):
+    any access token with iat below it is rejected. Each worker keeps a Bloom
+    filter of recently revoked user ids, fed by pub/sub, so the per-request
+    check is a local lookup and only a filter hit goes to Redis for the
+    authoritative epoch.
+
+    Epochs only matter for one access-token lifetime (older tokens have expired
+    anyway), so the Redis keys carry that TTL and the filter is kept as two
+    generations that rotate every lifetime window to bound memory.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        token_lifetime_seconds: int,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+    ):
+        self._redis = redis_client
+        self._window = token_lifetime_seconds
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotated_at = time.monotonic()
+        self._listener: asyncio.Task | None = None
+
+        self.checks = 0
+        self.filter_hits = 0
+        self.revoke_failures = 0
+
+    def _key(self, user_id) -> str:
+        return f"{EPOCH_KEY_PREFIX}{user_id}"
+
+    def _maybe_rotate(self):
+        if time.monotonic() - self._rotated_at >= self._window:
+            self._previous = self._current
+            self._current = BloomFilter(self._capacity, self._error_rate)
+            self._rotated_at = time.monotonic()
+
+    def _remember(self, user_id: str):
+        self._maybe_rotate()
+        self._current.add(user_id)
+
+    def _might_be_revoked(self, user_id: str) -> bool:
+        self._maybe_rotate()
+        return user_id in self._current or user_id in self._previous
+
+    async def revoke_user(self, user_id) -> bool:
+        """
+        Invalidate every access token issued to the user until now.
+
+        Best effort: callers run it after their database changes (refresh
+        tokens revoked, password replaced), which stand either way. If Redis
+        fails, the error is logged and counted and False is returned; the
+        user's access tokens then stay valid until they expire, at most one
+        token lifetime, since none can be refreshed.
+        """
+        user_id = str(user_id)
+        epoch = int(time.time())
+        # This worker rejects the user's tokens even if Redis is down
+        self._remember(user_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.set(self._key(user_id), epoch, ex=self._window + 60)
+                pipe.publish(CHANNEL, user_id)
+                await pipe.execute()
+        except Exception as exc:
+            self.revoke_failures += 1
+            await logger.awarning(
+                "access_token_revocation_failed", user_id=user_id, error=str(exc)
+            )
+            return False
+        await logger.ainfo("access_tokens_revoked", user_id=user_id, epoch=epoch)
+        return True
+
+    async def is_revoked(self, user_id, issued_at) -> bool:
+        user_id = str(user_id)
+        self.checks += 1
+        if not self._might_be_revoked(user_id):
+            return False
+
+        self.filter_hits += 1
+        try:
+            epoch = await self._redis.get(self._key(user_id))
+        except Exception as exc:
+            # A filter hit means this user was probably revoked; fail closed
+            await logger.awarning(
+                "revocation_lookup_failed", user_id=user_id, error=str(exc)
+            )
+            return True
+
+        if epoch is None:
+            return False  # false positive, or the epoch outlived every token
+        return issued_at is None or int(issued_at) < int(epoch)
+
+    async def _load_existing(self):
+        """Seed the filter with epochs set before this worker subscribed."""
+        async for key in self._redis.scan_iter(match=f"{EPOCH_KEY_PREFIX}*", count=1000):
+            self._remember(key[len(EPOCH_KEY_PREFIX):])
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # subscribe first, then scan, so nothing falls in between
+                await self._load_existing()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._remember(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await logger.awarning("revocation_listener_error", error=str(exc))
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "revoke_failures": self.revoke_failures,
+        }
@@ -0,0 +1,382 @@
+import asyncio
+import math
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+import structlog
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from .config import (
+    DATABASE_SHARD_URLS,
+    DATABASE_URL,
+    SHARD_BUCKET_COUNT,
+    SHARD_MAP_REFRESH_SECONDS,
+)
+from .db import AsyncSessionLocal, engine, make_engine, make_session_factory
+from .pools import db_pool_stats
+
+logger = structlog.get_logger(__name__)
+
+if not 0 < SHARD_BUCKET_COUNT <= 65536 or SHARD_BUCKET_COUNT & (SHARD_BUCKET_COUNT - 1):
+    raise ValueError("SHARD_BUCKET_COUNT must be a power of two, at most 65536")
+BUCKET_MASK = SHARD_BUCKET_COUNT - 1
+
+# A claim this old whose user never reached a shard (the signup died between
+# the two writes) is handed to the next signup for that email
+ORPHAN_CLAIM_GRACE_SECONDS = 60
+
+SELECT_MAP = text("SELECT bucket, shard, frozen FROM shard_buckets")
+# Bucket b goes to shard b % :shards; the workers seed with shards=1
+SEED_MAP = text(
+    """
+    INSERT INTO shard_buckets (bucket, shard)
+    SELECT b, b % :shards FROM generate_series(0, :buckets - 1) AS b
+    ON CONFLICT (bucket) DO NOTHING
+    """
+)
+_LOOKUP_EMAIL = text("SELECT user_id FROM user_email_index WHERE email = :email")
+_CLAIM = text(
+    """
+    INSERT INTO user_email_index (email, user_id)
+    SELECT * FROM unnest(CAST(:emails AS varchar[]), CAST(:user_ids AS uuid[]))
+    ON CONFLICT (email) DO NOTHING
+    RETURNING email
+    """
+)
+_STALE_CLAIMS = text(
+    """
+    SELECT email, user_id FROM user_email_index
+    WHERE email = ANY(CAST(:emails AS varchar[]))
+      AND claimed_at < now() - make_interval(secs => :grace)
+    """
+)
+_TAKE_OVER = text(
+    """
+    UPDATE user_email_index AS i SET user_id = c.new_id, claimed_at = now()
+    FROM unnest(
+        CAST(:emails AS varchar[]), CAST(:old_ids AS uuid[]), CAST(:new_ids AS uuid[])
+    ) AS c(email, old_id, new_id)
+    WHERE i.email = c.email AND i.user_id = c.old_id
+    RETURNING i.email
+    """
+)
+_RELEASE = text(
+    """
+    DELETE FROM user_email_index
+    WHERE (email, user_id) IN (
+        SELECT * FROM unnest(CAST(:emails AS varchar[]), CAST(:user_ids AS uuid[]))
+    )
+    """
+)
+# Without sharding, every new user is still indexed, in its own transaction,
+# so DATABASE_SHARD_URLS can be set later without missing anyone. A row left
+# for the email by a deleted user is taken over (users.email is unique).
+_INDEX_EMAIL = text(
+    """
+    INSERT INTO user_email_index (email, user_id) VALUES (:email, :user_id)
+    ON CONFLICT (email) DO UPDATE SET user_id = EXCLUDED.user_id, claimed_at = now()
+    """
+)
+_EXISTING_USERS = text("SELECT id FROM users WHERE id = ANY(CAST(:ids AS uuid[]))")
+
+
+def bucket_of(key) -> int:
+    """
+    Bucket of a user id, or of a token id minted by new_token_id().
+
+    Only the last four hex digits (the low 16 bits) count, so SQL can compute
+    the same bucket from a uuid or hex id column (see app/cli/reshard.py).
+    """
+    if isinstance(key, uuid.UUID):
+        return key.int & BUCKET_MASK
+    try:
+        return int(str(key)[-4:], 16) & BUCKET_MASK
+    except ValueError:
+        # Not one of our ids: route it anywhere, the lookup finds nothing
+        return zlib.crc32(str(key).encode()) & BUCKET_MASK
+
+
+def rekey(token_id: str, owner) -> str:
+    """`token_id` with its bucket bits replaced by the bucket of `owner`."""
+    return uuid.UUID(int=(int(token_id, 16) & ~BUCKET_MASK) | bucket_of(owner)).hex
+
+
+def new_token_id(owner) -> str:
+    """
+    Random token id (uuid4 hex) in the bucket of `owner` (a user id or one of
+    the user's token ids), so the row lives on its user's shard and can be
+    found by id alone.
+    """
+    return rekey(uuid.uuid4().hex, owner)
+
+
+class ShardUnavailableError(HTTPException):
+    """Writes to a bucket that is being moved (or with an outdated map); retry shortly."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class EmailTakenError(ValueError):
+    def __init__(self):
+        super().__init__("Email is already registered")
+
+
+class Shard:
+    def __init__(self, index: int, engine, session_factory):
+        self.index = index
+        self.engine = engine
+        self.session_factory = session_factory
+        # host[:port]/db only, never the credentials
+        self.name = engine.url.render_as_string(hide_password=True).split("@")[-1]
+
+
+class ShardRouter:
+    """
+    Spreads users, and their tokens, over several Postgres databases.
+
+    A user id hashes to one of SHARD_BUCKET_COUNT buckets and the bucket map
+    (shard_buckets, on DATABASE_URL) says which shard owns each bucket. Token
+    ids are minted in their user's bucket, so a token row lives next to its
+    user and is found by id without a directory lookup. Lookups by email go
+    through user_email_index, also on DATABASE_URL, straight to one shard.
+
+    Every worker reloads the map in the background. A bucket that
+    `python -m app.cli.reshard` is moving is frozen: reads still go to its
+    old shard, writes fail with 503 until the move is done. A worker whose
+    map is older than three refresh intervals refuses writes as well, so
+    once the tool has waited that long after freezing, nobody writes there.
+    """
+
+    def __init__(self, shards: list[Shard], directory_factory, *, refresh_interval_seconds: float):
+        self.shards = shards
+        self._directory = directory_factory
+        self._interval = refresh_interval_seconds
+        self._owners: list[int] = []
+        self._frozen: frozenset[int] = frozenset()
+        self._loaded_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def max_map_age(self) -> float:
+        return self._interval * 3
+
+    def _map_age(self) -> float:
+        if self._loaded_at is None:
+            return math.inf
+        return time.monotonic() - self._loaded_at
+
+    async def load_map(self):
+        async with self._directory.begin() as session:
+            rows = (await session.execute(SELECT_MAP)).all()
+            if not rows:
+                # First start with sharding: everything stays where it is (shard 0)
+                # until the resharding tool moves it
+                await session.execute(
+                    SEED_MAP, {"shards": 1, "buckets": SHARD_BUCKET_COUNT}
+                )
+                rows = (await session.execute(SELECT_MAP)).all()
+
+        if len(rows) != SHARD_BUCKET_COUNT:
+            raise RuntimeError(
+                f"shard_buckets has {len(rows)} buckets, SHARD_BUCKET_COUNT is {SHARD_BUCKET_COUNT}"
+            )
+        owners = [0] * SHARD_BUCKET_COUNT
+        frozen = set()
+        for bucket, shard, is_frozen in rows:
+            if shard >= len(self.shards):
+                raise RuntimeError(
+                    f"Bucket {bucket} is on shard {shard}, which DATABASE_SHARD_URLS doesn't list"
+                )
+            owners[bucket] = shard
+            if is_frozen:
+                frozen.add(bucket)
+        self._owners, self._frozen = owners, frozenset(frozen)
+        self._loaded_at = time.monotonic()
+
+    def bucket_owner(self, bucket: int) -> Shard:
+        return self.shards[self._owners[bucket]]
+
+    def is_frozen(self, bucket: int) -> bool:
+        return bucket in self._frozen
+
+    def shard_for(self, key, *, write: bool = False) -> Shard:
+        bucket = bucket_of(key)
+        if write and (bucket in self._frozen or self._map_age() > self.max_map_age):
+            raise ShardUnavailableError(math.ceil(self._interval))
+        return self.shards[self._owners[bucket]]
+
+    def new_user_id(self) -> uuid.UUID:
+        """Random user id in a bucket that can take writes right now."""
+        while True:
+            user_id = uuid.uuid4()
+            if bucket_of(user_id) not in self._frozen:
+                return user_id
+
+    async def lookup_email(self, email: str) -> uuid.UUID | None:
+        async with self._directory() as session:
+            return await session.scalar(_LOOKUP_EMAIL, {"email": email})
+
+    async def claim_emails(self, claims: dict[str, uuid.UUID]) -> set[str]:
+        """
+        Record email -> user id for new users; returns the emails claimed.
+
+        The claims commit on their own, before the users are written to their
+        shards, so two signups for one email can't both succeed. An email
+        whose claim is older than ORPHAN_CLAIM_GRACE_SECONDS but whose user
+        doesn't exist was left by a failed signup, and is taken over.
+        """
+        emails = list(claims)
+        async with self._directory.begin() as session:
+            claimed = set(
+                await session.scalars(
+                    _CLAIM, {"emails": emails, "user_ids": list(claims.values())}
+                )
+            )
+            held = [email for email in emails if email not in claimed]
+            stale = (
+                (
+                    await session.execute(
+                        _STALE_CLAIMS,
+                        {"emails": held, "grace": ORPHAN_CLAIM_GRACE_SECONDS},
+                    )
+                ).all()
+                if held
+                else []
+            )
+        if not stale:
+            return claimed
+
+        orphans = await self._missing_users(dict(stale))
+        if orphans:
+            async with self._directory.begin() as session:
+                taken = await session.scalars(
+                    _TAKE_OVER,
+                    {
+                        "emails": list(orphans),
+                        "old_ids": list(orphans.values()),
+                        "new_ids": [claims[email] for email in orphans],
+                    },
+                )
+                claimed.update(taken)
+        return claimed
+
+    async def release_emails(self, claims: dict[str, uuid.UUID]):
+        async with self._directory.begin() as session:
+            await session.execute(
+                _RELEASE, {"emails": list(claims), "user_ids": list(claims.values())}
+            )
+
+    async def _missing_users(self, owners: dict[str, uuid.UUID]) -> dict[str, uuid.UUID]:
+        by_shard: dict[Shard, list[uuid.UUID]] = {}
+        for user_id in owners.values():
+            by_shard.setdefault(self.shard_for(user_id), []).append(user_id)
+        existing = set()
+        for shard, ids in by_shard.items():
+            async with shard.session_factory() as session:
+                existing.update(await session.scalars(_EXISTING_USERS, {"ids": ids}))
+        return {email: user_id for email, user_id in owners.items() if user_id not in existing}
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.load_map()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Reads keep the old map; writes stop once it's too old
+                await logger.awarning("shard_map_refresh_failed", error=str(exc))
+
+    async def start(self):
+        await self.load_map()
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for shard in self.shards:
+            if shard.engine is not engine:
+                await shard.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "map_age_seconds": round(self._map_age(), 3) if self._loaded_at else None,
+            "frozen_buckets": sorted(self._frozen),
+            "shards": [
+                {
+                    "name": shard.name,
+                    "buckets": self._owners.count(shard.index),
+                    "pool": db_pool_stats(shard.engine),
+                }
+                for shard in self.shards
+            ],
+        }
+
+
+def route(default_factory, shards: ShardRouter | None, key, *, write: bool = False):
+    """Session factory of the shard that owns `key`; `default_factory` when unsharded."""
+    if shards is None:
+        return default_factory
+    return shards.shard_for(key, write=write).session_factory
+
+
+@asynccontextmanager
+async def claim_email(shards: ShardRouter | None, email: str):
+    """
+    Id for a new user. With sharding, `email` is claimed for it first (raises
+    EmailTakenError if it's taken) and released again if the block fails.
+    """
+    if shards is None:
+        yield uuid.uuid4()
+        return
+    user_id = shards.new_user_id()
+    if email not in await shards.claim_emails({email: user_id}):
+        raise EmailTakenError()
+    try:
+        yield user_id
+    except BaseException:
+        await shards.release_emails({email: user_id})
+        raise
+
+
+async def index_email(session, shards: ShardRouter | None, email: str, user_id):
+    """
+    Record a new user in user_email_index within `session`'s transaction.
+    With sharding, claim_email() already did (on DATABASE_URL).
+    """
+    if shards is None:
+        await session.execute(_INDEX_EMAIL, {"email": email, "user_id": user_id})
+
+
+def parse_shard_urls() -> list[str]:
+    return [url.strip() for url in (DATABASE_SHARD_URLS or "").split(",") if url.strip()]
+
+
+def build_shard_router() -> ShardRouter | None:
+    """Router over DATABASE_SHARD_URLS, or None when sharding is off."""
+    urls = parse_shard_urls()
+    if not urls:
+        return None
+    shards = []
+    for index, url in enumerate(urls):
+        if url == DATABASE_URL:
+            # Same pool (and session factory, so a unit of work shares its session)
+            shards.append(Shard(index, engine, AsyncSessionLocal))
+        else:
+            shard_engine = make_engine(url)
+            shards.append(Shard(index, shard_engine, make_session_factory(shard_engine)))
+    return ShardRouter(
+        shards, AsyncSessionLocal, refresh_interval_seconds=SHARD_MAP_REFRESH_SECONDS
+    )
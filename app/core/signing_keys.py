@@ -0,0 +1,149 @@
+import json
+import os
+import time
+import threading
+import uuid
+from jose import jwk
+
+# How often workers look at the keyring file for rotations
+RELOAD_INTERVAL_SECONDS = 60
+
+
+def generate_key(alg: str = "ES256") -> dict:
+    """Generate a new P-256 signing key entry (not yet activated)."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    if alg != "ES256":
+        raise ValueError(f"Unsupported signing algorithm: {alg}")
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    now = int(time.time())
+    return {
+        "kid": uuid.uuid4().hex,
+        "alg": alg,
+        "private_key": pem,
+        "created_at": now,
+        "activates_at": now,
+        "retires_at": None,
+    }
+
+
+def load_keyring_file(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["keys"]
+
+
+def write_keyring_file(path: str, keys: list[dict]):
+    # write-then-rename so workers never read a half written file
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"keys": keys}, f, indent=2)
+    os.replace(tmp, path)
+
+
+class SigningKeyRing:
+    """
+    Asymmetric access-token signing keys, preloaded from a JSON keyring file.
+
+    Each key has an activation and (optional) retirement time:
+      - the newest key whose activates_at has passed signs new tokens
+      - every key that isn't retired verifies tokens, selected by `kid`
+      - JWKS publishes keys before they activate, so resource servers that
+        cache the JWKS already know a key by the time we sign with it
+
+    Rotation happens out of process (app/cli/rotate_signing_keys.py); workers
+    pick up the rewritten file within RELOAD_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._entries: list[dict] = []
+        self._private: dict = {}
+        self._public: dict = {}
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except FileNotFoundError:
+            raise RuntimeError(
+                f"Signing keyring {self._path!r} not found; "
+                "create it with `python -m app.cli.rotate_signing_keys`"
+            )
+        entries = load_keyring_file(self._path)
+        private, public = {}, {}
+        for entry in entries:
+            key = jwk.construct(entry["private_key"], entry["alg"])
+            private[entry["kid"]] = key
+            public[entry["kid"]] = key.public_key()
+        if not entries:
+            raise RuntimeError(f"Signing keyring {self._path!r} has no keys")
+
+        self._entries = sorted(entries, key=lambda e: e["activates_at"])
+        self._private = private
+        self._public = public
+        self._mtime = mtime
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                if os.stat(self._path).st_mtime != self._mtime:
+                    self._load()
+            except (OSError, ValueError, RuntimeError):
+                # keep serving with the keys we already have
+                pass
+
+    def _is_live(self, entry: dict, now: float) -> bool:
+        return entry["retires_at"] is None or entry["retires_at"] > now
+
+    def signing_key(self):
+        """Return (kid, alg, key) for the key that should sign new tokens."""
+        self._maybe_reload()
+        now = time.time()
+        active = [
+            e for e in self._entries if e["activates_at"] <= now and self._is_live(e, now)
+        ]
+        if not active:
+            raise RuntimeError("No active signing key in keyring")
+        entry = active[-1]
+        return entry["kid"], entry["alg"], self._private[entry["kid"]]
+
+    def verification_key(self, kid: str):
+        """Return (alg, public key) for kid, or None if unknown or retired."""
+        self._maybe_reload()
+        if kid not in self._public:
+            # may have been added by a rotation we haven't picked up yet
+            self._maybe_reload(force=True)
+        entry = next((e for e in self._entries if e["kid"] == kid), None)
+        if entry is None or not self._is_live(entry, time.time()):
+            return None
+        return entry["alg"], self._public[kid]
+
+    def jwks(self) -> dict:
+        """Public JWK set of every non-retired key (including pre-published ones)."""
+        self._maybe_reload()
+        now = time.time()
+        keys = []
+        for entry in self._entries:
+            if not self._is_live(entry, now):
+                continue
+            public = self._public[entry["kid"]].to_dict()
+            public.update({"kid": entry["kid"], "use": "sig", "alg": entry["alg"]})
+            keys.append(public)
+        return {"keys": keys}
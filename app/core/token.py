@@ -1,31 +1,85 @@
-from datetime import datetime, timedelta
+import time
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
 from typing import Iterable
-from jose import jwt, JWTError
+from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi.security import HTTPBearer
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from ..core.config import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    ACCESS_TOKEN_CACHE_SIZE,
     SECRET_KEY,
     ALGORITHM,
     SECRET_KEY_REFRESH,
+    JWT_KEYRING_PATH,
+    JWT_LEGACY_HS256_UNTIL,
 )
+from .token_cache import VerifiedTokenCache
+from .signing_keys import SigningKeyRing
+from .jwt_codec import JWTCodec
 
 security = HTTPBearer()
 
+if ALGORITHM not in ("HS256", "ES256"):
+    raise RuntimeError(f"Unsupported ALGORITHM {ALGORITHM!r}; use HS256 or ES256")
+
+# Fast path for issuing/verifying our own tokens (see app/core/jwt_codec.py)
+_codec = JWTCodec(SECRET_KEY)
+
+# Preloaded asymmetric keys (kid -> key); None when signing with the shared secret
+signing_keys = SigningKeyRing(JWT_KEYRING_PATH) if ALGORITHM != "HS256" else None
+
+
+def _parse_until(value: str | None) -> float:
+    if not value:
+        return 0.0
+    until = datetime.fromisoformat(value)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    return until.timestamp()
+
+
+# Shared-secret tokens stop being accepted at this point once we sign with ES256;
+# None while HS256 is the signing algorithm
+legacy_hs256_until = _parse_until(JWT_LEGACY_HS256_UNTIL) if signing_keys else None
+
+# Clients reuse the same access token for its whole lifetime, so remember
+# which tokens we've already verified (per worker, bounded, evicted at exp).
+access_token_cache = VerifiedTokenCache(max_size=ACCESS_TOKEN_CACHE_SIZE)
+
 
 def create_access_token(
     sub: str, role: Iterable[str] | None = None, expires_delta: timedelta | None = None
 ) -> str:
-    now = datetime.utcnow()
+    now = int(time.time())
     if expires_delta is None:
         expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {
         "sub": str(sub),
         "role": list(role or []),
         "iat": now,
-        "exp": now + expires_delta,
+        "exp": now + int(expires_delta.total_seconds()),
     }
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if signing_keys is None:
+        return _codec.encode_hs256(to_encode)
+
+    kid, _, key = signing_keys.signing_key()
+    return _codec.encode_es256(to_encode, kid, key.prepared_key)
+
+
+def _resolve_public_key(kid: str):
+    found = signing_keys.verification_key(kid) if signing_keys else None
+    return found[1].prepared_key if found else None
+
+
+def _decode_access_token(token: str) -> dict:
+    """
+    Verify an access token, picking the key by its `kid` header.
+    Tokens without a kid are HS256 tokens signed with the shared secret. With
+    ES256 they are only accepted within JWT_LEGACY_HS256_UNTIL, for tokens
+    issued before the switch.
+    """
+    return _codec.decode(token, _resolve_public_key, legacy_hs256_until)
 
 
 # def create_refresh_token(sub: str, expires_delta: timedelta | None = None) -> str:
@@ -37,28 +91,46 @@ def create_access_token(
 
 
 def decode_token(token: str, refresh: bool = False) -> dict:
-    secret = SECRET_KEY_REFRESH if refresh else SECRET_KEY
     try:
-        payload = jwt.decode(token, secret, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiresSignatureError:
+        if refresh:
+            return jwt.decode(token, SECRET_KEY_REFRESH, algorithms=["HS256"])
+        return _decode_access_token(token)
+    except ExpiredSignatureError:
         raise Exception("Token expired")
-    except jwt.InvalidTokenError:
+    except JWTError:
         raise Exception("Invalid token")
 
 
-def get_current_user_id(credentials=Depends(security)) -> int:
+def verify_access_token(token: str) -> dict:
+    """Return the claims of a valid access token (cached), or raise JWTError."""
+    payload = access_token_cache.get(token)
+    if payload is None:
+        payload = _decode_access_token(token)
+        access_token_cache.put(token, payload)
+    return payload
+
+
+async def get_current_user_id(request: Request, credentials=Depends(security)) -> UUID:
     """Extract user_id from the access token (JWT)"""
     token = credentials.credentials
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
+        payload = verify_access_token(token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token missing subject")
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token missing subject")
 
-        return int(user_id)
+    try:
+        user_id = UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token subject")
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    # Logout / password reset revoke every access token issued before them
+    revocations = request.app.state.container.revocations
+    if await revocations.is_revoked(user_id, payload.get("iat")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    return user_id
@@ -0,0 +1,338 @@
+import asyncio
+import random
+import re
+from datetime import datetime, timedelta, timezone
+import structlog
+from sqlalchemy import text
+from .config import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    REFRESH_TOKEN_PARTITION_DAYS,
+    REFRESH_TOKEN_PARTITIONS_AHEAD,
+    TOKEN_RETENTION_DAYS,
+    TOKEN_SWEEP_BATCH_PAUSE_SECONDS,
+    TOKEN_SWEEP_BATCH_SIZE,
+    TOKEN_SWEEP_INTERVAL_SECONDS,
+    TOKEN_SWEEP_MAX_BATCHES,
+)
+
+logger = structlog.get_logger(__name__)
+
+PARTITIONED_TABLE = "refresh_tokens"
+DEFAULT_PARTITION = "refresh_tokens_default"
+# Tables whose expired rows are deleted in batches (refresh_tokens only when
+# it isn't partitioned yet; otherwise just its default partition)
+SWEPT_TABLES = ("email_verification_tokens", "reset_password_tokens")
+
+# Partition DDL gives up after this long waiting for its lock (a waiting
+# ALTER TABLE blocks logins and refreshes queued behind it) and retries on
+# the next sweep
+PARTITION_LOCK_TIMEOUT = "1s"
+
+# Shared by every worker so only one of them sweeps at a time
+ADVISORY_LOCK_KEY = 0x70CE_5EE9
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def parse_partition_bound(expr: str):
+    """(lower, upper) from pg_get_expr(relpartbound), None for DEFAULT/MINVALUE."""
+    match = _BOUND_RE.search(expr or "")
+    if match is None:
+        return None
+    return tuple(datetime.fromisoformat(value) for value in match.groups())
+
+
+def partitions_to_create(
+    bounds: list[tuple[datetime, datetime]],
+    now: datetime,
+    width: timedelta,
+    horizon: datetime,
+) -> list[tuple[datetime, datetime]]:
+    """Consecutive [lower, upper) ranges extending coverage up to horizon."""
+    if bounds:
+        lower = max(upper for _, upper in bounds)
+    else:
+        lower = now.astimezone(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+    ranges = []
+    while lower < horizon:
+        ranges.append((lower, lower + width))
+        lower += width
+    return ranges
+
+
+def partition_name(lower: datetime) -> str:
+    return f"{PARTITIONED_TABLE}_p{lower.astimezone(timezone.utc):%Y%m%d}"
+
+
+class TokenSweeper:
+    """
+    Deletes expired refresh, verification and reset tokens.
+
+    refresh_tokens is range-partitioned by expires_at: each run creates
+    partitions ahead of the newest expiry we can issue and detaches, then
+    drops, whole partitions once everything in them is past retention. The
+    partition DDL runs with a short lock_timeout and is retried next run
+    rather than queueing behind long transactions. The small tables
+    (and the default partition) are swept with bounded DELETE batches with a
+    pause in between, so the sweeper never holds long locks or floods WAL.
+
+    Rows are kept for `retention` after they expire: a revoked refresh token
+    must stay around to be recognised as reused.
+    """
+
+    def __init__(
+        self,
+        db_engine,
+        *,
+        interval_seconds: int,
+        retention: timedelta,
+        batch_size: int,
+        batch_pause_seconds: float,
+        max_batches: int,
+        partition_width: timedelta,
+        partitions_ahead: int,
+        max_token_lifetime: timedelta,
+    ):
+        self._engine = db_engine
+        self._interval = interval_seconds
+        self._retention = retention
+        self._batch_size = batch_size
+        self._batch_pause = batch_pause_seconds
+        self._max_batches = max_batches
+        self._width = partition_width
+        self._ahead = partitions_ahead
+        self._max_lifetime = max_token_lifetime
+        self._task: asyncio.Task | None = None
+
+        self.runs = 0
+        self.rows_deleted = 0
+        self.partitions_dropped = 0
+
+    async def run_once(self) -> dict | None:
+        """Sweep once; returns what was done, or None if another worker holds the lock."""
+        async with self._engine.connect() as conn:
+            # every batch commits on its own
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            )
+            if not locked:
+                return None
+            try:
+                return await self._sweep(conn)
+            finally:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY}
+                )
+
+    async def _sweep(self, conn) -> dict:
+        now = datetime.now(timezone.utc)
+        cutoff = now - self._retention
+        report = {"deleted": {}, "created": [], "dropped": []}
+
+        tables = list(SWEPT_TABLES)
+        if await self._is_partitioned(conn):
+            created, dropped = await self._maintain_partitions(conn, now, cutoff)
+            report["created"], report["dropped"] = created, dropped
+            tables.append(DEFAULT_PARTITION)
+        else:
+            tables.append(PARTITIONED_TABLE)
+
+        for table in tables:
+            report["deleted"][table] = await self._delete_expired(conn, table, cutoff)
+
+        self.runs += 1
+        self.rows_deleted += sum(report["deleted"].values())
+        self.partitions_dropped += len(report["dropped"])
+        await logger.ainfo("token_sweep_finished", **report)
+        return report
+
+    async def _is_partitioned(self, conn) -> bool:
+        relkind = await conn.scalar(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": PARTITIONED_TABLE},
+        )
+        return relkind == "p"
+
+    async def _partitions(self, conn) -> dict[str, tuple[datetime, datetime] | None]:
+        rows = await conn.execute(
+            text(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(:table)
+                """
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        return {name: parse_partition_bound(bound) for name, bound in rows}
+
+    async def _detach_pending(self, conn) -> set[str]:
+        """Partitions left half-detached by an interrupted DETACH ... CONCURRENTLY."""
+        rows = await conn.scalars(
+            text(
+                """
+                SELECT c.relname
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(:table)
+                  AND (to_jsonb(i) ->> 'inhdetachpending')::boolean
+                """
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        return set(rows)
+
+    async def _detached_leftovers(self, conn) -> list[str]:
+        """Our partitions that were detached but not dropped (the DROP timed out)."""
+        rows = await conn.scalars(
+            text(
+                """
+                SELECT relname FROM pg_class
+                WHERE relkind = 'r' AND NOT relispartition
+                  AND relname LIKE :pattern
+                  AND relnamespace = to_regnamespace(current_schema())
+                """
+            ),
+            {"pattern": PARTITIONED_TABLE.replace("_", r"\_") + r"\_p%"},
+        )
+        return sorted(rows)
+
+    async def _maintain_partitions(self, conn, now: datetime, cutoff: datetime):
+        await conn.execute(text(f"SET lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+        try:
+            return await self._create_and_drop(conn, now, cutoff)
+        finally:
+            # the connection goes back to the pool
+            await conn.execute(text("RESET lock_timeout"))
+
+    async def _create_and_drop(self, conn, now: datetime, cutoff: datetime):
+        partitions = await self._partitions(conn)
+        bounds = [b for b in partitions.values() if b is not None]
+
+        # newest possible expiry is now + token lifetime; stay `ahead` past it
+        horizon = now + self._max_lifetime + self._width * self._ahead
+        created = []
+        for lower, upper in partitions_to_create(bounds, now, self._width, horizon):
+            name = partition_name(lower)
+            try:
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} "
+                        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                    )
+                )
+            except Exception as exc:
+                # e.g. the default partition already holds rows in this range
+                await logger.awarning(
+                    "token_partition_create_failed", partition=name, error=str(exc)
+                )
+                break
+            created.append(name)
+
+        # Postgres only detaches CONCURRENTLY (without blocking the parent)
+        # when there's no default partition; otherwise the short lock_timeout
+        # bounds how long the detach can hold up other queries
+        concurrently = DEFAULT_PARTITION not in partitions
+        pending = await self._detach_pending(conn)
+        dropped = []
+        for name in await self._detached_leftovers(conn):
+            try:
+                await conn.execute(text(f"DROP TABLE {name}"))
+            except Exception as exc:
+                await logger.awarning(
+                    "token_partition_drop_deferred", partition=name, error=str(exc)
+                )
+            else:
+                dropped.append(name)
+        for name, bound in sorted(partitions.items()):
+            if bound is not None and bound[1] <= cutoff:
+                if await self._drop_partition(conn, name, concurrently, name in pending):
+                    dropped.append(name)
+        return created, dropped
+
+    async def _drop_partition(
+        self, conn, name: str, concurrently: bool, pending: bool
+    ) -> bool:
+        if pending:
+            detach = f"DETACH PARTITION {name} FINALIZE"
+        elif concurrently:
+            detach = f"DETACH PARTITION {name} CONCURRENTLY"
+        else:
+            detach = f"DETACH PARTITION {name}"
+        try:
+            await conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} {detach}"))
+            # Detached, dropping it only locks the partition itself
+            await conn.execute(text(f"DROP TABLE {name}"))
+        except Exception as exc:
+            # Usually the lock timeout behind a long transaction
+            await logger.awarning(
+                "token_partition_drop_deferred", partition=name, error=str(exc)
+            )
+            return False
+        return True
+
+    async def _delete_expired(self, conn, table: str, cutoff: datetime) -> int:
+        stmt = text(
+            f"DELETE FROM {table} WHERE id IN ("
+            f"SELECT id FROM {table} WHERE expires_at < :cutoff LIMIT :limit)"
+        )
+        deleted = 0
+        for _ in range(self._max_batches):
+            result = await conn.execute(
+                stmt, {"cutoff": cutoff, "limit": self._batch_size}
+            )
+            deleted += result.rowcount
+            if result.rowcount < self._batch_size:
+                break
+            await asyncio.sleep(self._batch_pause)
+        return deleted
+
+    async def _loop(self):
+        # spread workers out so they don't all race for the lock at boot
+        await asyncio.sleep(random.uniform(0, min(self._interval, 60)))
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await logger.awarning("token_sweep_failed", error=str(exc))
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "rows_deleted": self.rows_deleted,
+            "partitions_dropped": self.partitions_dropped,
+        }
+
+
+def build_token_sweeper(db_engine) -> TokenSweeper:
+    return TokenSweeper(
+        db_engine,
+        interval_seconds=TOKEN_SWEEP_INTERVAL_SECONDS,
+        retention=timedelta(days=TOKEN_RETENTION_DAYS),
+        batch_size=TOKEN_SWEEP_BATCH_SIZE,
+        batch_pause_seconds=TOKEN_SWEEP_BATCH_PAUSE_SECONDS,
+        max_batches=TOKEN_SWEEP_MAX_BATCHES,
+        partition_width=timedelta(days=REFRESH_TOKEN_PARTITION_DAYS),
+        partitions_ahead=REFRESH_TOKEN_PARTITIONS_AHEAD,
+        max_token_lifetime=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
@@ -0,0 +1,129 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+_current: ContextVar["UnitOfWork | None"] = ContextVar("unit_of_work", default=None)
+# Set once the current request has used the primary; later reads stay there
+_primary_used: ContextVar[bool] = ContextVar("primary_used", default=False)
+
+
+class UnitOfWork:
+    """
+    One session and one transaction shared by every repository call in a scope.
+
+    Repositories stay application-scoped and keep their session factory; while
+    a unit of work is active in the current context, `transaction()` hands
+    them its session instead of opening a new one. Outside of it (background
+    jobs, CLI tools) each repository call still runs in its own transaction.
+
+    The session only checks out a connection on first use, so entering a unit
+    of work for a request that never touches the database costs nothing.
+
+    Calls through a session factory bound to another database (a different
+    shard) get a session of their own, opened on first use and committed
+    after the main one. The commits are not atomic across databases;
+    repositories route a request's calls by user, so a request normally
+    touches a single shard.
+    """
+
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+        self._sessions: dict = {}
+        self._after_commit: list[Callable[[], Awaitable[None]]] = []
+        self._token = None
+        self.session = None
+
+    async def __aenter__(self):
+        if _current.get() is not None:
+            raise RuntimeError("A unit of work is already active")
+        self.session = self._session_factory()
+        await self.session.begin()
+        self._token = _current.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        sessions = [self.session, *self._sessions.values()]
+        try:
+            if exc_type is None:
+                for session in sessions:
+                    await session.commit()
+            else:
+                for session in sessions:
+                    await session.rollback()
+        finally:
+            for session in sessions:
+                await session.close()
+
+        if exc_type is None:
+            for callback in self._after_commit:
+                try:
+                    await callback()
+                except Exception as exc:
+                    await logger.awarning("after_commit_callback_failed", error=str(exc))
+        return False
+
+    async def session_for(self, session_factory):
+        """The shared session for the database `session_factory` is bound to."""
+        bind = _bind_of(session_factory)
+        if bind is None or bind is _bind_of(self._session_factory):
+            return self.session
+        session = self._sessions.get(bind)
+        if session is None:
+            session = self._sessions[bind] = session_factory()
+            await session.begin()
+        return session
+
+    def after_commit(self, callback: Callable[[], Awaitable[None]]):
+        self._after_commit.append(callback)
+
+
+def _bind_of(session_factory):
+    # sessionmaker keeps its engine in .kw; anything else shares the main session
+    return getattr(session_factory, "kw", {}).get("bind")
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    return _current.get()
+
+
+def pinned_to_primary() -> bool:
+    """True inside a unit of work or once this request has used the primary."""
+    return _current.get() is not None or _primary_used.get()
+
+
+@asynccontextmanager
+async def transaction(session_factory, *, savepoint: bool = False):
+    """
+    Session for one repository call.
+
+    Joins the active unit of work if there is one, otherwise opens a session
+    with its own transaction that commits when the block exits. Pass
+    savepoint=True for writes whose failure the caller may handle (e.g. a
+    duplicate-key insert), so the error doesn't abort the shared transaction.
+    """
+    _primary_used.set(True)
+    uow = _current.get()
+    if uow is None:
+        async with session_factory() as session:
+            async with session.begin():
+                yield session
+    else:
+        session = await uow.session_for(session_factory)
+        if savepoint:
+            async with session.begin_nested():
+                yield session
+        else:
+            yield session
+
+
+async def after_commit(callback: Callable[[], Awaitable[None]]):
+    """Run callback once the current unit of work commits (right away without one)."""
+    uow = _current.get()
+    if uow is None:
+        await callback()
+    else:
+        uow.after_commit(callback)
@@ -7,7 +7,7 @@ from ...models.email_verification_model import EmailVerificationToken
 class IEmailRepository(ABC):
     @abstractmethod
     async def create_token(
-        self, token_id: str, user_id: int, token: str, expires_at: datetime
+        self, token_id: str, user_id: int, token: bytes, expires_at: datetime
     ) -> EmailVerificationToken:
         """Create or update a verification and return the stored row."""
         raise NotImplementedError
@@ -24,7 +24,7 @@ class IEmailRepository(ABC):
 
     @abstractmethod
     async def update_last_email_sent_at(self, user_id: int, timestamp: datetime):
-        """Update or create last_email_sent_at for a user."""
+        """Set last_email_sent_at on the user's token; None if the user has no token."""
         raise NotImplementedError
 
     @abstractmethod
@@ -11,3 +11,8 @@ class PasswordHasher(ABC):
     async def verify(self, hashed: str, plain: str) -> bool:
         """Check whether plain matches hashed"""
         raise NotImplementedError
+
+    @abstractmethod
+    def needs_rehash(self, hashed: str) -> bool:
+        """Check whether hashed was made with different parameters than the current ones."""
+        raise NotImplementedError
@@ -1,13 +1,74 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+
+class RotationOutcome(str, Enum):
+    ROTATED = "rotated"  # presented token revoked, successor stored
+    REUSED = "reused"  # presented token was already revoked
+    UNKNOWN = "unknown"  # no such token
+    EXPIRED = "expired"  # token was live but past expires_at (now revoked)
+    INVALID = "invalid"  # secret didn't match the stored hash (now revoked)
+
+
+@dataclass(frozen=True)
+class RotationResult:
+    outcome: RotationOutcome
+    user_id: Optional[Any] = None
+    family_id: Optional[str] = None
+    # Id the successor was stored under, when the store had to change it
+    token_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ClientDevice:
+    """What we know about the client a session was started from."""
+
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    """The live token of one login (family); listed newest first."""
+
+    session_id: str  # family_id
+    token_id: str
+    created_at: datetime  # when the live token was issued, i.e. last refresh
+    expires_at: datetime
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+
+
+@dataclass(slots=True)
+class RefreshTokenRecord:
+    """Same attributes as the RefreshToken model, for callers of any store."""
+
+    id: str
+    user_id: Any
+    family_id: str
+    token_hash: bytes
+    revoked: bool
+    expires_at: datetime
+    created_at: Optional[datetime] = None
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
 
 
 class IOpaqueRefreshToken(ABC):
     @abstractmethod
     async def save_refresh_token(
-        self, token_id: str, user_id: int, token_hash: str, expires_at: datetime
+        self,
+        token_id: str,
+        user_id: int,
+        token_hash: bytes,
+        expires_at: datetime,
+        family_id: Optional[str] = None,
+        device: Optional[ClientDevice] = None,
     ) -> str:
-        """Save and return refresh token"""
+        """Save and return refresh token (a new family unless family_id is given)"""
         raise NotImplementedError
 
     @abstractmethod
@@ -20,5 +81,47 @@ class IOpaqueRefreshToken(ABC):
         """Revoke refresh token"""
 
     @abstractmethod
-    async def revoke_all_refresh_tokens_for_user(self, user_id: int):
-        """Revoke all tokens for a User."""
+    async def revoke_all_refresh_tokens_for_user(self, user_id: int) -> int:
+        """Revoke all tokens for a User and return how many were revoked."""
+
+    @abstractmethod
+    async def revoke_refresh_token_family(
+        self, family_id: str, user_id: Optional[Any] = None
+    ) -> int:
+        """
+        Revoke every token rotated from the same login and return the count.
+        With user_id, only tokens belonging to that user are touched.
+        """
+
+    @abstractmethod
+    async def list_active_sessions(
+        self,
+        user_id: Any,
+        limit: int,
+        after: Optional[tuple[datetime, str]] = None,
+    ) -> list[SessionRecord]:
+        """
+        Up to `limit` live sessions ordered by (created_at, token_id) descending,
+        starting after the `after` key of the previous page.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rotate_refresh_token(
+        self,
+        token_id: str,
+        verify: Callable[[bytes], Awaitable[bool]],
+        new_token_id: str,
+        new_token_hash: bytes,
+        new_expires_at: datetime,
+        presented_hash: Optional[bytes] = None,
+    ) -> RotationResult:
+        """
+        Atomically revoke token_id and store its successor in the same family
+        (and with the same device metadata).
+        verify(stored_hash) checks the presented secret; the successor is only
+        stored when it passes and the token hasn't expired. presented_hash is
+        the secret's digest under the current key, so stores can match it
+        directly and only call verify for older keys or legacy hashes.
+        """
+        raise NotImplementedError
@@ -0,0 +1,13 @@
+from abc import ABC, abstractmethod
+
+
+class TokenDigest(ABC):
+    @abstractmethod
+    def digest(self, secret: str) -> bytes:
+        """Takes a high-entropy token secret and returns the bytes to store."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def verify(self, stored: bytes, secret: str) -> bool:
+        """Check whether secret matches the stored digest"""
+        raise NotImplementedError
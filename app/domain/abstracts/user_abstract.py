@@ -1,29 +1,67 @@
+import uuid
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
 from ...models.user_model import User
 from ...schema.user_dto import UserCreateDTO
 
 
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """
+    A users row without ORM state; same attributes as the User model.
+    hashed_password is None when the record comes from the user cache.
+    """
+
+    id: uuid.UUID
+    name: str
+    email: str
+    hashed_password: Optional[str]
+    role: str
+    provider: Optional[str]
+    is_verified: bool
+    created_at: datetime
+    google_id: Optional[str] = None
+
+
 class IUserRepository(ABC):
     @abstractmethod
-    async def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[User | UserRecord]:
         """Return a User or None by email."""
         raise NotImplementedError
 
+    async def get_user_for_login(self, email: str) -> Optional[User | UserRecord]:
+        """
+        Like get_user_by_email, but never from a cache or a replica: the
+        password hash is current.
+        """
+        return await self.get_user_by_email(email)
+
     @abstractmethod
-    async def get_user_by_id(self, user_id: str) -> Optional[User]:
+    async def get_user_by_id(self, user_id: str) -> Optional[User | UserRecord]:
         """Return a User or None by user_id"""
         raise NotImplementedError
 
     @abstractmethod
-    async def create_user(self, user_create: UserCreateDTO, password_hash: str) -> User:
+    async def create_user(
+        self, user_create: UserCreateDTO, password_hash: str
+    ) -> User | UserRecord:
         """Create a user and return the created User."""
         raise NotImplementedError
 
     @abstractmethod
-    async def mark_verified(self, user_id: int) -> Optional[User]:
+    async def mark_verified(self, user_id: int) -> Optional[User | UserRecord]:
         """Mark a user verified and return the verified User."""
 
     @abstractmethod
-    async def create_google_user(self, email: str, google_id: str, name: str) -> User:
+    async def create_google_user(
+        self, email: str, google_id: str, name: str
+    ) -> User | UserRecord:
         """Create a user with Google and return created User"""
+
+    @abstractmethod
+    async def update_password(
+        self, user_id: int, hashed_password: str
+    ) -> Optional[User | UserRecord]:
+        """Replace a user's password hash and return the updated User."""
@@ -1,8 +1,10 @@
 import structlog
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from ..abstracts.user_abstract import IUserRepository
-from ...repositories.postgreSQL.refresh_token_repo import PostgresRefreshTokenRepository
+from ..abstracts.refresh_token_abstract import ClientDevice, IOpaqueRefreshToken
 from ...domain.abstracts.password_hasher_abstract import PasswordHasher
+from ...domain.abstracts.token_digest_abstract import TokenDigest
+from ...core.revocation import AccessTokenRevocations
 from ...schema.auth_dto import LoginDTO, TokenDTO
 from ...core.token import create_access_token
 from .token_service import TokenService
@@ -15,20 +17,33 @@ class AuthService:
         self,
         user_repo: IUserRepository,
         hasher: PasswordHasher,
-        refresh_token_repo: PostgresRefreshTokenRepository,
+        refresh_token_repo: IOpaqueRefreshToken,
+        digest: TokenDigest,
+        revocations: AccessTokenRevocations,
     ):
         self._users = user_repo
         self._hasher = hasher
         self._tokens = refresh_token_repo
+        self._digest = digest
+        self._token_service = TokenService(refresh_token_repo, digest)
+        self._revocations = revocations
 
-    async def login(self, dto: LoginDTO) -> TokenDTO:
+    async def login(
+        self,
+        dto: LoginDTO,
+        device: ClientDevice | None = None,
+        background_tasks: BackgroundTasks | None = None,
+    ) -> TokenDTO:
         """
         Login user and return TokenDTO
         with access_token and refresh_token (raw)
+
+        A hash made with an older cost profile is upgraded in background_tasks,
+        after the response is sent (inline without them).
         """
 
         email = dto.email.strip().lower()
-        user = await self._users.get_user_by_email(email)
+        user = await self._users.get_user_for_login(email)
 
         # check if user is verified
         if user and not user.is_verified:
@@ -54,12 +69,20 @@ class AuthService:
             )
             raise credentials_error
 
+        # Upgrade hashes made with an older cost profile while we have the plain password
+        if self._hasher.needs_rehash(user.hashed_password):
+            if background_tasks is None:
+                await self._rehash_password(user.id, dto.password)
+            else:
+                background_tasks.add_task(self._rehash_password, user.id, dto.password)
+
         # create access token (JWT)
         access_token = create_access_token(sub=str(user.id), role=list([user.role]))
 
         # create refresh token (opaque raw string)
-        token_service = TokenService(self._tokens, self._hasher)
-        refresh_token_raw, expires_at = await token_service._issue_refresh_token(user.id)
+        refresh_token_raw, expires_at = await self._token_service._issue_refresh_token(
+            user.id, device
+        )
 
         await logger.ainfo("login_success", user_id=str(user.id), email=email)
 
@@ -69,9 +92,24 @@ class AuthService:
             expires_at=expires_at,
         )
 
+    async def _rehash_password(self, user_id, plain: str):
+        # Best effort: a failed rehash must never fail an otherwise valid login
+        try:
+            new_hash = await self._hasher.hash(plain)
+            await self._users.update_password(user_id, new_hash)
+            await logger.ainfo("password_rehashed", user_id=str(user_id))
+        except Exception as exc:
+            await logger.awarning(
+                "password_rehash_failed", user_id=str(user_id), error=str(exc)
+            )
+
     async def logout(self, user_id: int):
         """
-        Revoke all refresh tokens for the user.
+        Revoke all refresh tokens and outstanding access tokens for the user.
+
+        The refresh tokens are the part that must happen; the access-token
+        revocation is best effort (see AccessTokenRevocations.revoke_user).
         """
-        await self._tokens.revoke_all_refresh_tokens_for_user(user_id)
-        await logger.ainfo("logout_success", user_id=str(user_id))
+        revoked = await self._tokens.revoke_all_refresh_tokens_for_user(user_id)
+        await self._revocations.revoke_user(user_id)
+        await logger.ainfo("logout_success", user_id=str(user_id), revoked=revoked)
@@ -0,0 +1,62 @@
+import time
+import structlog
+from jose import JWTError
+from ...core.token import verify_access_token
+from ...core.revocation import AccessTokenRevocations
+
+logger = structlog.get_logger(__name__)
+
+
+class IntrospectionService:
+    """
+    RFC 7662-style introspection of access tokens, in batches.
+
+    Gateways send every token from a burst of requests in one call; each
+    token is checked independently, so one bad token doesn't fail the batch.
+    """
+
+    def __init__(
+        self, revocations: AccessTokenRevocations, max_cache_seconds: int = 60
+    ):
+        self._revocations = revocations
+        self._max_cache_seconds = max_cache_seconds
+
+    async def _introspect_one(self, token: str, now: float) -> dict:
+        try:
+            claims = verify_access_token(token)
+        except JWTError:
+            return {"active": False}
+
+        if await self._revocations.is_revoked(claims.get("sub"), claims.get("iat")):
+            return {"active": False, "revoked": True}
+
+        exp = claims.get("exp")
+        remaining = int(exp - now) if exp is not None else self._max_cache_seconds
+        return {
+            "active": True,
+            "sub": claims.get("sub"),
+            "role": claims.get("role"),
+            "iat": claims.get("iat"),
+            "exp": exp,
+            "token_type": "access_token",
+            "revoked": False,
+            "cache_max_age": max(0, min(remaining, self._max_cache_seconds)),
+        }
+
+    async def introspect(self, tokens: list[str]) -> tuple[list[dict], int]:
+        """
+        Return one result per token (same order) and a max-age for the whole
+        response: the shortest remaining lifetime among active tokens, capped.
+        """
+        now = time.time()
+        results = [await self._introspect_one(token, now) for token in tokens]
+
+        active_ages = [r["cache_max_age"] for r in results if r["active"]]
+        max_age = min(active_ages) if active_ages else self._max_cache_seconds
+
+        await logger.adebug(
+            "tokens_introspected",
+            count=len(results),
+            active=len(active_ages),
+        )
+        return results, max_age
@@ -1,49 +1,236 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# GCRA: the key holds the theoretical arrival time (TAT, ms) of the next
+# attempt. Each allowed attempt pushes it one emission interval further; an
+# attempt is refused while that would put the TAT more than `limit`
+# intervals ahead. Refused attempts don't move it. The clock is Redis's, so
+# workers with skewed clocks agree.
+#
+# KEYS: limiter key | ARGV: emission interval (ms), limit
+# Returns: allowed (0/1), remaining, retry after (ms), reset after (ms)
+_GCRA = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - interval * limit
+if allow_at > now then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, math.floor((now - allow_at) / interval), 0, new_tat - now}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after_seconds: int  # 0 when allowed
+    reset_after_seconds: int  # until the full quota is back
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_after_seconds),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_seconds)
+        return headers
+
+
+class RateLimitExceededError(ValueError):
+    def __init__(self, result: RateLimitResult):
+        super().__init__("Rate limit exceeded")
+        self.result = result
+
+
+class _LocalLimiter:
+    """
+    Per-worker GCRA state, in seconds on the monotonic clock (only touched
+    from the event loop). Keys at full quota are dropped, and past `max_size`
+    the least recently used key is evicted; both just mean asking Redis.
+    """
+
+    def __init__(self, max_size: int, interval: float, limit: int):
+        self._max_size = max_size
+        self._interval = interval
+        self._limit = limit
+        self._tats: OrderedDict[str, float] = OrderedDict()
+
+    def _tat(self, key: str, now: float) -> float:
+        tat = self._tats.get(key)
+        if tat is None:
+            return now
+        if tat <= now:
+            del self._tats[key]
+            return now
+        self._tats.move_to_end(key)
+        return tat
+
+    def check(self, key: str, now: float) -> tuple[int, float, float]:
+        """(remaining, retry after, reset after) for one more attempt, without taking it."""
+        tat = self._tat(key, now)
+        allow_at = tat + self._interval - self._interval * self._limit
+        if allow_at > now:
+            return 0, allow_at - now, tat - now
+        return math.floor((now - allow_at) / self._interval), 0.0, tat + self._interval - now
+
+    def set(self, key: str, reset_after: float, now: float):
+        if self._max_size <= 0 or reset_after <= 0:
+            self._tats.pop(key, None)
+            return
+        self._tats[key] = now + reset_after
+        self._tats.move_to_end(key)
+        while len(self._tats) > self._max_size:
+            self._tats.popitem(last=False)
+
+    def discard(self, key: str):
+        self._tats.pop(key, None)
+
+    def __len__(self):
+        return len(self._tats)
+
 
 class RateLimitService:
+    """
+    Login attempts per (ip, email): MAX_ATTEMPTS per WINDOW_SECONDS, refilled
+    continuously (one attempt every WINDOW_SECONDS / MAX_ATTEMPTS) rather than
+    in fixed windows, so no window edge allows a double burst.
+
+    Redis holds the shared state. Each worker mirrors what Redis last told it
+    about a key, which can only lag behind (other workers' attempts count
+    too), so a key it already sees as exceeded is refused locally, without a
+    round trip. If Redis fails, or doesn't answer within redis_timeout_seconds,
+    attempts are counted against the local state alone: the limit still holds
+    per worker until Redis is back.
+    """
+
     MAX_ATTEMPTS = 5
     WINDOW_SECONDS = 900  # 15 minutes
 
-    def __init__(self, redis_client):
+    def __init__(
+        self, redis_client, local_size: int = 10000, redis_timeout_seconds: float = 0.25
+    ):
         self._redis = redis_client
+        self._redis_timeout = redis_timeout_seconds
+        self._gcra = redis_client.register_script(_GCRA)
+        self._interval = self.WINDOW_SECONDS / self.MAX_ATTEMPTS
+        self._local = _LocalLimiter(local_size, self._interval, self.MAX_ATTEMPTS)
+        self.local_rejections = 0
+        self.redis_checks = 0
+        self.degraded_checks = 0
 
     def _get_key(self, ip: str, email: str) -> str:
         return f"rate_limit:login:{ip}:{email}"
 
-    async def check_and_increment(self, ip: str, email: str):
-        key = self._get_key(ip, email)
+    def _result(
+        self, remaining: int, retry_after: float, reset_after: float
+    ) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=retry_after <= 0,
+            limit=self.MAX_ATTEMPTS,
+            remaining=remaining,
+            retry_after_seconds=math.ceil(retry_after),
+            reset_after_seconds=math.ceil(reset_after),
+        )
 
-        # INCR creates the key with value 1 if it doesn't exist, and increments otherwise.
-        attempts = await self._redis.incr(key)
+    async def _check_redis(self, key: str) -> Optional[RateLimitResult]:
+        try:
+            _, remaining, retry_after_ms, reset_after_ms = await asyncio.wait_for(
+                self._gcra(
+                    keys=[key],
+                    args=[int(self._interval * 1000), self.MAX_ATTEMPTS],
+                ),
+                self._redis_timeout,
+            )
+        except Exception as exc:
+            await logger.awarning(
+                "rate_limit_redis_error", error=str(exc) or type(exc).__name__
+            )
+            return None
+        self.redis_checks += 1
+        reset_after = int(reset_after_ms) / 1000
+        self._local.set(key, reset_after, time.monotonic())
+        return self._result(int(remaining), int(retry_after_ms) / 1000, reset_after)
+
+    def _check_local(self, key: str) -> RateLimitResult:
+        now = time.monotonic()
+        remaining, retry_after, reset_after = self._local.check(key, now)
+        if retry_after <= 0:
+            self._local.set(key, reset_after, now)
+        return self._result(remaining, retry_after, reset_after)
 
-        # If this is the very first attempt, set the expiration window.
-        if attempts == 1:
-            await self._redis.expire(key, self.WINDOW_SECONDS)
+    async def check_and_increment(self, ip: str, email: str) -> RateLimitResult:
+        """
+        Count one attempt: one atomic round trip to Redis, or none when this
+        worker already knows the key is exceeded or Redis is unavailable.
+        Raises RateLimitExceededError (a ValueError) when there's no quota left.
+        """
+        key = self._get_key(ip, email)
+        result = self._result(*self._local.check(key, time.monotonic()))
+        if result.allowed:
+            result = await self._check_redis(key)
+            if result is None:
+                self.degraded_checks += 1
+                result = self._check_local(key)
+        else:
+            self.local_rejections += 1
 
         await logger.adebug(
             "rate_limit_incremented",
             ip=ip,
             email=email,
-            attempt_count=attempts,
+            remaining=result.remaining,
         )
 
-        if attempts > self.MAX_ATTEMPTS:
+        if not result.allowed:
             await logger.awarning(
                 "rate_limit_exceeded",
                 ip=ip,
                 email=email,
-                attempt_count=attempts,
+                retry_after_seconds=result.retry_after_seconds,
             )
-            raise ValueError("Rate limit exceeded")
+            raise RateLimitExceededError(result)
+        return result
 
     async def clear_limit(self, ip: str, email: str):
         key = self._get_key(ip, email)
-        await self._redis.delete(key)
+        self._local.discard(key)
+        try:
+            await asyncio.wait_for(self._redis.delete(key), self._redis_timeout)
+        except Exception as exc:
+            # The key refills on its own; a login shouldn't fail over it
+            await logger.awarning(
+                "rate_limit_redis_error", error=str(exc) or type(exc).__name__
+            )
+            return
         await logger.ainfo(
             "rate_limit_cleared",
             ip=ip,
             email=email,
         )
+
+    def stats(self) -> dict:
+        return {
+            "local_size": len(self._local),
+            "local_rejections": self.local_rejections,
+            "redis_checks": self.redis_checks,
+            "degraded_checks": self.degraded_checks,
+        }
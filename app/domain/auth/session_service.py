@@ -0,0 +1,54 @@
+import base64
+import json
+import structlog
+from datetime import datetime
+from ..abstracts.refresh_token_abstract import IOpaqueRefreshToken, SessionRecord
+
+logger = structlog.get_logger(__name__)
+
+
+def encode_cursor(record: SessionRecord) -> str:
+    raw = json.dumps([record.created_at.isoformat(), record.token_id])
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, token_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(token_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class SessionService:
+    """
+    A user's signed-in sessions: one per refresh-token family (login), shown
+    through the family's live token.
+
+    Pages are keyset-paginated on (created_at, token_id) of the live token,
+    so each page costs the same no matter how many tokens the user has had.
+    """
+
+    def __init__(self, refresh_token_repo: IOpaqueRefreshToken):
+        self._tokens = refresh_token_repo
+
+    async def list_sessions(
+        self, user_id, limit: int, cursor: str | None = None
+    ) -> tuple[list[SessionRecord], str | None]:
+        after = decode_cursor(cursor) if cursor else None
+        # one extra row tells us whether there is a next page
+        records = await self._tokens.list_active_sessions(user_id, limit + 1, after)
+        page = records[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(records) > limit else None
+        return page, next_cursor
+
+    async def revoke_session(self, user_id, session_id: str):
+        revoked = await self._tokens.revoke_refresh_token_family(
+            session_id, user_id=user_id
+        )
+        if not revoked:
+            raise ValueError("Session not found")
+        await logger.ainfo(
+            "session_revoked", user_id=str(user_id), session_id=session_id
+        )
@@ -1,10 +1,14 @@
-import uuid
 import secrets
 import structlog
 from datetime import datetime, timedelta, timezone
-from ...repositories.postgreSQL.refresh_token_repo import PostgresRefreshTokenRepository
-from ...domain.abstracts.password_hasher_abstract import PasswordHasher
+from ...domain.abstracts.token_digest_abstract import TokenDigest
+from ...domain.abstracts.refresh_token_abstract import (
+    ClientDevice,
+    IOpaqueRefreshToken,
+    RotationOutcome,
+)
 from ...core.config import REFRESH_TOKEN_EXPIRE_DAYS
+from ...core.shards import new_token_id
 from ...core.token import create_access_token
 
 logger = structlog.get_logger(__name__)
@@ -14,24 +18,25 @@ now = datetime.now(timezone.utc)
 
 class TokenService:
     def __init__(
-        self, refresh_token_repo: PostgresRefreshTokenRepository, hasher: PasswordHasher
+        self, refresh_token_repo: IOpaqueRefreshToken, digest: TokenDigest
     ):
         self._tokens = refresh_token_repo
-        self._hasher = hasher
+        self._digest = digest
 
-    async def _issue_refresh_token(self, user_id: int):
-        token_id = uuid.uuid4().hex
+    async def _issue_refresh_token(self, user_id: int, device: ClientDevice | None = None):
+        token_id = new_token_id(user_id)
         secret = secrets.token_urlsafe(64)
         raw_token = f"{token_id}.{secret}"
 
-        token_hash = await self._hasher.hash(secret)
+        token_hash = self._digest.digest(secret)
 
-        expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         await self._tokens.save_refresh_token(
             token_id=token_id,
             user_id=user_id,
             token_hash=token_hash,
             expires_at=expires_at,
+            device=device,
         )
 
         await logger.adebug(
@@ -52,61 +57,75 @@ class TokenService:
         except ValueError:
             raise ValueError("Invalid token format")
 
-        rt = await self._tokens.get_refresh_token_by_id(token_id)
+        # Same bucket as the presented token, i.e. its user's shard
+        successor_id = new_token_id(token_id)
+        new_secret = secrets.token_urlsafe(64)
+        new_expires = datetime.now(timezone.utc) + timedelta(
+            days=REFRESH_TOKEN_EXPIRE_DAYS
+        )
+
+        # Revoke the presented token and store its successor in one transaction,
+        # so two concurrent refreshes can't both rotate the same token
+        result = await self._tokens.rotate_refresh_token(
+            token_id,
+            verify=lambda stored: self._digest.verify(stored, secret),
+            new_token_id=successor_id,
+            new_token_hash=self._digest.digest(new_secret),
+            new_expires_at=new_expires,
+            presented_hash=self._digest.digest(secret),
+        )
 
         # Attempt to use a non-existent token — treat as suspicious
-        if rt is None:
+        if result.outcome is RotationOutcome.UNKNOWN:
             await logger.acritical(
                 "suspicious_activity_unknown_token",
                 token_id=token_id,
             )
-            await self._tokens.revoke_all_refresh_tokens_for_user(user_id=None)
             raise ValueError("Suspicious activity detected")
 
-        # Attempt to use an already-revoked token — token reuse attack
-        if rt.revoked:
+        # Attempt to use an already-revoked token — token reuse attack.
+        # Only this login's lineage is compromised, so revoke just that family
+        if result.outcome is RotationOutcome.REUSED:
             await logger.acritical(
                 "token_reuse_detected",
-                user_id=str(rt.user_id),
+                user_id=str(result.user_id),
                 token_id=token_id,
+                family_id=result.family_id,
+            )
+            await self._tokens.revoke_refresh_token_family(
+                result.family_id, user_id=result.user_id
             )
-            await self._tokens.revoke_all_refresh_tokens_for_user(rt.user_id)
             raise ValueError("Refresh token reuse detected")
 
         # Invalid secret — possible token forgery or replay
-        if not await self._hasher.verify(rt.token_hash, secret):
+        if result.outcome is RotationOutcome.INVALID:
             await logger.awarning(
                 "token_hash_mismatch",
-                user_id=str(rt.user_id),
+                user_id=str(result.user_id),
                 token_id=token_id,
+                family_id=result.family_id,
+            )
+            await self._tokens.revoke_refresh_token_family(
+                result.family_id, user_id=result.user_id
             )
-            await self._tokens.revoke_all_refresh_tokens_for_user(rt.user_id)
             raise ValueError("Refresh token misuse detected")
 
-        if rt.expires_at < datetime.now(timezone.utc):
+        if result.outcome is RotationOutcome.EXPIRED:
             await logger.ainfo(
                 "token_expired",
-                user_id=str(rt.user_id),
+                user_id=str(result.user_id),
                 token_id=token_id,
             )
-            await self._tokens.revoke_refresh_token(token_id)
             raise ValueError("Refresh token expired")
 
-        # Verify secret a second time (defence-in-depth guard)
-        valid = await self._hasher.verify(rt.token_hash, secret)
-        if not valid:
-            await self._tokens.revoke_refresh_token(token_id)
-            raise ValueError("Invalid refresh token")
-
-        # Rotate: revoke used token and issue a new one
-        await self._tokens.revoke_refresh_token(token_id)
-        new_raw, new_expires = await self._issue_refresh_token(rt.user_id)
-        access_jwt = create_access_token(sub=str(rt.user_id))
+        new_raw = f"{result.token_id or successor_id}.{new_secret}"
+        access_jwt = create_access_token(sub=str(result.user_id))
 
         await logger.ainfo(
             "token_rotation_success",
-            user_id=str(rt.user_id),
+            user_id=str(result.user_id),
             old_token_id=token_id,
+            family_id=result.family_id,
         )
 
         return {
@@ -1,10 +1,10 @@
-import uuid
 import secrets
 import math
 from datetime import datetime, timezone, timedelta
-from ...domain.abstracts.password_hasher_abstract import PasswordHasher
+from ...domain.abstracts.token_digest_abstract import TokenDigest
 from ..abstracts.email_verify_abstract import IEmailRepository
 from ...core.mailer import ResendMailer
+from ...core.shards import new_token_id
 
 # Rate limit time 60 secs
 RATE_LIMIT_SECONDS = 60
@@ -15,22 +15,22 @@ class EmailVerificationService:
         self,
         verification_repo: IEmailRepository,
         mailer: ResendMailer,
-        hasher: PasswordHasher,
+        digest: TokenDigest,
     ):
         self._verification = verification_repo
         self._email = mailer
-        self._hasher = hasher
+        self._digest = digest
 
     async def create_and_send_token(self, user):
 
         # Create a verification token and send it to the user's email.
-        token_id = uuid.uuid4().hex
+        token_id = new_token_id(user.id)
 
         secret = secrets.token_urlsafe(32)
 
         raw_token = f"{token_id}.{secret}"
 
-        token_hash = await self._hasher.hash(secret)
+        token_hash = self._digest.digest(secret)
 
         # Get the last timestamp email sent
         last = await self._verification.get_last_email_sent_at(user.id)
@@ -69,9 +69,11 @@ class EmailVerificationService:
             await self._verification.delete_token(token_id)
             raise ValueError("Token has expired")
 
-        if not await self._hasher.verify(record.hashed_token, secret):
+        if not await self._digest.verify(record.hashed_token, secret):
             raise ValueError("Invalid token")
 
-        await self._verification.delete_token(token_id)
+        # Single use: only the request whose delete removed the token gets it
+        if await self._verification.delete_token(token_id) is None:
+            raise ValueError("Invalid or expired token")
 
         return record.user_id
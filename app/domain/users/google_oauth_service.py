@@ -1,8 +1,8 @@
 from google.oauth2 import id_token
 from google.auth.transport import requests
-from ...repositories.postgreSQL.user_repo_postgres import PostgresUserRepository
-from ...repositories.postgreSQL.refresh_token_repo import PostgresRefreshTokenRepository
-from ...utils.password_hasher import PasswordHasher
+from ..abstracts.user_abstract import IUserRepository
+from ..abstracts.refresh_token_abstract import ClientDevice, IOpaqueRefreshToken
+from ...domain.abstracts.token_digest_abstract import TokenDigest
 from ...domain.auth.token_service import TokenService
 from ...core.token import create_access_token
 from ...core.config import GOOGLE_CLIENT_ID
@@ -12,15 +12,18 @@ class GoogleAuthService:
 
     def __init__(
         self,
-        users: PostgresUserRepository,
-        tokens: PostgresRefreshTokenRepository,
-        hasher: PasswordHasher,
+        users: IUserRepository,
+        tokens: IOpaqueRefreshToken,
+        digest: TokenDigest,
     ):
         self._users = users
         self._tokens = tokens
-        self._hasher = hasher
+        self._digest = digest
+        self._token_service = TokenService(tokens, digest)
 
-    async def login_with_google(self, google_id_token: str):
+    async def login_with_google(
+        self, google_id_token: str, device: ClientDevice | None = None
+    ):
 
         try:
             # Verify Google token
@@ -45,8 +48,9 @@ class GoogleAuthService:
         access_token = create_access_token(sub=str(user.id), role=list([user.role]))
 
         # create refresh token (opaque raw string)
-        token_service = TokenService(self._tokens, self._hasher)
-        refresh_token_raw = await token_service._issue_refresh_token(user.id)
+        refresh_token_raw, _ = await self._token_service._issue_refresh_token(
+            user.id, device
+        )
 
         # return tokens and user info
         return access_token, refresh_token_raw, user
@@ -1,4 +1,3 @@
-import uuid
 import secrets
 import math
 from fastapi import HTTPException, status
@@ -7,8 +6,12 @@ from ...schema.user_dto import ResetPasswordDTO
 from ..abstracts.password_reset_abstract import IPasswordResetToken
 from ..abstracts.user_abstract import IUserRepository
 from ..abstracts.password_hasher_abstract import PasswordHasher
+from ..abstracts.token_digest_abstract import TokenDigest
+from ..abstracts.refresh_token_abstract import IOpaqueRefreshToken
+from ...core.revocation import AccessTokenRevocations
 from ...schema.user_dto import NewPasswordDTO
 from ...core.mailer import ResendMailer
+from ...core.shards import new_token_id
 
 # rate limit 60 secs
 RATE_LIMIT_SECONDS = 60
@@ -21,11 +24,17 @@ class PasswordResetService:
         user_repo: IUserRepository,
         mailer: ResendMailer,
         hasher: PasswordHasher,
+        digest: TokenDigest,
+        refresh_token_repo: IOpaqueRefreshToken,
+        revocations: AccessTokenRevocations,
     ):
         self._password_reset = password_reset_repo
         self._user_repo = user_repo
         self._mailer = mailer
         self._hasher = hasher
+        self._digest = digest
+        self._refresh_tokens = refresh_token_repo
+        self._revocations = revocations
 
     async def create_and_send_token(self, dto: ResetPasswordDTO):
 
@@ -51,11 +60,11 @@ class PasswordResetService:
         expires_at = now + timedelta(minutes=10)
 
         # create password reset token
-        token_id = uuid.uuid4().hex
+        token_id = new_token_id(user.id)
 
         secret = secrets.token_urlsafe(32)
         raw_token = f"{token_id}.{secret}"
-        token_hash = await self._hasher.hash(secret)
+        token_hash = self._digest.digest(secret)
 
         await self._password_reset.create_token(
             token_id=token_id, user_id=user.id, token=token_hash, expires_at=expires_at
@@ -82,12 +91,14 @@ class PasswordResetService:
             await self._password_reset.delete_token(token_id)
             raise ValueError("Token has expired")
 
-        if not await self._hasher.verify(record.hashed_token, secret):
+        if not await self._digest.verify(record.hashed_token, secret):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
 
-        await self._password_reset.delete_token(token_id)
+        # Single use: only the request whose delete removed the token gets it
+        if await self._password_reset.delete_token(token_id) is None:
+            raise ValueError("Invalid or expired token")
 
         return record.user_id
 
@@ -96,3 +107,9 @@ class PasswordResetService:
 
         password_hash = await self._hasher.hash(dto.new_password)
         await user_repo.update_password(user_id, password_hash)
+
+        # A reset means the old credentials may be compromised: end every session.
+        # The access-token revocation is best effort, so a Redis outage can't
+        # report a reset that already happened as failed.
+        await self._refresh_tokens.revoke_all_refresh_tokens_for_user(user_id)
+        await self._revocations.revoke_user(user_id)
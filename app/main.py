@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .core.config import LOG_LEVEL
 from .core.logging import configure_logging
@@ -6,12 +7,27 @@ from .core.logging import configure_logging
 configure_logging(log_level=LOG_LEVEL)
 
 from .core.middleware import RequestIDMiddleware
-from .api.v1 import auth_routes, user_routes
+from .core.container import Container
+from .api.v1 import auth_routes, internal_routes, user_routes, well_known_routes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build shared dependencies once and warm pools before serving traffic
+    container = Container()
+    await container.startup()
+    app.state.container = container
+    try:
+        yield
+    finally:
+        await container.shutdown()
+
 
 app = FastAPI(
     title="Auth Service",
     version="1.0.0",
     description="Learning Python with FastAPI and SOLID principles",
+    lifespan=lifespan,
 )
 
 # Request ID middleware must be the outermost layer so every log line
@@ -20,3 +36,5 @@ app.add_middleware(RequestIDMiddleware)
 
 app.include_router(auth_routes.router, tags=["Auth"])
 app.include_router(user_routes.router, tags=["Auth"])
+app.include_router(well_known_routes.router, tags=["Well-known"])
+app.include_router(internal_routes.router, tags=["Internal"])
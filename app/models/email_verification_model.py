@@ -1,5 +1,5 @@
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, LargeBinary, func
 from ..core.db import Base
 
 
@@ -10,7 +10,7 @@ class EmailVerificationToken(Base):
     user_id = Column(
         UUID(as_uuid=True), ForeignKey("users.id"), unique=True, nullable=False
     )
-    hashed_token = Column(String(255), nullable=False)
+    hashed_token = Column(LargeBinary, nullable=False)  # see HmacTokenDigest
     last_email_sent_at = Column(DateTime(timezone=True), nullable=True)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(
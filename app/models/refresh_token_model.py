@@ -1,14 +1,52 @@
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, func
+from sqlalchemy import (
+    Column,
+    String,
+    Boolean,
+    ForeignKey,
+    DateTime,
+    LargeBinary,
+    Index,
+    func,
+    text,
+)
 from ..core.db import Base
 
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Live tokens per user, newest first: keyset pagination for session
+        # listing (index-only thanks to INCLUDE) and revoke-all
+        Index(
+            "ix_refresh_tokens_user_sessions",
+            "user_id",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_include=["family_id", "expires_at", "user_agent", "ip_address"],
+            postgresql_where=text("NOT revoked"),
+        ),
+        Index(
+            "ix_refresh_tokens_family_id_active",
+            "family_id",
+            postgresql_where=text("NOT revoked"),
+        ),
+        # expired partitions are dropped whole by TokenSweeper
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
 
     id = Column(String(64), primary_key=True)  # token_id (uuid hex)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    token_hash = Column(String(512), nullable=False)
+    # id of the first token of the login; shared by every rotation after it
+    family_id = Column(String(64), nullable=False)
+    # version byte + HMAC-SHA256 (legacy rows hold an Argon2 hash until they expire)
+    token_hash = Column(LargeBinary, nullable=False)
     revoked = Column(Boolean, nullable=False, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # client that started the session (copied on every rotation)
+    user_agent = Column(String(255), nullable=True)
+    ip_address = Column(String(45), nullable=True)
+    # part of the key because Postgres requires the partition column in it
+    expires_at = Column(DateTime(timezone=True), primary_key=True)
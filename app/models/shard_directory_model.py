@@ -0,0 +1,26 @@
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from ..core.db import Base
+
+
+class ShardBucket(Base):
+    """Which shard owns each user-id bucket (kept on DATABASE_URL)."""
+
+    __tablename__ = "shard_buckets"
+
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    shard = Column(Integer, nullable=False)
+    # Writes to the bucket are refused while the resharding tool moves it
+    frozen = Column(Boolean, nullable=False, server_default="false")
+
+
+class UserEmailIndex(Base):
+    """email -> user id, so a lookup by email goes straight to one shard."""
+
+    __tablename__ = "user_email_index"
+
+    email = Column(String(255), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    claimed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+import structlog
+from ...core.unit_of_work import after_commit, current_unit_of_work
+from ...domain.abstracts.user_abstract import IUserRepository, UserRecord
+from ...models.user_model import User
+
+logger = structlog.get_logger(__name__)
+
+CHANNEL = "user_cache:invalidate"
+KEY_PREFIX = "user_cache:"
+_MISSING = ""  # negative entry for an unknown email
+# Second invalidation after a write, to drop values a concurrent read-through
+# fetched before the write committed and stored after our first delete
+_REINVALIDATE_AFTER_SECONDS = 1.0
+
+# No hashed_password: password hashes stay out of Redis, and credentials are
+# always checked against the database (see get_user_for_login)
+_FIELDS = (
+    "id",
+    "google_id",
+    "name",
+    "email",
+    "role",
+    "provider",
+    "is_verified",
+    "created_at",
+)
+
+
+def _snapshot(user: User | UserRecord) -> str:
+    data = {field: getattr(user, field) for field in _FIELDS}
+    data["id"] = str(data["id"])
+    data["created_at"] = data["created_at"].isoformat() if data["created_at"] else None
+    return json.dumps(data)
+
+
+def _restore(raw: str) -> UserRecord:
+    data = json.loads(raw)
+    data.pop("hashed_password", None)  # entries written before it was dropped
+    data["id"] = uuid.UUID(data["id"])
+    if data["created_at"]:
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return UserRecord(hashed_password=None, **data)
+
+
+class _LocalTier:
+    """Per-worker LRU with a short TTL (only touched from the event loop)."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        if self._max_size <= 0:
+            return
+        ttl = self._ttl if ttl_seconds is None else min(ttl_seconds, self._ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachingUserRepository(IUserRepository):
+    """
+    Read-through cache in front of another IUserRepository.
+
+    Lookups go local LRU -> Redis -> database. Writes go straight to the
+    database; once they commit, the affected keys are dropped locally and in
+    Redis and an invalidation is published so every other worker drops its
+    local copy too. Nothing is cached from inside a unit of work, since it
+    could be that transaction's uncommitted state.
+
+    Only verified users are cached. An unverified account is always read
+    from the database, so the is_verified check at login, verify-email and
+    password reset never sees a stale value. Unknown emails are cached
+    briefly (negative entries) and dropped as soon as that email registers.
+
+    Cached records carry no password hash (hashed_password is None); login
+    goes through get_user_for_login, which always reads the database.
+    """
+
+    def __init__(
+        self,
+        inner: IUserRepository,
+        redis_client,
+        *,
+        local_size: int = 10000,
+        local_ttl_seconds: float = 5,
+        ttl_seconds: int = 60,
+        negative_ttl_seconds: int = 10,
+    ):
+        self._inner = inner
+        self._redis = redis_client
+        self._local = _LocalTier(local_size, local_ttl_seconds)
+        self._ttl = ttl_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._listener: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _id_key(user_id) -> str:
+        return f"{KEY_PREFIX}id:{user_id}"
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"{KEY_PREFIX}email:{email}"
+
+    # reads
+
+    async def _cached(self, key: str) -> Optional[str]:
+        value = self._local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+        try:
+            value = await self._redis.get(key)
+        except Exception as exc:
+            await logger.awarning("user_cache_redis_error", error=str(exc))
+            return None
+        if value is not None:
+            self.redis_hits += 1
+            self._local.put(key, value)
+        return value
+
+    async def _store(
+        self, user: Optional[User | UserRecord], email_key: Optional[str] = None
+    ):
+        if current_unit_of_work() is not None:
+            # may be reading this transaction's own uncommitted writes
+            return
+        try:
+            if user is None:
+                if email_key is not None:
+                    self._local.put(email_key, _MISSING, self._negative_ttl)
+                    await self._redis.set(email_key, _MISSING, ex=self._negative_ttl)
+                return
+            if not user.is_verified:
+                return
+            value = _snapshot(user)
+            keys = (self._id_key(user.id), self._email_key(user.email))
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    self._local.put(key, value)
+                    pipe.set(key, value, ex=self._ttl)
+                await pipe.execute()
+        except Exception as exc:
+            await logger.awarning("user_cache_redis_error", error=str(exc))
+
+    async def get_user_by_email(self, email: str):
+        key = self._email_key(email)
+        value = await self._cached(key)
+        if value == _MISSING:
+            return None
+        if value is not None:
+            return _restore(value)
+
+        self.misses += 1
+        user = await self._inner.get_user_by_email(email)
+        await self._store(user, email_key=key)
+        return user
+
+    async def get_user_for_login(self, email: str):
+        user = await self._inner.get_user_for_login(email)
+        await self._store(user, email_key=self._email_key(email))
+        return user
+
+    async def get_user_by_id(self, user_id):
+        value = await self._cached(self._id_key(user_id))
+        if value:
+            return _restore(value)
+
+        self.misses += 1
+        user = await self._inner.get_user_by_id(user_id)
+        await self._store(user)
+        return user
+
+    # writes
+
+    async def create_user(self, user_create, password_hash: str):
+        user = await self._inner.create_user(user_create, password_hash)
+        await after_commit(lambda: self._invalidate(email=user.email))
+        return user
+
+    async def create_google_user(self, email: str, google_id: str, name: str):
+        user = await self._inner.create_google_user(email, google_id, name)
+        await after_commit(lambda: self._invalidate(email=user.email))
+        return user
+
+    async def mark_verified(self, user_id):
+        user = await self._inner.mark_verified(user_id)
+        email = user.email if user else None
+        await after_commit(lambda: self._invalidate(user_id=user_id, email=email))
+        return user
+
+    async def update_password(self, user_id, hashed_password: str):
+        user = await self._inner.update_password(user_id, hashed_password)
+        email = user.email if user else None
+        await after_commit(lambda: self._invalidate(user_id=user_id, email=email))
+        return user
+
+    # invalidation
+
+    def _drop_local(self, user_id=None, email=None):
+        if user_id is not None:
+            self._local.discard(self._id_key(user_id))
+        if email is not None:
+            self._local.discard(self._email_key(email))
+
+    async def _invalidate(self, user_id=None, email=None, again: bool = True):
+        self._drop_local(user_id, email)
+        keys = []
+        if user_id is not None:
+            keys.append(self._id_key(user_id))
+        if email is not None:
+            keys.append(self._email_key(email))
+        message = json.dumps(
+            {"id": str(user_id) if user_id is not None else None, "email": email}
+        )
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                pipe.publish(CHANNEL, message)
+                await pipe.execute()
+        except Exception as exc:
+            # entries still age out within their TTL
+            await logger.awarning("user_cache_invalidation_failed", error=str(exc))
+
+        if again:
+            task = asyncio.create_task(self._invalidate_later(user_id, email))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _invalidate_later(self, user_id, email):
+        await asyncio.sleep(_REINVALIDATE_AFTER_SECONDS)
+        await self._invalidate(user_id, email, again=False)
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # anything published while we weren't subscribed is lost
+                self._local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        data = json.loads(message["data"])
+                        self._drop_local(data.get("id"), data.get("email"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await logger.awarning("user_cache_listener_error", error=str(exc))
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        tasks = list(self._pending)
+        if self._listener is not None:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "local_size": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
@@ -1,85 +1,92 @@
-from sqlalchemy.future import select
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime, timezone
 from ...domain.abstracts.password_reset_abstract import IPasswordResetToken
+from ...core.replicas import ReplicaRouter, read
+from ...core.shards import ShardRouter, route
+from ...core.unit_of_work import transaction
 from ...models.password_reset_tokens import PasswordResetToken
 
+# Replaced when a user's token is reissued
+_REISSUED_COLUMNS = ("id", "hashed_token", "expires_at", "last_email_sent_at")
+
+
+def _is_none(value) -> bool:
+    return value is None
+
 
 class PasswordResetTokenRepo(IPasswordResetToken):
-    def __init__(self, async_session_factory):
+    def __init__(
+        self,
+        async_session_factory,
+        replicas: ReplicaRouter | None = None,
+        shards: ShardRouter | None = None,
+    ):
         self._async_session_factory = async_session_factory
+        self._replicas = replicas
+        self._shards = shards
+
+    def _factory(self, key, *, write: bool = False):
+        # Token ids are minted in their user's bucket, so either key routes
+        return route(self._async_session_factory, self._shards, key, write=write)
 
     async def create_token(
-        self, token_id: str, user_id: int, token: str, expires_at: datetime
+        self, token_id: str, user_id: int, token: bytes, expires_at: datetime
     ):
-        async with self._async_session_factory() as session:
-            async with session.begin():
-                result = await session.execute(
-                    select(PasswordResetToken).where(PasswordResetToken.user_id == user_id)
-                )
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    # Update existing row in-place
-                    existing.id = token_id
-                    existing.hashed_token = token
-                    existing.expires_at = expires_at
-                    existing.last_email_sent_at = datetime.now(tz=timezone.utc)
-                    token_row = existing
-                else:
-                    # Create a new row
-                    token_row = PasswordResetToken(
-                        id=token_id,
-                        user_id=user_id,
-                        hashed_token=token,
-                        expires_at=expires_at,
-                        last_email_sent_at=datetime.now(tz=timezone.utc),
-                    )
-                    session.add(token_row)
-
-            await session.refresh(token_row)
-            return token_row
+        # One statement: concurrent first requests for a user can't both insert
+        stmt = insert(PasswordResetToken).values(
+            id=token_id,
+            user_id=user_id,
+            hashed_token=token,
+            expires_at=expires_at,
+            last_email_sent_at=datetime.now(tz=timezone.utc),
+        )
+        stmt = (
+            stmt.on_conflict_do_update(
+                index_elements=[PasswordResetToken.user_id],
+                set_={name: stmt.excluded[name] for name in _REISSUED_COLUMNS},
+            )
+            .returning(PasswordResetToken)
+            .execution_options(populate_existing=True)
+        )
+        async with transaction(self._factory(user_id, write=True)) as session:
+            return (await session.scalars(stmt)).one()
 
     async def get_token_by_id(self, token_id: str):
-        async with self._async_session_factory() as session:
-            async with session.begin():
-                return await session.get(PasswordResetToken, token_id)
+        async def query(session):
+            return await session.get(PasswordResetToken, token_id)
 
-    async def get_last_email_sent_at(self, user_id: int):
-        async with self._async_session_factory() as session:
-            async with session.begin():
-                result = await session.execute(
-                    select(PasswordResetToken.last_email_sent_at).where(
-                        PasswordResetToken.user_id == user_id
-                    )
-                )
-                return result.scalar()
+        # Primary only: a lagging replica would still return a token that
+        # was already used, and deleted, on the primary
+        return await read(self._factory(token_id), query)
 
-    async def update_last_email_sent_at(self, user_id: int, timestamp: datetime):
-        async with self._async_session_factory() as session:
-            async with session.begin():
-                result = await session.execute(
-                    select(PasswordResetToken).where(PasswordResetToken.user_id == user_id)
+    async def get_last_email_sent_at(self, user_id: int):
+        async def query(session):
+            result = await session.execute(
+                select(PasswordResetToken.last_email_sent_at).where(
+                    PasswordResetToken.user_id == user_id
                 )
-                record = result.scalar_one_or_none()
+            )
+            return result.scalar()
 
-                if record:
-                    record.last_email_sent_at = timestamp
-                else:
-                    record = PasswordResetToken(
-                        user_id=user_id, last_email_sent_at=timestamp
-                    )
-                    session.add(record)
+        return await read(self._factory(user_id), query, self._replicas, _is_none)
 
-            return record
+    async def update_last_email_sent_at(self, user_id: int, timestamp: datetime):
+        # The row always exists here: create_token runs first
+        stmt = (
+            update(PasswordResetToken)
+            .where(PasswordResetToken.user_id == user_id)
+            .values(last_email_sent_at=timestamp)
+            .returning(PasswordResetToken)
+        )
+        async with transaction(self._factory(user_id, write=True)) as session:
+            return (await session.scalars(stmt)).one_or_none()
 
     async def delete_token(self, token_id: str):
-        async with self._async_session_factory() as session:
-            async with session.begin():
-                result = await session.execute(
-                    select(PasswordResetToken).where(PasswordResetToken.id == token_id)
-                )
-                token = result.scalars().first()
-                if token:
-                    await session.delete(token)
-
-            return token
+        stmt = (
+            delete(PasswordResetToken)
+            .where(PasswordResetToken.id == token_id)
+            .returning(PasswordResetToken)
+        )
+        async with transaction(self._factory(token_id, write=True)) as session:
+            return (await session.scalars(stmt)).one_or_none()
@@ -1,46 +1,202 @@
-from datetime import datetime
-from sqlalchemy import select
+import hmac
+from datetime import datetime, timezone
+from sqlalchemy import select, update, insert, tuple_
+from ...domain.abstracts.refresh_token_abstract import (
+    ClientDevice,
+    IOpaqueRefreshToken,
+    RotationOutcome,
+    RotationResult,
+    SessionRecord,
+)
+from ...core.shards import ShardRouter, rekey, route
+from ...core.unit_of_work import transaction
 from ...models.refresh_token_model import RefreshToken
 
 
-class PostgresRefreshTokenRepository:
-    def __init__(self, async_session_factory):
+class PostgresRefreshTokenRepository(IOpaqueRefreshToken):
+    def __init__(self, async_session_factory, shards: ShardRouter | None = None):
         self._session_factory = async_session_factory
+        self._shards = shards
+
+    def _factory(self, key, *, write: bool = False):
+        # Token ids are minted in their user's bucket, so either key routes
+        return route(self._session_factory, self._shards, key, write=write)
 
     async def save_refresh_token(
-        self, token_id: str, user_id: int, token_hash: str, expires_at: datetime
+        self,
+        token_id: str,
+        user_id: int,
+        token_hash: bytes,
+        expires_at: datetime,
+        family_id: str | None = None,
+        device: ClientDevice | None = None,
     ):
-        async with self._session_factory() as session:
-            async with session.begin():
-                rt = RefreshToken(
-                    id=token_id,
-                    user_id=user_id,
-                    token_hash=token_hash,
-                    expires_at=expires_at,
-                )
-                session.add(rt)
+        device = device or ClientDevice()
+        async with transaction(self._factory(user_id, write=True)) as session:
+            rt = RefreshToken(
+                id=token_id,
+                user_id=user_id,
+                family_id=family_id or token_id,
+                user_agent=device.user_agent,
+                ip_address=device.ip_address,
+                token_hash=token_hash,
+                expires_at=expires_at,
+            )
+            session.add(rt)
+            await session.flush()
             await session.refresh(rt)
             return rt
 
     async def get_refresh_token_by_id(self, token_id: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                return await session.get(RefreshToken, token_id)
+        # The primary key is (id, expires_at), so look up by id alone
+        async with transaction(self._factory(token_id)) as session:
+            return await session.scalar(
+                select(RefreshToken).where(RefreshToken.id == token_id)
+            )
 
     async def revoke_refresh_token(self, token_id: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                rt = await session.get(RefreshToken, token_id)
-                if rt:
-                    rt.revoked = True
-
-    async def revoke_all_refresh_tokens_for_user(self, user_id: int):
-        async with self._session_factory() as session:
-            async with session.begin():
-                stmt = select(RefreshToken).where(
-                    RefreshToken.user_id == user_id, RefreshToken.revoked == False
+        async with transaction(self._factory(token_id, write=True)) as session:
+            await session.execute(
+                update(RefreshToken)
+                .where(RefreshToken.id == token_id)
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def revoke_all_refresh_tokens_for_user(self, user_id: int) -> int:
+        async with transaction(self._factory(user_id, write=True)) as session:
+            # Served by ix_refresh_tokens_user_sessions (partial, NOT revoked)
+            stmt = (
+                update(RefreshToken)
+                .where(RefreshToken.user_id == user_id, RefreshToken.revoked == False)
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(stmt)
+            return result.rowcount
+
+    async def revoke_refresh_token_family(self, family_id: str, user_id=None) -> int:
+        # Sessions of tokens minted before sharding have ids outside their
+        # user's bucket, so route by the user whenever the caller knows it
+        factory = self._factory(family_id if user_id is None else user_id, write=True)
+        async with transaction(factory) as session:
+            # Served by ix_refresh_tokens_family_id_active
+            stmt = (
+                update(RefreshToken)
+                .where(
+                    RefreshToken.family_id == family_id, RefreshToken.revoked == False
+                )
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+            if user_id is not None:
+                stmt = stmt.where(RefreshToken.user_id == user_id)
+            result = await session.execute(stmt)
+            return result.rowcount
+
+    async def list_active_sessions(
+        self,
+        user_id,
+        limit: int,
+        after: tuple[datetime, str] | None = None,
+    ) -> list[SessionRecord]:
+        # Matches ix_refresh_tokens_user_sessions column for column, so this
+        # is an index-only range scan that stops after `limit` rows
+        stmt = (
+            select(
+                RefreshToken.family_id,
+                RefreshToken.id,
+                RefreshToken.created_at,
+                RefreshToken.expires_at,
+                RefreshToken.user_agent,
+                RefreshToken.ip_address,
+            )
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.revoked == False,
+                RefreshToken.expires_at > datetime.now(timezone.utc),
+            )
+            .order_by(RefreshToken.created_at.desc(), RefreshToken.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(RefreshToken.created_at, RefreshToken.id) < tuple_(*after)
+            )
+        async with transaction(self._factory(user_id)) as session:
+            rows = (await session.execute(stmt)).all()
+        return [SessionRecord(*row) for row in rows]
+
+    async def rotate_refresh_token(
+        self,
+        token_id: str,
+        verify,
+        new_token_id: str,
+        new_token_hash: bytes,
+        new_expires_at: datetime,
+        presented_hash: bytes | None = None,
+    ) -> RotationResult:
+        async with transaction(self._factory(token_id, write=True)) as session:
+            # Claim the token: only one concurrent rotation can flip revoked
+            stmt = (
+                update(RefreshToken)
+                .where(RefreshToken.id == token_id, RefreshToken.revoked == False)
+                .values(revoked=True)
+                .returning(
+                    RefreshToken.user_id,
+                    RefreshToken.family_id,
+                    RefreshToken.token_hash,
+                    RefreshToken.expires_at,
+                    RefreshToken.user_agent,
+                    RefreshToken.ip_address,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            claimed = (await session.execute(stmt)).one_or_none()
+
+            if claimed is None:
+                # Slow path (attacks / races only): tell unknown from reused
+                existing = (
+                    await session.execute(
+                        select(RefreshToken.user_id, RefreshToken.family_id).where(
+                            RefreshToken.id == token_id
+                        )
+                    )
+                ).one_or_none()
+                if existing is None:
+                    return RotationResult(RotationOutcome.UNKNOWN)
+                return RotationResult(
+                    RotationOutcome.REUSED, existing.user_id, existing.family_id
+                )
+
+            # The claimed token stays revoked in every remaining outcome
+            matches = presented_hash is not None and hmac.compare_digest(
+                claimed.token_hash, presented_hash
+            )
+            if not matches and not await verify(claimed.token_hash):
+                return RotationResult(
+                    RotationOutcome.INVALID, claimed.user_id, claimed.family_id
+                )
+
+            if claimed.expires_at < datetime.now(timezone.utc):
+                return RotationResult(
+                    RotationOutcome.EXPIRED, claimed.user_id, claimed.family_id
+                )
+
+            # Normally a no-op; moves a token minted before sharding into
+            # its user's bucket, so the session follows the user from now on
+            successor_id = rekey(new_token_id, claimed.user_id)
+            await session.execute(
+                insert(RefreshToken).values(
+                    id=successor_id,
+                    user_id=claimed.user_id,
+                    family_id=claimed.family_id,
+                    user_agent=claimed.user_agent,
+                    ip_address=claimed.ip_address,
+                    token_hash=new_token_hash,
+                    expires_at=new_expires_at,
                 )
-                result = await session.execute(stmt)
-                tokens = result.scalars().all()
-                for t in tokens:
-                    t.revoked = True
+            )
+            return RotationResult(
+                RotationOutcome.ROTATED, claimed.user_id, claimed.family_id, successor_id
+            )
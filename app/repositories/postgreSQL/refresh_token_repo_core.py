@@ -0,0 +1,67 @@
+from dataclasses import fields
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select
+from ...domain.abstracts.refresh_token_abstract import ClientDevice, RefreshTokenRecord
+from ...core.unit_of_work import transaction
+from ...models.refresh_token_model import RefreshToken
+from .refresh_token_repo import PostgresRefreshTokenRepository
+
+_tokens = RefreshToken.__table__
+_COLUMNS = tuple(_tokens.c[field.name] for field in fields(RefreshTokenRecord))
+
+_INSERT = insert(_tokens).returning(_tokens.c.created_at)
+_BY_ID = select(*_COLUMNS).where(_tokens.c.id == bindparam("token_id"))
+
+
+class CoreRefreshTokenRepository(PostgresRefreshTokenRepository):
+    """
+    Postgres refresh-token store without ORM instances.
+
+    Revocation, rotation and session listing are already Core statements in
+    the base class; this replaces the two calls that built RefreshToken
+    objects (issue: add + flush + refresh, lookup) with a single INSERT ...
+    RETURNING and a column projection into RefreshTokenRecord.
+    """
+
+    async def save_refresh_token(
+        self,
+        token_id: str,
+        user_id: int,
+        token_hash: bytes,
+        expires_at: datetime,
+        family_id: str | None = None,
+        device: ClientDevice | None = None,
+    ):
+        device = device or ClientDevice()
+        record = RefreshTokenRecord(
+            id=token_id,
+            user_id=user_id,
+            family_id=family_id or token_id,
+            token_hash=token_hash,
+            revoked=False,
+            expires_at=expires_at,
+            user_agent=device.user_agent,
+            ip_address=device.ip_address,
+        )
+        async with transaction(self._factory(user_id, write=True)) as session:
+            result = await session.execute(
+                _INSERT,
+                {
+                    "id": record.id,
+                    "user_id": record.user_id,
+                    "family_id": record.family_id,
+                    "token_hash": record.token_hash,
+                    "revoked": False,
+                    "expires_at": record.expires_at,
+                    "user_agent": record.user_agent,
+                    "ip_address": record.ip_address,
+                },
+            )
+            record.created_at = result.scalar_one()
+        return record
+
+    async def get_refresh_token_by_id(self, token_id: str):
+        # The primary key is (id, expires_at), so look up by id alone
+        async with transaction(self._factory(token_id)) as session:
+            row = (await session.execute(_BY_ID, {"token_id": token_id})).first()
+        return RefreshTokenRecord(*row) if row is not None else None
@@ -0,0 +1,129 @@
+from dataclasses import fields
+from sqlalchemy import bindparam, insert, select, update
+from ...domain.abstracts.user_abstract import IUserRepository, UserRecord
+from ...core.replicas import ReplicaRouter, read
+from ...core.shards import ShardRouter, claim_email, index_email, route
+from ...core.unit_of_work import transaction
+from ...models.user_model import User
+from .user_repo_postgres import stale_on_replica
+
+_users = User.__table__
+# Columns in UserRecord field order, so a row maps onto it positionally
+_COLUMNS = tuple(_users.c[field.name] for field in fields(UserRecord))
+
+# Built once; SQLAlchemy's compiled cache then reuses the compiled SQL
+_BY_EMAIL = select(*_COLUMNS).where(_users.c.email == bindparam("email"))
+_BY_ID = select(*_COLUMNS).where(_users.c.id == bindparam("user_id"))
+_BY_ID_AND_EMAIL = _BY_ID.where(_users.c.email == bindparam("email"))
+_INSERT = insert(_users).returning(*_COLUMNS)
+_MARK_VERIFIED = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(is_verified=True)
+    .returning(*_COLUMNS)
+)
+_UPDATE_PASSWORD = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(hashed_password=bindparam("new_hash"))
+    .returning(*_COLUMNS)
+)
+
+
+def _record(row) -> UserRecord | None:
+    return UserRecord(*row) if row is not None else None
+
+
+class CoreUserRepository(IUserRepository):
+    """
+    IUserRepository on SQLAlchemy Core, returning UserRecord instead of User.
+
+    No identity map, attribute instrumentation or flush/refresh round trips:
+    writes use RETURNING, so each call is a single statement.
+    """
+
+    def __init__(
+        self,
+        async_session_factory,
+        replicas: ReplicaRouter | None = None,
+        shards: ShardRouter | None = None,
+    ):
+        self._session_factory = async_session_factory
+        self._replicas = replicas
+        self._shards = shards
+
+    async def get_user_by_email(self, email: str):
+        return await self._by_email(email, self._replicas)
+
+    async def get_user_for_login(self, email: str):
+        # Primary only: a lagging replica may still hold the old password hash
+        return await self._by_email(email, None)
+
+    async def _by_email(self, email: str, replicas: ReplicaRouter | None):
+        stmt, params, factory = _BY_EMAIL, {"email": email}, self._session_factory
+        if self._shards is not None:
+            # The email index names the user, so only that user's shard is queried
+            user_id = await self._shards.lookup_email(email)
+            if user_id is None:
+                return None
+            stmt, params["user_id"] = _BY_ID_AND_EMAIL, user_id
+            factory = route(self._session_factory, self._shards, user_id)
+
+        async def query(session):
+            result = await session.execute(stmt, params)
+            return _record(result.first())
+
+        return await read(factory, query, replicas, stale_on_replica)
+
+    async def get_user_by_id(self, user_id: str):
+        async def query(session):
+            result = await session.execute(_BY_ID, {"user_id": user_id})
+            return _record(result.first())
+
+        factory = route(self._session_factory, self._shards, user_id)
+        return await read(factory, query, self._replicas, stale_on_replica)
+
+    async def create_user(self, user_create, password_hash: str):
+        async with claim_email(self._shards, user_create.email) as user_id:
+            return await self._insert(
+                {
+                    "id": user_id,
+                    "name": user_create.name,
+                    "email": user_create.email,
+                    "hashed_password": password_hash,
+                }
+            )
+
+    async def _insert(self, values: dict):
+        factory = route(self._session_factory, self._shards, values["id"], write=True)
+        # savepoint: a duplicate email mustn't abort the request's transaction
+        async with transaction(factory, savepoint=True) as session:
+            user = _record((await session.execute(_INSERT, values)).one())
+            await index_email(session, self._shards, user.email, user.id)
+            return user
+
+    async def mark_verified(self, user_id: int):
+        factory = route(self._session_factory, self._shards, user_id, write=True)
+        async with transaction(factory) as session:
+            result = await session.execute(_MARK_VERIFIED, {"user_id": user_id})
+            return _record(result.first())
+
+    async def create_google_user(self, email: str, google_id: str, name: str):
+        async with claim_email(self._shards, email) as user_id:
+            return await self._insert(
+                {
+                    "id": user_id,
+                    "name": name,
+                    "email": email,
+                    "google_id": google_id,
+                    "is_verified": True,  # OAuth users are considered verified
+                }
+            )
+
+    async def update_password(self, user_id: int, hashed_password: str):
+        factory = route(self._session_factory, self._shards, user_id, write=True)
+        async with transaction(factory) as session:
+            result = await session.execute(
+                _UPDATE_PASSWORD, {"user_id": user_id, "new_hash": hashed_password}
+            )
+            return _record(result.first())
@@ -1,75 +1,114 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
 from ...domain.abstracts.user_abstract import IUserRepository
+from ...core.replicas import ReplicaRouter, read
+from ...core.shards import ShardRouter, claim_email, index_email, route
+from ...core.unit_of_work import transaction
 from ...models.user_model import User
 
 
+def stale_on_replica(user) -> bool:
+    """A replica may not have seen the signup or verification yet: ask the primary."""
+    return user is None or not user.is_verified
+
+
 class PostgresUserRepository(IUserRepository):
-    def __init__(self, async_session_factory):
+    def __init__(
+        self,
+        async_session_factory,
+        replicas: ReplicaRouter | None = None,
+        shards: ShardRouter | None = None,
+    ):
         self._session_factory = async_session_factory
+        self._replicas = replicas
+        self._shards = shards
 
     async def get_user_by_email(self, email: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                stmt = select(User).where(User.email == email)
-                result = await session.execute(stmt)
-                return result.scalars().first()
+        return await self._by_email(email, self._replicas)
+
+    async def get_user_for_login(self, email: str):
+        # Primary only: a lagging replica may still hold the old password hash
+        return await self._by_email(email, None)
+
+    async def _by_email(self, email: str, replicas: ReplicaRouter | None):
+        stmt = select(User).where(User.email == email)
+        factory = self._session_factory
+        if self._shards is not None:
+            # The email index names the user, so only that user's shard is queried
+            user_id = await self._shards.lookup_email(email)
+            if user_id is None:
+                return None
+            stmt = stmt.where(User.id == user_id)
+            factory = route(self._session_factory, self._shards, user_id)
+
+        async def query(session):
+            result = await session.execute(stmt)
+            return result.scalars().first()
+
+        return await read(factory, query, replicas, stale_on_replica)
 
     async def get_user_by_id(self, user_id: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == user_id)
-                result = await session.execute(stmt)
-                return result.scalars().first()
+        async def query(session):
+            stmt = select(User).where(User.id == user_id)
+            result = await session.execute(stmt)
+            return result.scalars().first()
+
+        factory = route(self._session_factory, self._shards, user_id)
+        return await read(factory, query, self._replicas, stale_on_replica)
 
     async def create_user(self, user_create, password_hash: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                user = User(
+        async with claim_email(self._shards, user_create.email) as user_id:
+            return await self._insert(
+                User(
+                    id=user_id,
                     name=user_create.name,
                     email=user_create.email,
                     hashed_password=password_hash,
                 )
-                session.add(user)
-                # begin() auto-commits on success, auto-rolls back on any exception.
-                # IntegrityError (duplicate email) will bubble up naturally.
-            # Refresh AFTER the transaction closes to reload DB-generated fields.
+            )
+
+    async def _insert(self, user: User):
+        factory = route(self._session_factory, self._shards, user.id, write=True)
+        # savepoint: a duplicate email mustn't abort the request's transaction
+        async with transaction(factory, savepoint=True) as session:
+            session.add(user)
+            # IntegrityError (duplicate email) will bubble up naturally.
+            # Flush, then refresh to load DB-generated fields (created_at).
+            await session.flush()
+            await index_email(session, self._shards, user.email, user.id)
             await session.refresh(user)
             return user
 
     async def mark_verified(self, user_id: int):
-        async with self._session_factory() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == user_id)
-                result = await session.execute(stmt)
-                user = result.scalars().first()
-                if user:
-                    user.is_verified = True
-            if user:
-                await session.refresh(user)
-            return user
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(is_verified=True)
+            .returning(User)
+        )
+        factory = route(self._session_factory, self._shards, user_id, write=True)
+        async with transaction(factory) as session:
+            return (await session.scalars(stmt)).one_or_none()
 
     async def create_google_user(self, email: str, google_id: str, name: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                user = User(
+        async with claim_email(self._shards, email) as user_id:
+            return await self._insert(
+                User(
+                    id=user_id,
                     name=name,
                     email=email,
                     google_id=google_id,
                     is_verified=True,  # OAuth users are considered verified
                 )
-                session.add(user)
-            await session.refresh(user)
-            return user
+            )
 
     async def update_password(self, user_id: int, hashed_password: str):
-        async with self._session_factory() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == user_id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
-                if not user:
-                    return None
-                user.hashed_password = hashed_password
-            await session.refresh(user)
-            return user
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(hashed_password=hashed_password)
+            .returning(User)
+        )
+        factory = route(self._session_factory, self._shards, user_id, write=True)
+        async with transaction(factory) as session:
+            return (await session.scalars(stmt)).one_or_none()
@@ -0,0 +1,352 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from ...domain.abstracts.refresh_token_abstract import (
+    ClientDevice,
+    IOpaqueRefreshToken,
+    RefreshTokenRecord,
+    RotationOutcome,
+    RotationResult,
+    SessionRecord,
+)
+
+TOKEN_KEY_PREFIX = "refresh_token:"
+USER_KEY_PREFIX = "refresh_tokens:user:"
+FAMILY_KEY_PREFIX = "refresh_tokens:family:"
+SESSIONS_KEY_PREFIX = "refresh_tokens:sessions:"
+
+# Shared helpers. Index sets live as long as their newest token.
+#
+# refresh_tokens:sessions:<user_id> holds the user's *live* tokens as
+# "<created_at, 10 digits>:<token_id>" members of a sorted set with equal
+# scores, so lexicographic order is (created_at, id) and a page is one
+# ZREVRANGEBYLEX from the previous page's last member.
+_HELPERS = """
+local function extend_ttl(key, ttl)
+    if redis.call('TTL', key) < ttl then
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+
+local function add_to_set(key, id, ttl)
+    redis.call('SADD', key, id)
+    extend_ttl(key, ttl)
+end
+
+local function session_member(created_at, id)
+    return string.format('%010d:%s', tonumber(created_at), id)
+end
+
+local function add_session(key, created_at, id, ttl)
+    redis.call('ZADD', key, 0, session_member(created_at, id))
+    extend_ttl(key, ttl)
+end
+
+-- mark one token revoked and drop it from its user's live sessions
+local function revoke(token_key, id, sessions_prefix)
+    local token = redis.call('HMGET', token_key, 'user_id', 'created_at')
+    redis.call('HSET', token_key, 'revoked', '1')
+    if token[1] and token[2] then
+        redis.call('ZREM', sessions_prefix .. token[1], session_member(token[2], id))
+    end
+end
+"""
+
+# KEYS: token, user set, family set, sessions
+# ARGV: token_id, user_id, hash_hex, expires_at, now, family_id, user_agent,
+#       ip_address
+_SAVE = _HELPERS + """
+redis.call('HSET', KEYS[1], 'user_id', ARGV[2], 'family_id', ARGV[6],
+           'token_hash', ARGV[3], 'revoked', '0', 'expires_at', ARGV[4],
+           'created_at', ARGV[5], 'user_agent', ARGV[7], 'ip_address', ARGV[8])
+redis.call('EXPIREAT', KEYS[1], ARGV[4])
+local ttl = tonumber(ARGV[4]) - tonumber(ARGV[5])
+add_to_set(KEYS[2], ARGV[1], ttl)
+add_to_set(KEYS[3], ARGV[1], ttl)
+add_session(KEYS[4], ARGV[5], ARGV[1], ttl)
+return 1
+"""
+
+# KEYS: token, successor
+# ARGV: now, presented_hash_hex, new_id, new_hash_hex, new_expires_at,
+#       user key prefix, family key prefix, token_id, sessions key prefix
+#
+# Claims the token (revoked=1) and, when the presented digest matches and it
+# hasn't expired, stores the successor in the same family. The index keys
+# are derived from the stored hash, so this needs a single Redis primary
+# (not Redis Cluster).
+_ROTATE = _HELPERS + """
+local token = redis.call('HMGET', KEYS[1], 'user_id', 'family_id', 'token_hash',
+                         'revoked', 'expires_at', 'user_agent', 'ip_address')
+-- tokens saved before families existed start their own
+local user_id, family_id = token[1], token[2] or ARGV[8]
+local user_agent, ip_address = token[6] or '', token[7] or ''
+if not user_id then
+    return {'unknown'}
+end
+if token[4] == '1' then
+    return {'reused', user_id, family_id}
+end
+revoke(KEYS[1], ARGV[8], ARGV[9])
+if token[3] ~= ARGV[2] then
+    return {'mismatch', user_id, family_id, token[3], token[5], user_agent, ip_address}
+end
+if tonumber(token[5]) < tonumber(ARGV[1]) then
+    return {'expired', user_id, family_id}
+end
+redis.call('HSET', KEYS[2], 'user_id', user_id, 'family_id', family_id,
+           'token_hash', ARGV[4], 'revoked', '0', 'expires_at', ARGV[5],
+           'created_at', ARGV[1], 'user_agent', user_agent, 'ip_address', ip_address)
+redis.call('EXPIREAT', KEYS[2], ARGV[5])
+local ttl = tonumber(ARGV[5]) - tonumber(ARGV[1])
+add_to_set(ARGV[6] .. user_id, ARGV[3], ttl)
+add_to_set(ARGV[7] .. family_id, ARGV[3], ttl)
+add_session(ARGV[9] .. user_id, ARGV[1], ARGV[3], ttl)
+return {'rotated', user_id, family_id}
+"""
+
+# KEYS: user or family set
+# ARGV: token key prefix, sessions key prefix, owner user_id ('' for any)
+_REVOKE_SET = _HELPERS + """
+local count = 0
+for _, id in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    local key = ARGV[1] .. id
+    local token = redis.call('HMGET', key, 'revoked', 'user_id')
+    if not token[1] then
+        redis.call('SREM', KEYS[1], id)  -- expired
+    elseif token[1] == '0' and (ARGV[3] == '' or token[2] == ARGV[3]) then
+        revoke(key, id, ARGV[2])
+        count = count + 1
+    end
+end
+return count
+"""
+
+# KEYS: token | ARGV: token_id, sessions key prefix
+_REVOKE = _HELPERS + """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    revoke(KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+
+def _epoch(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_epoch(value) -> datetime:
+    return datetime.fromtimestamp(int(value), tz=timezone.utc)
+
+
+def _session_member(created_at: datetime, token_id: str) -> str:
+    return f"{_epoch(created_at):010d}:{token_id}"
+
+
+class RedisRefreshTokenRepository(IOpaqueRefreshToken):
+    """
+    Refresh tokens as Redis hashes (`refresh_token:<id>`) that expire with
+    the token, plus sets of token ids per user (revoke-all) and per family
+    (revoke one login's lineage), and a per-user index of live sessions.
+
+    Rotation, reuse detection and revocation are Lua scripts, so each is
+    atomic on the server and a refresh is one round trip. Digests are stored
+    hex-encoded because the shared client decodes responses.
+    """
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._save = redis_client.register_script(_SAVE)
+        self._rotate = redis_client.register_script(_ROTATE)
+        self._revoke_set = redis_client.register_script(_REVOKE_SET)
+        self._revoke = redis_client.register_script(_REVOKE)
+
+    def _token_key(self, token_id: str) -> str:
+        return f"{TOKEN_KEY_PREFIX}{token_id}"
+
+    def _user_key(self, user_id) -> str:
+        return f"{USER_KEY_PREFIX}{user_id}"
+
+    def _family_key(self, family_id: str) -> str:
+        return f"{FAMILY_KEY_PREFIX}{family_id}"
+
+    def _sessions_key(self, user_id) -> str:
+        return f"{SESSIONS_KEY_PREFIX}{user_id}"
+
+    async def save_refresh_token(
+        self,
+        token_id: str,
+        user_id,
+        token_hash: bytes,
+        expires_at: datetime,
+        family_id: Optional[str] = None,
+        device: Optional[ClientDevice] = None,
+    ):
+        family_id = family_id or token_id
+        device = device or ClientDevice()
+        now = int(time.time())
+        await self._save(
+            keys=[
+                self._token_key(token_id),
+                self._user_key(user_id),
+                self._family_key(family_id),
+                self._sessions_key(user_id),
+            ],
+            args=[
+                token_id,
+                str(user_id),
+                token_hash.hex(),
+                _epoch(expires_at),
+                now,
+                family_id,
+                device.user_agent or "",
+                device.ip_address or "",
+            ],
+        )
+        return RefreshTokenRecord(
+            id=token_id,
+            user_id=str(user_id),
+            family_id=family_id,
+            token_hash=token_hash,
+            revoked=False,
+            expires_at=expires_at,
+            created_at=_from_epoch(now),
+            user_agent=device.user_agent,
+            ip_address=device.ip_address,
+        )
+
+    async def get_refresh_token_by_id(self, token_id: str):
+        fields = await self._redis.hgetall(self._token_key(token_id))
+        if not fields:
+            return None
+        return RefreshTokenRecord(
+            id=token_id,
+            user_id=fields["user_id"],
+            family_id=fields.get("family_id", token_id),
+            token_hash=bytes.fromhex(fields["token_hash"]),
+            revoked=fields["revoked"] == "1",
+            expires_at=_from_epoch(fields["expires_at"]),
+            created_at=_from_epoch(fields["created_at"]),
+            user_agent=fields.get("user_agent") or None,
+            ip_address=fields.get("ip_address") or None,
+        )
+
+    async def revoke_refresh_token(self, token_id: str):
+        await self._revoke(
+            keys=[self._token_key(token_id)], args=[token_id, SESSIONS_KEY_PREFIX]
+        )
+
+    async def revoke_all_refresh_tokens_for_user(self, user_id) -> int:
+        return await self._revoke_set(
+            keys=[self._user_key(user_id)],
+            args=[TOKEN_KEY_PREFIX, SESSIONS_KEY_PREFIX, ""],
+        )
+
+    async def revoke_refresh_token_family(self, family_id: str, user_id=None) -> int:
+        return await self._revoke_set(
+            keys=[self._family_key(family_id)],
+            args=[
+                TOKEN_KEY_PREFIX,
+                SESSIONS_KEY_PREFIX,
+                "" if user_id is None else str(user_id),
+            ],
+        )
+
+    async def list_active_sessions(
+        self,
+        user_id,
+        limit: int,
+        after: Optional[tuple[datetime, str]] = None,
+    ) -> list[SessionRecord]:
+        key = self._sessions_key(user_id)
+        upper = "(" + _session_member(*after) if after is not None else "+"
+        now = int(time.time())
+        sessions, stale = [], []
+
+        # Members whose token has expired are skipped (and pruned), so keep
+        # reading until the page is full or the index runs out
+        while len(sessions) < limit:
+            members = await self._redis.zrevrangebylex(
+                key, upper, "-", start=0, num=limit - len(sessions)
+            )
+            if not members:
+                break
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for member in members:
+                    pipe.hmget(
+                        self._token_key(member.split(":", 1)[1]),
+                        "family_id",
+                        "revoked",
+                        "expires_at",
+                        "user_agent",
+                        "ip_address",
+                    )
+                rows = await pipe.execute()
+
+            for member, row in zip(members, rows):
+                family_id, revoked, expires_at, user_agent, ip_address = row
+                if revoked != "0" or int(expires_at) <= now:
+                    stale.append(member)
+                    continue
+                created_at, token_id = member.split(":", 1)
+                sessions.append(
+                    SessionRecord(
+                        session_id=family_id or token_id,
+                        token_id=token_id,
+                        created_at=_from_epoch(created_at),
+                        expires_at=_from_epoch(expires_at),
+                        user_agent=user_agent or None,
+                        ip_address=ip_address or None,
+                    )
+                )
+            upper = "(" + members[-1]
+
+        if stale:
+            await self._redis.zrem(key, *stale)
+        return sessions
+
+    async def rotate_refresh_token(
+        self,
+        token_id: str,
+        verify,
+        new_token_id: str,
+        new_token_hash: bytes,
+        new_expires_at: datetime,
+        presented_hash: Optional[bytes] = None,
+    ) -> RotationResult:
+        now = int(time.time())
+        reply = await self._rotate(
+            keys=[self._token_key(token_id), self._token_key(new_token_id)],
+            args=[
+                now,
+                presented_hash.hex() if presented_hash is not None else "",
+                new_token_id,
+                new_token_hash.hex(),
+                _epoch(new_expires_at),
+                USER_KEY_PREFIX,
+                FAMILY_KEY_PREFIX,
+                token_id,
+                SESSIONS_KEY_PREFIX,
+            ],
+        )
+        if reply[0] != "mismatch":
+            return RotationResult(RotationOutcome(reply[0]), *reply[1:])
+
+        # Stored under an older digest key (or a legacy hash): the token is
+        # already claimed, so check it here and store the successor if valid
+        _, user_id, family_id, stored_hex, expires_at, user_agent, ip_address = reply
+        if not await verify(bytes.fromhex(stored_hex)):
+            return RotationResult(RotationOutcome.INVALID, user_id, family_id)
+        if int(expires_at) < now:
+            return RotationResult(RotationOutcome.EXPIRED, user_id, family_id)
+        await self.save_refresh_token(
+            new_token_id,
+            user_id,
+            new_token_hash,
+            new_expires_at,
+            family_id,
+            ClientDevice(user_agent or None, ip_address or None),
+        )
+        return RotationResult(RotationOutcome.ROTATED, user_id, family_id)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import Optional
 from datetime import datetime
+from ..core.config import INTROSPECTION_MAX_BATCH
 
 
 class LoginDTO(BaseModel):
@@ -16,3 +18,38 @@ class TokenDTO(BaseModel):
     refresh_token_raw: str
     expires_at: datetime
     token_type: str = "bearer"
+
+
+class IntrospectionRequestDTO(BaseModel):
+    tokens: list[str] = Field(..., min_length=1, max_length=INTROSPECTION_MAX_BATCH)
+
+
+class IntrospectionResultDTO(BaseModel):
+    # RFC 7662: inactive tokens only carry "active": false
+    active: bool
+    sub: Optional[str] = None
+    role: Optional[list[str]] = None
+    iat: Optional[int] = None
+    exp: Optional[int] = None
+    token_type: Optional[str] = None
+    revoked: Optional[bool] = None
+    cache_max_age: Optional[int] = None
+
+
+class IntrospectionResponseDTO(BaseModel):
+    results: list[IntrospectionResultDTO]
+
+
+class SessionDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    session_id: str
+    created_at: datetime  # last sign-in or refresh
+    expires_at: datetime
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+
+
+class SessionListResponseDTO(BaseModel):
+    sessions: list[SessionDTO]
+    next_cursor: Optional[str] = None
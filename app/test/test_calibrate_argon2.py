@@ -0,0 +1,31 @@
+import pytest
+from ..cli import calibrate_argon2
+
+
+@pytest.fixture
+def latency(monkeypatch):
+    """Fake host: p50 of 1 ms per MiB per pass, p99 twice that."""
+
+    def measure(time_cost, memory_cost, parallelism, samples):
+        p50 = time_cost * memory_cost / 1024
+        return p50, 2 * p50
+
+    monkeypatch.setattr(calibrate_argon2, "measure", measure)
+
+
+def test_calibrate_prefers_memory_then_spends_the_rest_on_time_cost(latency):
+    profile = calibrate_argon2.calibrate(200, 400, max_memory_mib=64, samples=1)
+    assert (profile["time_cost"], profile["memory_cost"]) == (3, 64 * 1024)
+
+
+def test_calibrate_halves_memory_until_the_targets_are_met(latency):
+    profile = calibrate_argon2.calibrate(40, 80, max_memory_mib=64, samples=1)
+    assert (profile["time_cost"], profile["memory_cost"]) == (1, 32 * 1024)
+
+
+def test_calibrate_needs_two_passes_at_the_memory_floor(latency):
+    floor = calibrate_argon2.MIN_MEMORY_MIB
+    assert calibrate_argon2.calibrate(floor * 1.5, floor * 3, max_memory_mib=floor) is None
+    profile = calibrate_argon2.calibrate(floor * 2, floor * 4, max_memory_mib=floor)
+    assert (profile["time_cost"], profile["memory_cost"]) == (2, floor * 1024)
+    assert calibrate_argon2.main(["--target-p50-ms", "1", "--max-memory-mib", "64"]) == 1
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from ..core.container import Container
+
+
+class Part:
+    """Stands in for a pool or background task; records what happened to it."""
+
+    def __init__(self, events, name):
+        self.events, self.name = events, name
+
+    def start(self):
+        self.events.append(f"{self.name} started")
+
+    async def stop(self):
+        self.events.append(f"{self.name} stopped")
+
+    async def ping(self):
+        pass
+
+    async def aclose(self):
+        self.events.append(f"{self.name} closed")
+
+    async def dispose(self):
+        self.events.append(f"{self.name} disposed")
+
+    async def hash(self, plain):
+        raise RuntimeError("hasher failed to start")
+
+
+def test_a_failed_startup_stops_what_it_already_started():
+    events = []
+    container = Container.__new__(Container)
+    container.redis = Part(events, "redis")
+    container.revocations = Part(events, "revocations")
+    container.replicas = Part(events, "replicas")
+    container.hasher = Part(events, "hasher")
+    container.engine = Part(events, "engine")
+    container.shards, container.user_repo, container.token_sweepers = None, None, []
+
+    async def warm_db_pool():
+        pass
+
+    container._warm_db_pool = warm_db_pool
+    with pytest.raises(RuntimeError):
+        asyncio.run(container.startup())
+
+    assert events == [
+        "revocations started",
+        "replicas started",
+        "revocations stopped",
+        "replicas stopped",
+        "redis closed",
+        "engine disposed",
+    ]
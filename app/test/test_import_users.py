@@ -0,0 +1,65 @@
+import pytest
+from ..cli.import_users import Checkpoint, next_batch, parse_row, read_rows
+
+
+def test_parse_row_normalises_and_validates():
+    row = parse_row(
+        1,
+        {"name": " Ada ", "email": " Ada@Example.COM ", "password": "s3cret-pw"},
+        verified=True,
+    )
+    assert (row.name, row.email, row.is_verified, row.password) == (
+        "Ada",
+        "ada@example.com",
+        True,
+        "s3cret-pw",
+    )
+
+    hashed = parse_row(
+        2,
+        {
+            "name": "B",
+            "email": "b@example.com",
+            "password_hash": "$argon2id$v=19$x",
+            "is_verified": "0",
+        },
+        verified=True,
+    )
+    assert hashed.password_hash == "$argon2id$v=19$x" and not hashed.is_verified
+
+    for bad, reason in [
+        ({"name": "C", "email": "nope", "password": "long-enough"}, "invalid email"),
+        ({"name": "C", "email": "c@example.com", "password": "short"}, "password too short"),
+        ({"name": "C", "email": "c@example.com", "password_hash": "$2b$12$bcrypt"}, "unsupported password hash"),
+        ({"email": "c@example.com", "password": "long-enough"}, "missing name"),
+        (None, "malformed row"),
+    ]:
+        with pytest.raises(ValueError, match=reason):
+            parse_row(3, bad, verified=False)
+
+
+def test_batches_and_resume(tmp_path):
+    source = tmp_path / "users.jsonl"
+    source.write_text(
+        '{"name": "A", "email": "a@example.com", "password": "password-a"}\n'
+        "not json\n"
+        "\n"
+        '{"name": "C", "email": "c@example.com", "password": "password-c"}\n'
+    )
+    rows = read_rows(str(source), "jsonl")
+
+    first = next_batch(rows, 2, verified=False)
+    assert first.last_row_no == 2
+    assert [r.email for r in first.rows] == ["a@example.com"]
+    assert first.rejected == [(2, "", "malformed row")]
+
+    second = next_batch(rows, 2, verified=False)
+    assert second.last_row_no == 3 and len(second.rows) == 1
+    assert next_batch(rows, 2, verified=False) is None
+
+    checkpoint = Checkpoint(str(tmp_path / "ckpt"), str(source))
+    checkpoint.rows, checkpoint.inserted, checkpoint.rejected = 2, 1, 1
+    checkpoint.save()
+    assert Checkpoint.load(checkpoint.path, str(source)).rows == 2
+    with pytest.raises(SystemExit):
+        Checkpoint.load(checkpoint.path, "other.jsonl")
@@ -0,0 +1,65 @@
+import time
+import pytest
+from jose import jwt, jwk, JWTError, ExpiredSignatureError
+from ..core.jwt_codec import JWTCodec
+from ..core.signing_keys import generate_key
+
+SECRET = "test-secret"
+
+
+def _claims(exp_in: int = 60) -> dict:
+    now = int(time.time())
+    return {"sub": "42", "role": ["user"], "iat": now, "exp": now + exp_in}
+
+
+def test_hs256_compatible_with_jose():
+    codec = JWTCodec(SECRET)
+    claims = _claims()
+
+    assert codec.encode_hs256(claims) == jwt.encode(claims, SECRET, algorithm="HS256")
+    assert codec.decode(jwt.encode(claims, SECRET, algorithm="HS256")) == claims
+    assert jwt.decode(codec.encode_hs256(claims), SECRET, algorithms=["HS256"]) == claims
+
+
+def test_es256_compatible_with_jose():
+    codec = JWTCodec(SECRET)
+    entry = generate_key()
+    key = jwk.construct(entry["private_key"], "ES256")
+    claims = _claims()
+
+    token = codec.encode_es256(claims, entry["kid"], key.prepared_key)
+    assert jwt.get_unverified_header(token)["kid"] == entry["kid"]
+    assert jwt.decode(token, key.public_key(), algorithms=["ES256"]) == claims
+
+    jose_token = jwt.encode(claims, key, algorithm="ES256", headers={"kid": entry["kid"]})
+    resolve = {entry["kid"]: key.public_key().prepared_key}.get
+    assert codec.decode(jose_token, resolve) == claims
+
+
+def test_rejects_bad_tokens():
+    codec = JWTCodec(SECRET)
+
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(codec.encode_hs256(_claims(exp_in=-1)))
+    with pytest.raises(JWTError):
+        codec.decode(jwt.encode(_claims(), "other-secret", algorithm="HS256"))
+    with pytest.raises(JWTError):
+        codec.decode(jwt.encode(_claims(), SECRET, algorithm="HS512"))
+    with pytest.raises(JWTError):
+        codec.decode("not-a-token")
+
+
+def test_hs256_only_accepted_within_the_migration_window():
+    codec = JWTCodec(SECRET)
+    now = time.time()
+    legacy = codec.encode_hs256(_claims(exp_in=60))
+
+    assert codec.decode(legacy, hs256_until=now + 120)["sub"] == "42"
+    # Freshly minted with the old secret once the window has closed
+    with pytest.raises(JWTError):
+        codec.decode(codec.encode_hs256(_claims()), hs256_until=now - 1)
+    # ...or minted to outlive it
+    with pytest.raises(JWTError):
+        codec.decode(codec.encode_hs256(_claims(exp_in=3600)), hs256_until=now + 120)
+    with pytest.raises(JWTError):
+        codec.decode(legacy, hs256_until=0.0)
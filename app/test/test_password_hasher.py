@@ -0,0 +1,110 @@
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+import pytest
+from fastapi import BackgroundTasks
+from ..domain.auth import auth_service
+from ..domain.auth.auth_service import AuthService
+from ..schema.auth_dto import LoginDTO
+from ..utils.password_hasher import (
+    Argon2PasswordHasher,
+    HasherBusyError,
+    ProcessPoolPasswordHasher,
+)
+
+pytest.importorskip("argon2")
+
+
+def make_hasher():
+    # Cheap parameters; one slot and no queue
+    return ProcessPoolPasswordHasher(
+        workers=1, max_queue=0, retry_after=7, time_cost=1, memory_cost=8, parallelism=1
+    )
+
+
+def test_full_queue_is_rejected_with_503_and_retry_after():
+    hasher = make_hasher()
+
+    async def main():
+        first = asyncio.create_task(hasher.hash("first"))
+        await asyncio.sleep(0)  # let it take the only slot
+        with pytest.raises(HasherBusyError) as busy:
+            await hasher.hash("second")
+        await first
+        return busy.value
+
+    try:
+        busy = asyncio.run(main())
+    finally:
+        hasher.close()
+    assert busy.status_code == 503 and busy.headers == {"Retry-After": "7"}
+    assert hasher.stats()["rejected"] == 1 and hasher.stats()["in_flight"] == 0
+
+
+def test_pool_is_rebuilt_after_a_worker_dies():
+    hasher = make_hasher()
+
+    async def main():
+        with pytest.raises(HasherBusyError):
+            await hasher._run(os._exit, 1)
+        return await hasher.verify(await hasher.hash("secret"), "secret")
+
+    try:
+        assert asyncio.run(main())
+    finally:
+        hasher.close()
+    assert hasher.stats()["in_flight"] == 0
+
+
+def _old_profile_hash(plain):
+    from argon2 import PasswordHasher as _PH, Type
+
+    return _PH(time_cost=1, memory_cost=8, parallelism=1, type=Type.ID).hash(plain)
+
+
+def test_hashes_from_an_older_profile_need_a_rehash():
+    old = _old_profile_hash("secret")
+    current = Argon2PasswordHasher(time_cost=2, memory_cost=16, parallelism=1)
+    pooled = ProcessPoolPasswordHasher(workers=1, time_cost=2, memory_cost=16, parallelism=1)
+    fresh = asyncio.run(current.hash("secret"))
+
+    for hasher in (current, pooled):
+        assert hasher.needs_rehash(old)
+        assert not hasher.needs_rehash(fresh)
+        assert not hasher.needs_rehash("not-an-argon2-hash")
+
+
+def test_login_rehashes_an_old_profile_hash_after_the_response(monkeypatch):
+    monkeypatch.setattr(auth_service, "create_access_token", lambda **claims: "access")
+    hasher = Argon2PasswordHasher(time_cost=2, memory_cost=16, parallelism=1)
+    user = SimpleNamespace(id=uuid.uuid4(), role="user", is_verified=True)
+    user.hashed_password = _old_profile_hash("secret12")
+    stored = {}
+
+    class Users:
+        async def get_user_for_login(self, email):
+            return user
+
+        async def update_password(self, user_id, hashed_password):
+            stored[user_id] = hashed_password
+
+    class RefreshTokens:
+        async def save_refresh_token(self, **kwargs):
+            pass
+
+    class Digest:
+        def digest(self, secret):
+            return b""
+
+    auth = AuthService(Users(), hasher, RefreshTokens(), Digest(), None)
+    background = BackgroundTasks()
+
+    async def main():
+        await auth.login(LoginDTO(email="a@example.com", password="secret12"), None, background)
+        assert stored == {}  # not on the response path
+        await background()
+
+    asyncio.run(main())
+    assert not hasher.needs_rehash(stored[user.id])
+    assert asyncio.run(hasher.verify(stored[user.id], "secret12"))
@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from ..core.pools import TimedBlockingRedisConnectionPool, TimedRedisConnectionPool
+
+# Nothing listens here, so connecting is refused straight away
+UNREACHABLE = {"host": "127.0.0.1", "port": 1}
+
+
+async def _ping(pool):
+    with pytest.raises(RedisConnectionError):
+        await Redis(connection_pool=pool).ping()
+    await pool.disconnect()
+    return pool.wait_stats.as_dict()
+
+
+def test_redis_pool_tells_exhaustion_from_connect_errors():
+    refused = asyncio.run(_ping(TimedRedisConnectionPool(**UNREACHABLE)))
+    assert (refused["timeouts"], refused["connect_errors"]) == (0, 1)
+
+    # Its only connection is checked out and never released
+    full = TimedBlockingRedisConnectionPool(max_connections=1, timeout=0.05, **UNREACHABLE)
+    full._created_connections = 1
+    full._in_use_connections.add(full.make_connection())
+    exhausted = asyncio.run(_ping(full))
+    assert (exhausted["timeouts"], exhausted["connect_errors"]) == (1, 0)
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from ..domain.auth.rate_limit_service import RateLimitExceededError, RateLimitService
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_login_limiter_allows_the_quota_then_reports_retry_after():
+    async def main():
+        svc = RateLimitService(fakeredis.FakeAsyncRedis(decode_responses=True))
+        results = [
+            await svc.check_and_increment("10.0.0.1", "a@example.com")
+            for _ in range(RateLimitService.MAX_ATTEMPTS)
+        ]
+        with pytest.raises(RateLimitExceededError) as denied:
+            await svc.check_and_increment("10.0.0.1", "a@example.com")
+        other = await svc.check_and_increment("10.0.0.2", "a@example.com")
+        await svc.clear_limit("10.0.0.1", "a@example.com")
+        cleared = await svc.check_and_increment("10.0.0.1", "a@example.com")
+        return results, denied.value.result, other, cleared
+
+    results, denied, other, cleared = asyncio.run(main())
+    interval = RateLimitService.WINDOW_SECONDS // RateLimitService.MAX_ATTEMPTS
+
+    assert [r.remaining for r in results] == [4, 3, 2, 1, 0]
+    assert results[-1].reset_after_seconds == RateLimitService.WINDOW_SECONDS
+    # One attempt comes back per interval, not the whole window at once
+    assert denied.headers()["Retry-After"] == str(interval)
+    assert denied.headers()["RateLimit-Remaining"] == "0"
+    assert other.remaining == cleared.remaining == 4
+
+
+def test_exceeded_keys_are_refused_locally_and_limits_hold_without_redis():
+    server = fakeredis.FakeServer()
+
+    async def attempts(svc, ip, count):
+        outcomes = []
+        for _ in range(count):
+            try:
+                outcomes.append((await svc.check_and_increment(ip, "a@example.com")).remaining)
+            except RateLimitExceededError:
+                outcomes.append(None)
+        return outcomes
+
+    async def main():
+        svc = RateLimitService(fakeredis.FakeAsyncRedis(server=server), local_size=10)
+        before = await attempts(svc, "10.0.0.1", 7)
+        server.connected = False
+        during = await attempts(svc, "10.0.0.2", 6)
+        return svc, before, during
+
+    svc, before, during = asyncio.run(main())
+
+    assert before == [4, 3, 2, 1, 0, None, None]
+    assert during == [4, 3, 2, 1, 0, None]
+    stats = svc.stats()
+    assert stats["redis_checks"] == 5 and stats["local_rejections"] == 3
+    assert stats["degraded_checks"] == 5
+
+
+def test_an_unresponsive_redis_falls_back_after_the_timeout():
+    class HangingRedis:
+        def register_script(self, script):
+            async def run(**kwargs):
+                await asyncio.sleep(3600)
+
+            return run
+
+        async def delete(self, key):
+            await asyncio.sleep(3600)
+
+    async def main():
+        svc = RateLimitService(HangingRedis(), redis_timeout_seconds=0.05)
+        result = await svc.check_and_increment("10.0.0.1", "a@example.com")
+        await svc.clear_limit("10.0.0.1", "a@example.com")
+        return svc, result
+
+    started = time.monotonic()
+    svc, result = asyncio.run(main())
+    assert time.monotonic() - started < 1
+    assert result.allowed and result.remaining == 4
+    assert svc.stats()["degraded_checks"] == 1
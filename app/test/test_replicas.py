@@ -0,0 +1,194 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from ..core.replicas import Replica, ReplicaRouter, assess_replica
+from ..core.unit_of_work import UnitOfWork
+from ..domain.users.email_verification_service import EmailVerificationService
+from ..domain.users.password_reset_service import PasswordResetService
+from ..repositories.postgreSQL.email_verify_tokens_repo import EmailVerifyTokensRepo
+from ..repositories.postgreSQL.password_reset_repo import PasswordResetTokenRepo
+from ..repositories.postgreSQL.user_repo_core import CoreUserRepository
+from ..repositories.postgreSQL.user_repo_postgres import PostgresUserRepository
+
+
+class FakeSession:
+    def __init__(self, name):
+        self.name = name
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+def make_router(*healthy):
+    replicas = []
+    for i, ok in enumerate(healthy):
+        replica = Replica.__new__(Replica)
+        replica.name, replica.engine, replica.lag, replica.healthy = f"r{i}", None, 0, ok
+        replica.session_factory = lambda name=f"r{i}": FakeSession(name)
+        replicas.append(replica)
+    return ReplicaRouter(replicas, max_lag_seconds=1, check_interval_seconds=1)
+
+
+async def where(session):
+    return session.name
+
+
+def primary():
+    return FakeSession("primary")
+
+
+def run(coro_fn):
+    # fresh context per call, like one request
+    return asyncio.run(coro_fn())
+
+
+def test_reads_round_robin_over_healthy_replicas():
+    router = make_router(True, False, True)
+
+    async def main():
+        return [await router.read(primary, where) for _ in range(4)]
+
+    assert run(main) == ["r0", "r2", "r0", "r2"]
+
+
+def test_unhealthy_replicas_and_rechecks_fall_back_to_primary():
+    assert run(lambda: make_router(False).read(primary, where)) == "primary"
+
+    router = make_router(True)
+    assert run(lambda: router.read(primary, where, lambda name: name == "r0")) == "primary"
+    assert router.rechecks == 1
+
+
+def test_primary_is_pinned_inside_a_unit_of_work_and_after_using_it():
+    router = make_router(True)
+
+    async def in_unit_of_work():
+        async with UnitOfWork(lambda: _UowSession()):
+            return await router.read(primary, where)
+
+    async def after_primary_read():
+        await router.read(primary, where, lambda name: True)  # forced onto the primary
+        return await router.read(primary, where)
+
+    assert run(in_unit_of_work) == "uow"
+    assert run(after_primary_read) == "primary"
+
+
+class _UowSession(FakeSession):
+    def __init__(self):
+        super().__init__("uow")
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _LagEngine:
+    """Engine whose LAG_QUERY returns `row`."""
+
+    def __init__(self, row):
+        self.row = row
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+    async def execute(self, statement):
+        return self
+
+    def one(self):
+        return self.row
+
+
+def test_replicas_that_stopped_receiving_are_unhealthy():
+    router = make_router(True)
+    replica = router._replicas[0]
+
+    # caught up and streaming, last keepalive 2s ago
+    replica.engine = _LagEngine((True, True, 0, 2.0))
+    asyncio.run(router.check_lag())
+    assert replica.healthy and replica.lag == 0
+
+    # WAL receiver disconnected: receive and replay LSNs agree, so replay lag reads 0
+    replica.engine = _LagEngine((True, False, 0, None))
+    asyncio.run(router.check_lag())
+    assert not replica.healthy and replica.lag is None
+
+    limits = {"max_lag": 1, "max_silence": 35}
+    assert assess_replica(False, False, 0, None, **limits) == (None, False)  # promoted
+    assert assess_replica(True, True, 0, 120.0, **limits) == (0.0, False)  # silent
+
+
+class _PrimarySession(FakeSession):
+    """get() returns the session's name; queries find no rows."""
+
+    async def get(self, model, key):
+        return self.name
+
+    async def execute(self, statement, params=None):
+        return self
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return None
+
+
+class _NoReplicaReads(ReplicaRouter):
+    def __init__(self):
+        super().__init__([], max_lag_seconds=1, check_interval_seconds=1)
+
+    async def read(self, primary_factory, query, recheck=None):
+        raise AssertionError("read went through the replica router")
+
+
+def test_single_use_tokens_and_login_read_the_primary():
+    router = make_router(True)
+    session = lambda: _PrimarySession("primary")  # noqa: E731
+    for repo_class in (PasswordResetTokenRepo, EmailVerifyTokensRepo):
+        repo = repo_class(session, router)
+        assert run(lambda: repo.get_token_by_id("token")) == "primary"
+
+    for repo_class in (PostgresUserRepository, CoreUserRepository):
+        repo = repo_class(session, _NoReplicaReads())
+        assert run(lambda: repo.get_user_for_login("a@example.com")) is None
+
+
+def test_a_token_is_rejected_once_another_request_deleted_it():
+    class Tokens:
+        async def get_token_by_id(self, token_id):
+            expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+            return SimpleNamespace(user_id=1, hashed_token=b"", expires_at=expires_at)
+
+        async def delete_token(self, token_id):
+            return None  # a concurrent confirm already used it
+
+    class Digest:
+        async def verify(self, stored, secret):
+            return True
+
+    services = (
+        PasswordResetService(Tokens(), None, None, None, Digest(), None, None),
+        EmailVerificationService(Tokens(), None, Digest()),
+    )
+    for service in services:
+        with pytest.raises(ValueError):
+            run(lambda: service.verify_token("token.secret"))
@@ -0,0 +1,56 @@
+import asyncio
+from ..core.revocation import AccessTokenRevocations
+from ..domain.auth.auth_service import AuthService
+from ..domain.users.password_reset_service import PasswordResetService
+from ..schema.user_dto import NewPasswordDTO
+
+
+class DownRedis:
+    def pipeline(self, transaction=True):
+        raise ConnectionError("Connection refused")
+
+    async def get(self, key):
+        raise ConnectionError("Connection refused")
+
+
+class RefreshTokens:
+    def __init__(self):
+        self.revoked = []
+
+    async def revoke_all_refresh_tokens_for_user(self, user_id):
+        self.revoked.append(user_id)
+        return 2
+
+
+def test_logout_and_password_reset_succeed_while_redis_is_down():
+    revocations = AccessTokenRevocations(DownRedis(), token_lifetime_seconds=900)
+    refresh_tokens = RefreshTokens()
+    passwords = {}
+
+    class Users:
+        async def update_password(self, user_id, hashed_password):
+            passwords[user_id] = hashed_password
+
+    class Hasher:
+        async def hash(self, password):
+            return f"hashed:{password}"
+
+    reset = PasswordResetService(None, None, None, Hasher(), None, refresh_tokens, revocations)
+
+    async def verify_token(raw_token):
+        return "u2"
+
+    reset.verify_token = verify_token
+    auth = AuthService(None, None, refresh_tokens, None, revocations)
+
+    async def main():
+        await auth.logout("u1")
+        dto = NewPasswordDTO(new_password="N3w-passw0rd!")
+        await reset.reset_password("token.secret", dto, Users())
+        # this worker still refuses the revoked users' tokens (fails closed)
+        return await revocations.is_revoked("u1", 0)
+
+    assert asyncio.run(main())
+    assert refresh_tokens.revoked == ["u1", "u2"]
+    assert passwords == {"u2": "hashed:N3w-passw0rd!"}
+    assert revocations.stats()["revoke_failures"] == 2
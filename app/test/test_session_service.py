@@ -0,0 +1,22 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from ..domain.abstracts.refresh_token_abstract import SessionRecord
+from ..domain.auth.session_service import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip_keeps_microseconds():
+    created = datetime(2026, 10, 18, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    record = SessionRecord(
+        session_id="fam",
+        token_id="abc123",
+        created_at=created,
+        expires_at=created + timedelta(days=7),
+    )
+
+    assert decode_cursor(encode_cursor(record)) == (created, "abc123")
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bnVsbA", "WzEsMiwzXQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,93 @@
+import asyncio
+import time
+import uuid
+import pytest
+from ..cli.reshard import parse_buckets, plan_rebalance
+from ..core.shards import (
+    BUCKET_MASK,
+    Shard,
+    ShardRouter,
+    ShardUnavailableError,
+    bucket_of,
+    index_email,
+    new_token_id,
+    route,
+)
+
+
+def make_router(owners, frozen=()):
+    shards = []
+    for index in range(max(owners) + 1):
+        shard = Shard.__new__(Shard)
+        shard.index, shard.name, shard.engine = index, f"s{index}", None
+        shard.session_factory = f"factory-{index}"
+        shards.append(shard)
+    router = ShardRouter(shards, None, refresh_interval_seconds=1)
+    router._owners, router._frozen = list(owners), frozenset(frozen)
+    router._loaded_at = time.monotonic()
+    return router
+
+
+def test_bucket_is_the_same_for_every_form_of_an_id():
+    user_id = uuid.uuid4()
+    bucket = bucket_of(user_id)
+    assert bucket == user_id.int & BUCKET_MASK
+    assert bucket_of(str(user_id)) == bucket_of(user_id.hex) == bucket
+
+    token_id = new_token_id(user_id)
+    assert bucket_of(token_id) == bucket
+    # A rotated token stays with its user
+    assert bucket_of(new_token_id(token_id)) == bucket
+    assert 0 <= bucket_of("not-an-id") <= BUCKET_MASK
+
+
+def test_routing_by_owner_and_frozen_buckets():
+    owners = [index % 2 for index in range(BUCKET_MASK + 1)]
+    user_id = uuid.uuid4()
+    bucket = bucket_of(user_id)
+    router = make_router(owners, frozen={bucket})
+
+    assert route("default", None, user_id) == "default"
+    assert route("default", router, user_id) == f"factory-{bucket % 2}"
+    with pytest.raises(ShardUnavailableError):
+        router.shard_for(user_id, write=True)
+    assert bucket_of(router.new_user_id()) != bucket
+
+    router._frozen = frozenset()
+    router._loaded_at -= router.max_map_age + 1
+    with pytest.raises(ShardUnavailableError):
+        router.shard_for(user_id, write=True)
+    # Reads keep working on a stale map
+    assert router.shard_for(user_id).index == bucket % 2
+
+
+def test_rebalance_plan_and_bucket_ranges():
+    assert parse_buckets(["3", "5-7"]) == [3, 5, 6, 7]
+    with pytest.raises(SystemExit):
+        parse_buckets([str(BUCKET_MASK + 1)])
+
+    moves = plan_rebalance([0] * 8, 3)
+    assert len(moves) == 5
+    owners = [0] * 8
+    for bucket, target in moves:
+        owners[bucket] = target
+    assert sorted(owners.count(shard) for shard in range(3)) == [2, 3, 3]
+    assert plan_rebalance(owners, 3) == []
+
+
+def test_new_users_are_indexed_while_unsharded():
+    class Session:
+        def __init__(self):
+            self.params = []
+
+        async def execute(self, statement, params):
+            self.params.append(params)
+
+    user_id = uuid.uuid4()
+    unsharded, sharded = Session(), Session()
+    asyncio.run(index_email(unsharded, None, "a@example.com", user_id))
+    # With sharding, claim_email() wrote the index entry on DATABASE_URL
+    asyncio.run(index_email(sharded, make_router([0]), "a@example.com", user_id))
+
+    assert unsharded.params == [{"email": "a@example.com", "user_id": user_id}]
+    assert sharded.params == []
@@ -0,0 +1,32 @@
+import time
+from ..core.token_cache import VerifiedTokenCache
+
+
+def test_hit_and_miss_counters():
+    cache = VerifiedTokenCache(max_size=10)
+    claims = {"sub": "1", "exp": time.time() + 60}
+
+    assert cache.get("token") is None
+    cache.put("token", claims)
+    assert cache.get("token") == claims
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_evicted():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("token", {"sub": "1", "exp": time.time() - 1})
+
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_size_cap_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.put("a", {"exp": exp})
+    cache.put("b", {"exp": exp})
+    cache.get("a")
+    cache.put("c", {"exp": exp})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
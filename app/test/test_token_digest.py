@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from ..utils.token_digest import HmacTokenDigest, parse_digest_keys
+from ..utils.password_hasher import Argon2PasswordHasher
+
+
+def test_digest_roundtrip():
+    digest = HmacTokenDigest({1: b"key-one"})
+    stored = digest.digest("secret")
+
+    assert len(stored) == 33 and stored[0] == 1
+    assert asyncio.run(digest.verify(stored, "secret"))
+    assert not asyncio.run(digest.verify(stored, "other"))
+
+
+def test_old_key_version_still_verifies():
+    old = HmacTokenDigest({1: b"key-one"})
+    stored = old.digest("secret")
+
+    rotated = HmacTokenDigest({1: b"key-one", 2: b"key-two"})
+    assert rotated.digest("secret")[0] == 2
+    assert asyncio.run(rotated.verify(stored, "secret"))
+
+    retired = HmacTokenDigest({2: b"key-two"})
+    assert not asyncio.run(retired.verify(stored, "secret"))
+
+
+def test_legacy_argon2_hash():
+    hasher = Argon2PasswordHasher(time_cost=1, memory_cost=1024)
+    legacy = asyncio.run(hasher.hash("secret")).encode()
+
+    digest = HmacTokenDigest({1: b"key-one"}, legacy_hasher=hasher)
+    assert asyncio.run(digest.verify(legacy, "secret"))
+    assert not asyncio.run(digest.verify(legacy, "other"))
+    assert not asyncio.run(HmacTokenDigest({1: b"k"}).verify(legacy, "secret"))
+
+
+def test_parse_digest_keys():
+    assert parse_digest_keys("1:a, 2:b") == {1: b"a", 2: b"b"}
+    with pytest.raises(ValueError):
+        parse_digest_keys("0:a")
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+from ..core.token_sweeper import (
+    parse_partition_bound,
+    partition_name,
+    partitions_to_create,
+)
+
+WEEK = timedelta(days=7)
+
+
+def test_parse_partition_bound():
+    lower, upper = parse_partition_bound(
+        "FOR VALUES FROM ('2026-10-12 00:00:00+00') TO ('2026-10-19 00:00:00+00')"
+    )
+    assert lower == datetime(2026, 10, 12, tzinfo=timezone.utc)
+    assert upper - lower == WEEK
+    assert parse_partition_bound("DEFAULT") is None
+
+
+def test_new_partitions_continue_from_the_newest_bound():
+    start = datetime(2026, 10, 12, tzinfo=timezone.utc)
+    bounds = [(start - WEEK, start), (start, start + WEEK)]
+    now = start + timedelta(days=2)
+
+    ranges = partitions_to_create(bounds, now, WEEK, horizon=now + 2 * WEEK)
+
+    assert ranges[0] == (start + WEEK, start + 2 * WEEK)
+    assert ranges[-1][1] >= now + 2 * WEEK
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_nothing_to_create_when_covered():
+    start = datetime(2026, 10, 12, tzinfo=timezone.utc)
+    assert partitions_to_create([(start, start + 4 * WEEK)], start, WEEK, start + WEEK) == []
+
+
+def test_partition_name_uses_lower_bound_date():
+    assert partition_name(datetime(2026, 1, 5, tzinfo=timezone.utc)) == "refresh_tokens_p20260105"
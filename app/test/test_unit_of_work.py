@@ -0,0 +1,58 @@
+import asyncio
+from ..core.unit_of_work import UnitOfWork, after_commit, transaction
+
+
+class FakeSession:
+    def __init__(self, log):
+        self.log = log
+
+    async def begin(self):
+        self.log.append("begin")
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+    async def close(self):
+        self.log.append("close")
+
+
+def test_repository_calls_share_the_request_session():
+    log = []
+
+    async def main():
+        async with UnitOfWork(lambda: FakeSession(log)) as uow:
+            async with transaction(None) as first:
+                pass
+            async with transaction(None) as second:
+                pass
+            await after_commit(_record(log, "invalidate"))
+            assert first is second is uow.session
+            assert "commit" not in log
+
+    asyncio.run(main())
+    assert log == ["begin", "commit", "close", "invalidate"]
+
+
+def test_failed_unit_of_work_rolls_back_and_skips_callbacks():
+    log = []
+
+    async def main():
+        async with UnitOfWork(lambda: FakeSession(log)):
+            await after_commit(_record(log, "invalidate"))
+            raise RuntimeError("boom")
+
+    try:
+        asyncio.run(main())
+    except RuntimeError:
+        pass
+    assert log == ["begin", "rollback", "close"]
+
+
+def _record(log, entry):
+    async def callback():
+        log.append(entry)
+
+    return callback
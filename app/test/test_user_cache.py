@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime, timezone
+from ..models.user_model import User
+from ..repositories.cache.user_repo_cached import _LocalTier, _restore, _snapshot
+
+
+def test_snapshot_round_trip():
+    user = User(
+        id=uuid.uuid4(),
+        google_id=None,
+        name="Ada",
+        email="ada@example.com",
+        hashed_password="hash",
+        role="user",
+        provider="local",
+        is_verified=True,
+        created_at=datetime.now(timezone.utc),
+    )
+
+    snapshot = _snapshot(user)
+    restored = _restore(snapshot)
+    assert restored.id == user.id and restored.created_at == user.created_at
+    assert restored.is_verified
+    # Password hashes never reach the cache
+    assert "hash" not in snapshot and restored.hashed_password is None
+
+
+def test_local_tier_expires_and_evicts():
+    tier = _LocalTier(max_size=2, ttl_seconds=60)
+    tier.put("a", "1")
+    tier.put("b", "2")
+    tier.get("a")
+    tier.put("c", "3")
+
+    assert tier.get("b") is None
+    assert tier.get("a") == "1" and tier.get("c") == "3"
+
+    tier.put("gone", "x", ttl_seconds=0)
+    assert tier.get("gone") is None
@@ -1,5 +1,47 @@
-from ..domain.abstracts.password_hasher_abstract import PasswordHasher
+import os
+import time
 import asyncio
+import structlog
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from ..domain.abstracts.password_hasher_abstract import PasswordHasher
+from ..core.config import (
+    ARGON2_TIME_COST,
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    PASSWORD_HASHER_BACKEND,
+    HASHER_WORKERS,
+    HASHER_MAX_QUEUE,
+    HASHER_MEMORY_BUDGET_KIB,
+    HASHER_RETRY_AFTER_SECONDS,
+)
+
+logger = structlog.get_logger(__name__)
+
+
+def _build_argon2(time_cost: int, memory_cost: int, parallelism: int):
+    # Lazy import so module can be read even if argon2 isn't installed in the current environment
+    from argon2 import PasswordHasher as _PH, Type
+
+    # Using Type.ID => Argon2id
+    return _PH(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        type=Type.ID,
+    )
+
+
+class HasherBusyError(HTTPException):
+    """Raised when the hashing queue is full; surfaces as 503 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
 
 
 class Argon2PasswordHasher(PasswordHasher):
@@ -12,16 +54,7 @@ class Argon2PasswordHasher(PasswordHasher):
     def __init__(
         self, *, time_cost: int = 2, memory_cost: int = 65536, parallelism: int = 1
     ):
-        # Lazy import so module can be read even if argon2 isn't installed in the current environment
-        from argon2 import PasswordHasher as _PH, Type
-
-        # Using Type.ID => Argon2id
-        self._ph = _PH(
-            time_cost=time_cost,
-            memory_cost=memory_cost,
-            parallelism=parallelism,
-            type=Type.ID,
-        )
+        self._ph = _build_argon2(time_cost, memory_cost, parallelism)
 
     async def hash(self, plain: str) -> str:
         loop = asyncio.get_running_loop()
@@ -37,3 +70,199 @@ class Argon2PasswordHasher(PasswordHasher):
                 return False
 
         return await loop.run_in_executor(None, _verify)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        try:
+            return self._ph.check_needs_rehash(hashed)
+        except Exception:
+            return False
+
+
+# --- Process pool worker side ---
+# Each worker process builds its own argon2 hasher once (in the initializer)
+# and reuses it for every job it receives.
+_worker_ph = None
+
+
+def _init_worker(time_cost: int, memory_cost: int, parallelism: int):
+    global _worker_ph
+    _worker_ph = _build_argon2(time_cost, memory_cost, parallelism)
+
+
+def _worker_hash(plain: str) -> str:
+    return _worker_ph.hash(plain)
+
+
+def _worker_verify(hashed: str, plain: str) -> bool:
+    try:
+        return _worker_ph.verify(hashed, plain)
+    except Exception:
+        return False
+
+
+class ProcessPoolPasswordHasher(PasswordHasher):
+    """
+    Argon2 hasher running on a dedicated process pool.
+
+    Hashing scales across cores without the GIL and never touches the default
+    executor. Concurrent hashes are capped by both the worker count and the
+    memory budget (memory_cost per hash); callers beyond that wait in a bounded
+    queue, and once the queue is full we fail fast with HasherBusyError.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int | None = None,
+        max_queue: int = 64,
+        memory_budget_kib: int = 524288,
+        retry_after: int = 1,
+        time_cost: int = 2,
+        memory_cost: int = 65536,
+        parallelism: int = 1,
+    ):
+        self._params = (time_cost, memory_cost, parallelism)
+        self._workers = workers or os.cpu_count() or 1
+        self._slots = max(1, min(self._workers, memory_budget_kib // memory_cost))
+        self._max_queue = max_queue
+        self._retry_after = retry_after
+
+        # Local instance only used to parse hashes for needs_rehash (never hashes)
+        self._ph = _build_argon2(*self._params)
+
+        # created lazily so the pool is only forked once it's actually needed
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+        # stats
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=self._params,
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._slots)
+
+        # All slots busy and the wait queue is full => shed load immediately
+        if self._semaphore.locked() and self._waiting >= self._max_queue:
+            self._rejected += 1
+            await logger.awarning(
+                "hasher_queue_full",
+                queue_depth=self._waiting,
+                in_flight=self._in_flight,
+            )
+            raise HasherBusyError(self._retry_after)
+
+        self._waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        self._in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                executor = self._replace_executor(executor)
+                future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the worker is done, not until the caller
+        # stops waiting: a cancelled request doesn't stop a running hash
+        future.add_done_callback(lambda _: self._release_from_worker(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); the pool can't run anything else
+            await logger.awarning("hasher_pool_broken", workers=self._workers)
+            self._replace_executor(executor)
+            raise HasherBusyError(self._retry_after)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._completed += 1
+        self._semaphore.release()
+
+    def _release_from_worker(self, loop: asyncio.AbstractEventLoop):
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        if self._executor is broken:
+            self._executor = None
+            broken.shutdown(wait=False)
+        return self._get_executor()
+
+    async def hash(self, plain: str) -> str:
+        return await self._run(_worker_hash, plain)
+
+    async def verify(self, hashed: str, plain: str) -> bool:
+        return await self._run(_worker_verify, hashed, plain)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        try:
+            return self._ph.check_needs_rehash(hashed)
+        except Exception:
+            return False
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, concurrency and wait times."""
+        return {
+            "workers": self._workers,
+            "slots": self._slots,
+            "queue_depth": self._waiting,
+            "max_queue": self._max_queue,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": (
+                self._total_wait / self._completed * 1000 if self._completed else 0.0
+            ),
+            "max_wait_ms": self._max_wait * 1000,
+        }
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def build_password_hasher() -> PasswordHasher:
+    """Build the hasher backend selected by PASSWORD_HASHER_BACKEND."""
+    params = dict(
+        time_cost=ARGON2_TIME_COST,
+        memory_cost=ARGON2_MEMORY_COST,
+        parallelism=ARGON2_PARALLELISM,
+    )
+    if PASSWORD_HASHER_BACKEND == "thread":
+        return Argon2PasswordHasher(**params)
+    return ProcessPoolPasswordHasher(
+        workers=HASHER_WORKERS or None,
+        max_queue=HASHER_MAX_QUEUE,
+        memory_budget_kib=HASHER_MEMORY_BUDGET_KIB,
+        retry_after=HASHER_RETRY_AFTER_SECONDS,
+        **params,
+    )
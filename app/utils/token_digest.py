@@ -0,0 +1,81 @@
+import hmac
+import hashlib
+from ..domain.abstracts.token_digest_abstract import TokenDigest
+from ..domain.abstracts.password_hasher_abstract import PasswordHasher
+from ..core.config import TOKEN_DIGEST_KEYS, SECRET_KEY
+
+# Argon2 encoded hashes stored before the switch to keyed digests
+_ARGON2_PREFIX = b"$argon2"
+
+
+def parse_digest_keys(raw: str) -> dict[int, bytes]:
+    """Parse "1:key,2:key" into {1: b"key", 2: b"key"}."""
+    keys: dict[int, bytes] = {}
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        version, _, key = entry.partition(":")
+        if not key or not version.isdigit() or not 1 <= int(version) <= 255:
+            raise ValueError(f"Invalid TOKEN_DIGEST_KEYS entry: {entry.split(':')[0]!r}")
+        keys[int(version)] = key.encode()
+    if not keys:
+        raise ValueError("TOKEN_DIGEST_KEYS is empty")
+    return keys
+
+
+class HmacTokenDigest(TokenDigest):
+    """
+    Versioned, server-keyed HMAC-SHA256 for random token secrets.
+
+    Token secrets come from secrets.token_urlsafe, so a slow KDF buys nothing;
+    a keyed MAC is enough and costs microseconds. The stored value is one
+    version byte followed by the 32 byte MAC (33 bytes total), which lets us
+    rotate keys while tokens minted under older keys keep verifying.
+
+    Rows written before this existed hold an Argon2 hash; those are verified
+    with legacy_hasher until they expire.
+    """
+
+    def __init__(
+        self, keys: dict[int, bytes], legacy_hasher: PasswordHasher | None = None
+    ):
+        if not keys:
+            raise ValueError("At least one digest key is required")
+        self._keys = dict(keys)
+        self._version = max(self._keys)
+        self._legacy = legacy_hasher
+
+    def _mac(self, key: bytes, secret: str) -> bytes:
+        return hmac.new(key, secret.encode(), hashlib.sha256).digest()
+
+    def digest(self, secret: str) -> bytes:
+        return bytes([self._version]) + self._mac(self._keys[self._version], secret)
+
+    async def verify(self, stored: bytes, secret: str) -> bool:
+        if not stored:
+            return False
+        stored = bytes(stored)
+
+        if stored.startswith(_ARGON2_PREFIX):
+            if self._legacy is None:
+                return False
+            return await self._legacy.verify(stored.decode(), secret)
+
+        key = self._keys.get(stored[0])
+        if key is None:
+            return False
+        return hmac.compare_digest(stored[1:], self._mac(key, secret))
+
+
+def build_token_digest(legacy_hasher: PasswordHasher | None = None) -> TokenDigest:
+    """Build the token digest from TOKEN_DIGEST_KEYS (or SECRET_KEY as fallback)."""
+    if TOKEN_DIGEST_KEYS:
+        keys = parse_digest_keys(TOKEN_DIGEST_KEYS)
+    elif SECRET_KEY:
+        # domain-separate from the JWT signing key
+        derived = hmac.new(SECRET_KEY.encode(), b"token-digest", hashlib.sha256)
+        keys = {1: derived.digest()}
+    else:
+        raise RuntimeError("Set TOKEN_DIGEST_KEYS or SECRET_KEY")
+    return HmacTokenDigest(keys, legacy_hasher=legacy_hasher)
@@ -0,0 +1,144 @@
+"""
+Compare the ORM and Core repositories on the hot auth calls.
+
+Runs get_user_by_email (login), get_user_by_id and save_refresh_token
+(issuing a token) through PostgresUserRepository/PostgresRefreshTokenRepository
+and CoreUserRepository/CoreRefreshTokenRepository, and reports latency per
+call plus the peak Python memory allocated while serving one call.
+
+Everything runs on one connection inside an outer transaction that is rolled
+back at the end (each repository call gets its own session and a savepoint,
+as it would its own transaction in production), so nothing is left behind.
+
+Needs a migrated database (alembic upgrade head):
+    python benchmarks/query_layer_bench.py --url postgresql+asyncpg://... [--iterations 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Make the project importable when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.repositories.postgreSQL.user_repo_postgres import PostgresUserRepository  # noqa: E402
+from app.repositories.postgreSQL.user_repo_core import CoreUserRepository  # noqa: E402
+from app.repositories.postgreSQL.refresh_token_repo import (  # noqa: E402
+    PostgresRefreshTokenRepository,
+)
+from app.repositories.postgreSQL.refresh_token_repo_core import (  # noqa: E402
+    CoreRefreshTokenRepository,
+)
+from app.schema.user_dto import UserCreateDTO  # noqa: E402
+
+LAYERS = {
+    "orm": (PostgresUserRepository, PostgresRefreshTokenRepository),
+    "core": (CoreUserRepository, CoreRefreshTokenRepository),
+}
+
+
+async def measure(call, iterations: int):
+    for _ in range(min(100, iterations)):  # warm up statement caches
+        await call()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+
+    # peak allocation while serving a single call, above what was live before it
+    peaks = []
+    tracemalloc.start()
+    for _ in range(min(200, iterations)):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "median_us": statistics.median(samples) * 1e6,
+        "p95_us": samples[int(len(samples) * 0.95)] * 1e6,
+        "peak_kib": statistics.median(peaks) / 1024,
+    }
+
+
+async def bench_layer(factory, layer: str, iterations: int, email: str, user_id):
+    user_cls, token_cls = LAYERS[layer]
+    users, tokens = user_cls(factory), token_cls(factory)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+
+    async def by_email():
+        user = await users.get_user_by_email(email)
+        return user.id, user.hashed_password, user.is_verified, user.role
+
+    async def by_id():
+        return (await users.get_user_by_id(user_id)).email
+
+    async def save_token():
+        token_id = uuid.uuid4().hex
+        await tokens.save_refresh_token(token_id, user_id, b"\x01" * 33, expires_at)
+
+    return {
+        "get_user_by_email": await measure(by_email, iterations),
+        "get_user_by_id": await measure(by_id, iterations),
+        "save_refresh_token": await measure(save_token, iterations),
+    }
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"), required=False)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+    if not args.url:
+        parser.error("--url (or DATABASE_URL) is required")
+
+    engine = create_async_engine(args.url)
+    try:
+        async with engine.connect() as conn:
+            outer = await conn.begin()
+            factory = sessionmaker(
+                bind=conn,
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autoflush=False,
+                join_transaction_mode="create_savepoint",
+            )
+            email = f"bench-{uuid.uuid4().hex}@example.com"
+            user = await PostgresUserRepository(factory).create_user(
+                UserCreateDTO(name="bench", email=email, password="bench-password"),
+                "not-a-real-hash",
+            )
+
+            results = {}
+            for layer in LAYERS:
+                results[layer] = await bench_layer(
+                    factory, layer, args.iterations, email, user.id
+                )
+            await outer.rollback()
+    finally:
+        await engine.dispose()
+
+    print(f"{'call':<20} {'layer':<5} {'median us':>10} {'p95 us':>10} {'peak KiB':>9}")
+    for call in results["orm"]:
+        for layer in LAYERS:
+            r = results[layer][call]
+            print(
+                f"{call:<20} {layer:<5} {r['median_us']:>10.1f} "
+                f"{r['p95_us']:>10.1f} {r['peak_kib']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+Measure revoke-all-refresh-tokens on a large refresh_tokens table.
+
+Seeds a scratch copy of refresh_tokens (no foreign key, UNLOGGED) and compares
+the old per-row revoke with the set-based UPDATE, with and without the partial
+index on (user_id) WHERE NOT revoked. Every revoke runs in a transaction that
+is rolled back, so all samples see the same data.
+
+Needs a PostgreSQL database to write to:
+    python benchmarks/revoke_all_bench.py --url postgresql+asyncpg://... [--rows 10000000]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+# Make the project importable when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+TABLE = "bench_refresh_tokens"
+INDEX = "bench_refresh_tokens_user_id_active"
+
+REVOKE_ALL = text(f"UPDATE {TABLE} SET revoked = true WHERE user_id = :u AND NOT revoked")
+SELECT_LIVE = text(f"SELECT id FROM {TABLE} WHERE user_id = :u AND NOT revoked")
+REVOKE_ONE = text(f"UPDATE {TABLE} SET revoked = true WHERE id = :id")
+
+
+async def seed(engine, rows: int, users: int, active_fraction: float):
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await conn.execute(
+            text(
+                f"""
+                CREATE UNLOGGED TABLE {TABLE} (
+                    id varchar(64) PRIMARY KEY,
+                    user_id uuid NOT NULL,
+                    token_hash bytea NOT NULL,
+                    revoked boolean NOT NULL,
+                    created_at timestamptz DEFAULT now(),
+                    expires_at timestamptz NOT NULL
+                )
+                """
+            )
+        )
+        # user ids are derived from the row number so samples can be rebuilt
+        await conn.execute(
+            text(
+                f"""
+                INSERT INTO {TABLE} (id, user_id, token_hash, revoked, expires_at)
+                SELECT md5(g::text),
+                       md5('user' || (g % :users)::text)::uuid,
+                       decode(md5(g::text), 'hex'),
+                       random() >= :active,
+                       now() + interval '7 days'
+                FROM generate_series(1, :rows) AS g
+                """
+            ),
+            {"rows": rows, "users": users, "active": active_fraction},
+        )
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"VACUUM ANALYZE {TABLE}"))
+
+
+def sample_users(users: int, count: int) -> list[str]:
+    picks = random.sample(range(users), min(count, users))
+    return [str(uuid.UUID(hashlib.md5(f"user{n}".encode()).hexdigest())) for n in picks]
+
+
+async def plan(engine, user_id: str) -> str:
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        rows = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {REVOKE_ALL.text}"),
+            {"u": user_id},
+        )
+        await trans.rollback()
+    return "\n".join(f"    {line}" for (line,) in rows)
+
+
+async def time_revoke(engine, user_ids: list[str], set_based: bool) -> list[float]:
+    timings = []
+    async with engine.connect() as conn:
+        for user_id in user_ids:
+            trans = await conn.begin()
+            started = time.perf_counter()
+            if set_based:
+                await conn.execute(REVOKE_ALL, {"u": user_id})
+            else:
+                # what the ORM version did: load live rows, then flip each one
+                ids = (await conn.execute(SELECT_LIVE, {"u": user_id})).scalars().all()
+                for token_id in ids:
+                    await conn.execute(REVOKE_ONE, {"id": token_id})
+            timings.append((time.perf_counter() - started) * 1000)
+            await trans.rollback()
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"  {label:<22} median {statistics.median(timings):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+async def run(args):
+    engine = create_async_engine(args.url)
+    try:
+        if not args.reuse:
+            print(f"Seeding {args.rows:,} rows for {args.users:,} users ...")
+            started = time.perf_counter()
+            await seed(engine, args.rows, args.users, args.active_fraction)
+            print(f"  done in {time.perf_counter() - started:.0f}s")
+
+        user_ids = sample_users(args.users, args.samples)
+
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {INDEX}"))
+        print("\nWithout index:")
+        print(await plan(engine, user_ids[0]))
+        report("per-row (old)", await time_revoke(engine, user_ids[: args.slow_samples], False))
+        report("set-based UPDATE", await time_revoke(engine, user_ids[: args.slow_samples], True))
+
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(f"CREATE INDEX {INDEX} ON {TABLE} (user_id) WHERE NOT revoked")
+            )
+            await conn.execute(text(f"ANALYZE {TABLE}"))
+        print("\nWith partial index (user_id) WHERE NOT revoked:")
+        print(await plan(engine, user_ids[0]))
+        report("per-row (old)", await time_revoke(engine, user_ids, False))
+        report("set-based UPDATE", await time_revoke(engine, user_ids, True))
+
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE {TABLE}"))
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument(
+        "--active-fraction",
+        type=float,
+        default=0.05,
+        help="share of tokens still unrevoked (rotation revokes the rest)",
+    )
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument(
+        "--slow-samples",
+        type=int,
+        default=5,
+        help="samples for the unindexed runs (each one is a full table scan)",
+    )
+    parser.add_argument("--reuse", action="store_true", help="skip seeding")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("--url or DATABASE_URL is required")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()